@@ -21,8 +21,20 @@ import time
 import psutil
 import asyncio
 from functools import lru_cache
-from typing import Dict, Any
+from typing import Dict, Any, List
 import hashlib
+import gzip
+from append_log import file_lock
+from feature_store import content_hash, open_feature_store, split_backbone_head
+from dicom_io import decode_dicom, is_dicom
+from similarity_index import APPROXIMATE_MIN_VECTORS, SimilarityIndex
+import contextvars
+import json
+import random
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +42,84 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger('reluray.trace')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+class RequestTrace:
+    """Per-request collection of stage timings"""
+    
+    __slots__ = ('request_id', 'start', 'spans')
+    
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.spans = []
+    
+    def add_span(self, name: str, duration: float):
+        self.spans.append((name, duration))
+    
+    def server_timing(self, total: float) -> str:
+        """Format spans as a Server-Timing header value (milliseconds)"""
+        entries = [f"{name};dur={duration * 1000:.2f}" for name, duration in self.spans]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+    
+    def to_log_record(self, request: StarletteRequest, status_code: int, total: float) -> Dict[str, Any]:
+        return {
+            'request_id': self.request_id,
+            'method': request.method,
+            'path': request.url.path,
+            'status': status_code,
+            'duration_ms': round(total * 1000, 3),
+            'spans': [
+                {'name': name, 'duration_ms': round(duration * 1000, 3)}
+                for name, duration in self.spans
+            ],
+        }
+
+# Trace of the request currently being handled (None outside a request)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('reluray_trace', default=None)
+
+@contextmanager
+def trace_span(name: str):
+    """Time a block of work and record it on the current request trace"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, time.perf_counter() - start)
+
+class ServerTimingMiddleware(BaseHTTPMiddleware):
+    """Add Server-Timing and X-Request-ID headers, optionally logging sampled traces"""
+    
+    async def dispatch(self, request: StarletteRequest, call_next):
+        # Propagate a well-formed upstream request ID, otherwise generate one
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        
+        trace = RequestTrace(request_id)
+        token = _current_trace.set(trace)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_trace.reset(token)
+        
+        total = time.perf_counter() - trace.start
+        response.headers["Server-Timing"] = trace.server_timing(total)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        
+        # JSON trace log (sampling decision is skipped entirely when disabled)
+        if TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE:
+            trace_logger.info(json.dumps(trace.to_log_record(request, response.status_code, total)))
+        
+        return response
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Add security headers to all responses"""
@@ -59,8 +149,16 @@ class ModelManager:
         self._model = None
         self._model_path = None
         self._load_time = 0
+        self._backbone = None
+        self._head = None
+        self._feature_store = None
+        self._similarity_index = None
         self._cache = {}
         self._cache_size_limit = 100  # Max cached predictions
+        self._cache_writes = 0  # Bumped on every cache insert
+        self._snapshot_writes = 0  # Value of _cache_writes at the last snapshot
+        # Single inference worker keeps model calls serialized and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
     
     def find_model_file(self):
         """Find the model file in common locations"""
@@ -105,6 +203,9 @@ class ModelManager:
                     # Log model summary
                     logger.info(f"Model input shape: {self._model.input_shape}")
                     logger.info(f"Model output shape: {self._model.output_shape}")
+                    
+                    if FEATURE_STORE_DIR or SIMILARITY_INDEX_DIR:
+                        self._init_embeddings()
                 except Exception as e:
                     logger.error(f"❌ Error loading model: {e}", exc_info=True)
                     self._model = None
@@ -115,6 +216,36 @@ class ModelManager:
         
         return self._model
     
+    def _init_embeddings(self):
+        """Split the model into backbone/head and open the feature store and similarity index"""
+        try:
+            split = split_backbone_head(self._model)
+            if split is None:
+                logger.warning("Model has no pooled feature layer; feature store and similarity search disabled")
+                return
+            self._backbone, self._head = split
+            
+            if FEATURE_STORE_DIR:
+                self._feature_store = open_feature_store(FEATURE_STORE_DIR, self._backbone)
+                logger.info(f"Feature store ready: {len(self._feature_store)} cached feature vectors "
+                            f"(backbone {self._feature_store.backbone_version})")
+            
+            if SIMILARITY_INDEX_DIR:
+                self._similarity_index = SimilarityIndex(SIMILARITY_INDEX_DIR, dim=self._backbone.output_shape[-1])
+                logger.info(f"Similarity index ready: {len(self._similarity_index)} cases "
+                            f"({'approximate' if self._similarity_index.is_approximate else 'exact'} search)")
+        except Exception as e:
+            logger.error(f"❌ Error initializing embeddings: {e}", exc_info=True)
+            self._backbone = self._head = self._feature_store = self._similarity_index = None
+    
+    @property
+    def feature_store(self):
+        return self._feature_store
+    
+    @property
+    def similarity_index(self):
+        return self._similarity_index
+    
     def get_cached_prediction(self, image_hash: str):
         """Get cached prediction if available"""
         return self._cache.get(image_hash)
@@ -128,8 +259,129 @@ class ModelManager:
             del self._cache[oldest_key]
         
         self._cache[image_hash] = prediction
+        self._cache_writes += 1
         logger.debug(f"Cached prediction for hash: {image_hash[:8]}...")
     
+    @staticmethod
+    def _read_snapshot(path: str) -> List:
+        """[[image_hash, prediction], ...] from a snapshot file, oldest first"""
+        if not os.path.exists(path):
+            return []
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f).get('entries', [])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache snapshot {path}: {e}")
+            return []
+    
+    def snapshot_cache(self, path: str) -> bool:
+        """
+        Merge the prediction cache into a gzipped JSON snapshot if it changed.
+        API workers share one snapshot: each write keeps the entries other
+        workers saved (for this model version) and adds its own as the newest.
+        """
+        writes = self._cache_writes
+        if writes == self._snapshot_writes:
+            return False
+        
+        # Write to a private temp file and swap it in so readers never see a partial snapshot
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with file_lock(f"{path}.lock"):
+                merged = {image_hash: prediction for image_hash, prediction in self._read_snapshot(path)
+                          if prediction.get('model_version') == MODEL_VERSION}
+                for image_hash, prediction in list(self._cache.items()):
+                    merged.pop(image_hash, None)
+                    merged[image_hash] = prediction
+                entries = [[image_hash, prediction] for image_hash, prediction in merged.items()]
+                entries = entries[-self._cache_size_limit:]
+                payload = json.dumps({'model_version': MODEL_VERSION, 'entries': entries}, separators=(',', ':'))
+                with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache snapshot to {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        
+        self._snapshot_writes = writes
+        logger.info(f"Cache snapshot saved: {len(entries)} entries -> {path}")
+        return True
+    
+    def load_cache_snapshot(self, path: str) -> int:
+        """Warm the prediction cache from a snapshot, skipping other model versions"""
+        loaded = 0
+        skipped = 0
+        for image_hash, prediction in self._read_snapshot(path)[-self._cache_size_limit:]:
+            if prediction.get('model_version') != MODEL_VERSION:
+                skipped += 1
+                continue
+            self._cache[image_hash] = prediction
+            loaded += 1
+        
+        # Loaded entries are already on disk, no need to snapshot them again
+        self._snapshot_writes = self._cache_writes
+        logger.info(f"Cache warmed from snapshot: {loaded} entries loaded, {skipped} from other model versions skipped")
+        return loaded
+    
+    async def predict(self, model, batch):
+        """Run prediction on the inference worker, tracing queue wait and inference time"""
+        return await self._run_inference(lambda: model.predict(batch, verbose=0))
+    
+    async def predict_with_features(self, feature_key: str, batch=None):
+        """
+        Predict through the feature store: run only the head when features for
+        `feature_key` are cached, otherwise run the backbone on `batch` and store them.
+        """
+        features = self._feature_store.get(feature_key)
+        if features is not None:
+            return await self._run_inference(lambda: self._head.predict(features[np.newaxis], verbose=0))
+        
+        def _full():
+            computed = self._backbone.predict(batch, verbose=0)
+            self._feature_store.put(feature_key, computed[0])
+            return self._head.predict(computed, verbose=0)
+        
+        return await self._run_inference(_full)
+    
+    def cached_embedding(self, feature_key: Optional[str]):
+        """Pooled embedding from the feature store, or None when it isn't cached"""
+        if feature_key is None or self._feature_store is None:
+            return None
+        return self._feature_store.get(feature_key)
+    
+    async def embed(self, feature_key: Optional[str], batch):
+        """Pooled embedding for one image, served from the feature store when cached"""
+        features = self.cached_embedding(feature_key)
+        if features is not None:
+            return features
+        
+        def _embed():
+            computed = self._backbone.predict(batch, verbose=0)
+            if feature_key is not None and self._feature_store is not None:
+                self._feature_store.put(feature_key, computed[0])
+            return computed[0]
+        
+        return await self._run_inference(_embed)
+    
+    async def _run_inference(self, fn):
+        trace = _current_trace.get()
+        submitted = time.perf_counter()
+        
+        def _run():
+            started = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                if trace is not None:
+                    trace.add_span('queue', started - submitted)
+                    trace.add_span('inference', time.perf_counter() - started)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _run)
+    
     def get_model_info(self):
         """Get model loading information"""
         return {
@@ -155,6 +407,9 @@ app = FastAPI(
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Add Server-Timing / request ID middleware
+app.add_middleware(ServerTimingMiddleware)
+
 # Add trusted host middleware (prevents host header attacks)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
@@ -187,13 +442,22 @@ app.add_middleware(
     allow_origins=allow_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", REQUEST_ID_HEADER],
+    expose_headers=["Server-Timing", REQUEST_ID_HEADER],
 )
 
 # Configuration
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MODEL_INPUT_SIZE = (224, 224)
 MODEL_VERSION = os.environ.get("MODEL_VERSION", "1.0.0")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))  # Fraction of requests logged as JSON traces
+FEATURE_STORE_DIR = os.environ.get("FEATURE_STORE_DIR", "")  # Backbone feature store, empty disables it
+SIMILARITY_INDEX_DIR = os.environ.get("SIMILARITY_INDEX_DIR", "")  # Similar-case index, empty disables /api/similar
+CACHE_SNAPSHOT_PATH = os.environ.get(
+    "CACHE_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'cache_snapshot.json.gz')
+)
+CACHE_SNAPSHOT_INTERVAL = int(os.environ.get("CACHE_SNAPSHOT_INTERVAL", "0"))  # Seconds, 0 (default) disables snapshots
 
 # Pydantic models for request/response validation
 class PredictRequest(BaseModel):
@@ -218,6 +482,23 @@ class PredictResponse(BaseModel):
     model_version: str
     status: str
 
+class SimilarRequest(BaseModel):
+    image: str = Field(..., description="Base64 encoded image data")
+    k: int = Field(5, ge=1, le=50, description="Number of similar cases to return")
+
+class SimilarCase(BaseModel):
+    case_id: str
+    distance: float
+
+class SimilarResponse(BaseModel):
+    cases: List[SimilarCase]
+    search: str
+    index_size: int
+    timestamp: str
+    processing_time: float
+    model_version: str
+    status: str
+
 class ErrorResponse(BaseModel):
     error: str
     status: str
@@ -282,31 +563,74 @@ def get_system_metrics():
             'memory_percent': 0
         }
 
-def preprocess_image(image_data: str):
-    """Preprocess image for model prediction"""
+def preprocess_image(image_data: str, image_bytes: Optional[bytes] = None):
+    """
+    Preprocess image for model prediction (image_bytes: the payload already
+    decoded from base64 by the caller, so it isn't decoded twice)
+    """
     try:
         # Validate input
-        if not image_data or not isinstance(image_data, str):
+        if image_bytes is None and (not image_data or not isinstance(image_data, str)):
             logger.error("Invalid image data: not a string")
             return None
         
-        # Extract base64 data
-        if image_data.startswith('data:image'):
-            # Remove data URL prefix (e.g., "data:image/jpeg;base64,")
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64
-        try:
-            image_bytes = base64.b64decode(image_data, validate=True)
-        except Exception as e:
-            logger.error(f"Invalid base64 encoding: {e}")
+        with trace_span('decode'):
+            image = _decode_image(image_data, image_bytes)
+        if image is None:
             return None
         
-        # Validate image size
-        if len(image_bytes) > MAX_IMAGE_SIZE:
-            logger.warning(f"Image too large: {len(image_bytes)} bytes (max: {MAX_IMAGE_SIZE})")
+        with trace_span('resize'):
+            # Resize to model input size
+            image = image.resize(MODEL_INPUT_SIZE, Image.Resampling.LANCZOS)
+            
+            # Convert to array and normalize
+            img_array = img_to_array(image)
+            img_array = img_array / 255.0
+            img_array = np.expand_dims(img_array, axis=0)
+        
+        logger.debug(f"Image preprocessed: shape={img_array.shape}")
+        return img_array
+        
+    except Exception as e:
+        logger.error(f"Error preprocessing image: {e}", exc_info=True)
+        return None
+
+def _decode_base64_image(image_data: str) -> Optional[bytes]:
+    """Extract raw image file bytes from base64 / data URL input, or None if invalid"""
+    # Extract base64 data
+    if image_data.startswith('data:'):
+        # Remove data URL prefix (e.g., "data:image/jpeg;base64," or "data:application/dicom;base64,")
+        image_data = image_data.split(',')[1]
+    
+    # Decode base64
+    try:
+        image_bytes = base64.b64decode(image_data, validate=True)
+    except Exception as e:
+        logger.error(f"Invalid base64 encoding: {e}")
+        return None
+    
+    # Validate image size
+    if len(image_bytes) > MAX_IMAGE_SIZE:
+        logger.warning(f"Image too large: {len(image_bytes)} bytes (max: {MAX_IMAGE_SIZE})")
+        return None
+    
+    return image_bytes
+
+def _decode_image(image_data: str, image_bytes: Optional[bytes] = None):
+    """Decode base64 image data (or its already-decoded bytes) into an RGB PIL image, or None if invalid"""
+    try:
+        if image_bytes is None:
+            image_bytes = _decode_base64_image(image_data)
+        if image_bytes is None:
             return None
         
+        if is_dicom(image_bytes):
+            try:
+                return decode_dicom(image_bytes, MODEL_INPUT_SIZE)
+            except Exception as e:
+                logger.error(f"Invalid DICOM file: {e}")
+                return None
+        
         # Open and validate image
         try:
             image = Image.open(io.BytesIO(image_bytes))
@@ -315,26 +639,18 @@ def preprocess_image(image_data: str):
             logger.error(f"Invalid image file: {e}")
             return None
         
-        # Reopen image (verify() closes it)
+        # Reopen image (verify() closes it) and decode pixels eagerly
         image = Image.open(io.BytesIO(image_bytes))
+        image.load()
         
         # Convert to RGB if necessary
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
-        # Resize to model input size
-        image = image.resize(MODEL_INPUT_SIZE, Image.Resampling.LANCZOS)
-        
-        # Convert to array and normalize
-        img_array = img_to_array(image)
-        img_array = img_array / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        logger.debug(f"Image preprocessed: shape={img_array.shape}")
-        return img_array
+        return image
         
     except Exception as e:
-        logger.error(f"Error preprocessing image: {e}", exc_info=True)
+        logger.error(f"Error decoding image: {e}", exc_info=True)
         return None
 
 @app.get("/api/health", response_model=HealthResponse, tags=["Health"])
@@ -386,11 +702,12 @@ async def predict(request: PredictRequest):
     """predict pneumonia from uploaded image with caching"""
     start_time = time.time()
     
-    # Get image hash for caching
-    image_hash = model_manager._get_image_hash(request.image)
-    
-    # Check cache first
-    cached_result = model_manager.get_cached_prediction(image_hash)
+    with trace_span('cache'):
+        # Get image hash for caching
+        image_hash = model_manager._get_image_hash(request.image)
+        
+        # Check cache first
+        cached_result = model_manager.get_cached_prediction(image_hash)
     if cached_result:
         logger.info(f"Cache hit for image hash: {image_hash[:8]}...")
         return PredictResponse(**cached_result)
@@ -407,21 +724,37 @@ async def predict(request: PredictRequest):
     try:
         image_data = request.image
         
-        # Preprocess image
-        logger.info("Preprocessing image...")
-        processed_image = preprocess_image(image_data)
-        if processed_image is None:
-            logger.warning("Image preprocessing failed")
-            raise HTTPException(
-                status_code=400,
-                detail='Failed to process image. Please ensure the image is valid and under 10MB.'
-            )
-        
-        # Make prediction
-        logger.info("Running model prediction...")
-        prediction_start = time.time()
-        prediction = model.predict(processed_image, verbose=0)
-        prediction_time = time.time() - prediction_start
+        # Look up cached backbone features by image content
+        prediction = None
+        feature_key = None
+        image_bytes = None
+        if model_manager.feature_store is not None:
+            with trace_span('features'):
+                image_bytes = _decode_base64_image(image_data)
+                if image_bytes is not None:
+                    feature_key = content_hash(image_bytes)
+                    features_cached = feature_key in model_manager.feature_store
+            if feature_key is not None and features_cached:
+                logger.info("Feature store hit, running head only...")
+                prediction = await model_manager.predict_with_features(feature_key)
+        
+        if prediction is None:
+            # Preprocess image
+            logger.info("Preprocessing image...")
+            processed_image = preprocess_image(image_data, image_bytes)
+            if processed_image is None:
+                logger.warning("Image preprocessing failed")
+                raise HTTPException(
+                    status_code=400,
+                    detail='Failed to process image. Please ensure the image is valid and under 10MB.'
+                )
+            
+            # Make prediction
+            logger.info("Running model prediction...")
+            if feature_key is not None:
+                prediction = await model_manager.predict_with_features(feature_key, processed_image)
+            else:
+                prediction = await model_manager.predict(model, processed_image)
         
         confidence = float(prediction[0][0])
         
@@ -462,6 +795,54 @@ async def predict(request: PredictRequest):
         logger.error(f"Unexpected error in prediction: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail='Failed to analyze image. Please try again.')
 
+@app.post("/api/similar", response_model=SimilarResponse, tags=["Prediction"])
+async def similar_cases(request: SimilarRequest):
+    """Find the most similar prior cases by model embedding"""
+    start_time = time.time()
+    
+    model = model_manager.get_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail='Model not loaded. Please check server logs.')
+    
+    index = model_manager.similarity_index
+    if index is None:
+        raise HTTPException(status_code=503, detail='Similarity search is not enabled on this server.')
+    
+    image_bytes = _decode_base64_image(request.image)
+    feature_key = content_hash(image_bytes) if image_bytes is not None else None
+    # Cached embeddings skip decoding and resizing the image entirely
+    embedding = model_manager.cached_embedding(feature_key)
+    processed_image = None
+    if embedding is None and image_bytes is not None:
+        processed_image = preprocess_image(request.image, image_bytes)
+    if embedding is None and processed_image is None:
+        raise HTTPException(
+            status_code=400,
+            detail='Failed to process image. Please ensure the image is valid and under 10MB.'
+        )
+    
+    try:
+        if embedding is None:
+            embedding = await model_manager.embed(feature_key, processed_image)
+        with trace_span('search'):
+            matches = await asyncio.to_thread(index.search, embedding, request.k)
+    except Exception as e:
+        logger.error(f"Unexpected error in similarity search: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail='Failed to search similar cases. Please try again.')
+    
+    total_time = time.time() - start_time
+    logger.info(f"Similarity search returned {len(matches)} cases in {total_time:.2f}s")
+    
+    return SimilarResponse(
+        cases=[SimilarCase(case_id=case_id, distance=round(distance, 6)) for case_id, distance in matches],
+        search='approximate' if index.is_approximate and len(index) >= APPROXIMATE_MIN_VECTORS else 'exact',
+        index_size=len(index),
+        timestamp=datetime.now().isoformat(),
+        processing_time=round(total_time, 3),
+        model_version=MODEL_VERSION,
+        status='success'
+    )
+
 @app.get("/api/info", response_model=ModelInfoResponse, tags=["Info"])
 async def model_info():
     """Get model information with caching details"""
@@ -492,6 +873,33 @@ async def model_info():
     
     return ModelInfoResponse(**info)
 
+async def _snapshot_cache_periodically():
+    """Background task that persists the prediction cache every CACHE_SNAPSHOT_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(CACHE_SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(model_manager.snapshot_cache, CACHE_SNAPSHOT_PATH)
+        except Exception as e:
+            logger.error(f"Cache snapshot failed: {e}", exc_info=True)
+
+@app.on_event("startup")
+async def warm_cache_from_snapshot():
+    """Reload the persisted prediction cache and start periodic snapshots"""
+    if CACHE_SNAPSHOT_INTERVAL <= 0:
+        return
+    model_manager.load_cache_snapshot(CACHE_SNAPSHOT_PATH)
+    app.state.cache_snapshot_task = asyncio.create_task(_snapshot_cache_periodically())
+
+@app.on_event("shutdown")
+async def persist_cache_snapshot():
+    """Write a final cache snapshot so the next process starts warm"""
+    if CACHE_SNAPSHOT_INTERVAL <= 0:
+        return
+    task = getattr(app.state, 'cache_snapshot_task', None)
+    if task is not None:
+        task.cancel()
+    model_manager.snapshot_cache(CACHE_SNAPSHOT_PATH)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -0,0 +1,65 @@
+"""
+Append-only files shared between ReluRay processes
+File locks, incremental reads of one-line-per-row key files and growable
+memory-mapped row files, used by the feature store, the similarity index and
+the API's cache snapshots
+"""
+
+import os
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, exclusive: bool = True):
+    """
+    Advisory lock shared by every process using `path` (e.g. API workers),
+    so their appends to the same files can't interleave.
+    """
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_new_lines(path: str, offset: int) -> Tuple[List[str], int]:
+    """
+    Lines appended to `path` (by any process) past byte `offset`.
+    Returns (lines, new offset); line n of the file is row n.
+    """
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # Only whole lines; a partial one is still being written
+    data = data[:data.rfind(b'\n') + 1]
+    return data.decode().splitlines(), offset + len(data)
+
+
+def truncate_lines(path: str, count: int) -> int:
+    """Keep the first `count` lines of `path`; returns the new size in bytes"""
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)[:count]
+    with open(path, 'wb') as f:
+        f.write(b''.join(lines))
+    return sum(len(line) for line in lines)
+
+
+def map_rows(path: str, capacity: int, dim: int) -> np.memmap:
+    """Memory-map a float32 row file, growing it to hold at least `capacity` rows"""
+    with open(path, 'ab') as f:
+        if f.tell() < capacity * dim * 4:
+            f.truncate(capacity * dim * 4)
+    return np.memmap(path, dtype=np.float32, mode='r+', shape=(capacity, dim))
@@ -0,0 +1,133 @@
+"""
+DICOM decoding for ReluRay
+Turns DICOM chest X-rays into 8-bit RGB images for the API and the dataset
+pipeline: modality rescale, VOI windowing and MONOCHROME1 inversion, with
+reduced-resolution decoding for JPEG / JPEG 2000 transfer syntaxes.
+"""
+
+import io
+import logging
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+try:
+    import pydicom
+    from pydicom.encaps import generate_pixel_data_frame
+    DICOM_AVAILABLE = True
+except ImportError:  # pydicom is optional; DICOM inputs are rejected without it
+    pydicom = None
+    DICOM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DICOM_EXTENSIONS = {'.dcm', '.dicom', '.DCM', '.DICOM'}
+
+# Transfer syntaxes Pillow can decode at reduced resolution
+JPEG_BASELINE = '1.2.840.10008.1.2.4.50'
+JPEG_2000_SYNTAXES = {'1.2.840.10008.1.2.4.90', '1.2.840.10008.1.2.4.91'}
+
+
+def is_dicom(data: bytes) -> bool:
+    """DICOM Part 10 files carry 'DICM' after a 128-byte preamble"""
+    return len(data) >= 132 and data[128:132] == b'DICM'
+
+
+def _first_value(value):
+    """WindowCenter / WindowWidth may be multi-valued; use the first (default) window"""
+    if value is None:
+        return None
+    try:
+        return float(value[0])
+    except TypeError:
+        return float(value)
+
+
+def _reduced_frame(ds, target_size: Optional[Tuple[int, int]]) -> Optional[np.ndarray]:
+    """
+    Decode the first frame at the smallest resolution still >= target_size,
+    or None when the transfer syntax needs the full pixel_array decode.
+    """
+    if target_size is None or not getattr(ds, 'file_meta', None):
+        return None
+    syntax = str(ds.file_meta.get('TransferSyntaxUID', ''))
+    if syntax != JPEG_BASELINE and syntax not in JPEG_2000_SYNTAXES:
+        return None
+    if int(ds.get('SamplesPerPixel', 1)) != 1 or int(ds.get('PixelRepresentation', 0)) != 0:
+        return None
+
+    frame = next(generate_pixel_data_frame(ds.PixelData))
+    image = Image.open(io.BytesIO(frame))
+    rows, columns = int(ds.Rows), int(ds.Columns)
+
+    if syntax == JPEG_BASELINE:
+        # DCT scaling: libjpeg decodes directly at 1/2, 1/4 or 1/8 size
+        image.draft('L', target_size)
+    else:
+        # Discard JPEG 2000 resolution levels while staying >= target_size
+        reduce = 0
+        while (rows >> (reduce + 1)) >= target_size[1] and (columns >> (reduce + 1)) >= target_size[0]:
+            reduce += 1
+        image.reduce = reduce
+
+    image.load()
+    return np.asarray(image)
+
+
+def dicom_to_array(source: Union[str, bytes], target_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Decode a DICOM file (path or bytes) to a uint8 grayscale array.
+    When target_size is given, compressed frames may be decoded at a reduced
+    resolution that is still at least target_size.
+    """
+    if not DICOM_AVAILABLE:
+        raise ImportError("pydicom is required to decode DICOM files (pip install pydicom)")
+
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    ds = pydicom.dcmread(fp)
+
+    pixels = None
+    try:
+        pixels = _reduced_frame(ds, target_size)
+    except Exception as e:
+        logger.debug(f"Reduced-resolution decode unavailable, using full decode: {e}")
+    if pixels is None:
+        pixels = ds.pixel_array
+        if pixels.ndim == 3 and int(ds.get('SamplesPerPixel', 1)) == 1:
+            pixels = pixels[0]  # Multi-frame: first frame only
+
+    if int(ds.get('SamplesPerPixel', 1)) != 1:
+        # Colour DICOM (rare for CXR): no grayscale VOI pipeline applies
+        return np.asarray(Image.fromarray(pixels.astype(np.uint8)).convert('L'))
+
+    # Modality LUT: stored values -> output units
+    pixels = pixels.astype(np.float32)
+    slope = float(ds.get('RescaleSlope', 1) or 1)
+    intercept = float(ds.get('RescaleIntercept', 0) or 0)
+    if slope != 1 or intercept != 0:
+        pixels = pixels * slope + intercept
+
+    # VOI LUT: linear window (DICOM PS3.3 C.11.2.1.2), else robust min/max
+    center = _first_value(ds.get('WindowCenter'))
+    width = _first_value(ds.get('WindowWidth'))
+    if center is not None and width is not None and width >= 1:
+        low = center - 0.5 - (width - 1) / 2
+        high = center - 0.5 + (width - 1) / 2
+    else:
+        low, high = np.percentile(pixels, [0.5, 99.5])
+    scaled = np.clip((pixels - low) / max(high - low, 1e-6), 0.0, 1.0)
+
+    # MONOCHROME1 displays low values as white; invert to the MONOCHROME2 convention
+    if str(ds.get('PhotometricInterpretation', 'MONOCHROME2')).upper() == 'MONOCHROME1':
+        scaled = 1.0 - scaled
+
+    return (scaled * 255.0 + 0.5).astype(np.uint8)
+
+
+def decode_dicom(source: Union[str, bytes], target_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Decode a DICOM file to an RGB PIL image, resized to target_size if given"""
+    image = Image.fromarray(dicom_to_array(source, target_size)).convert('RGB')
+    if target_size is not None and image.size != tuple(target_size):
+        image = image.resize(target_size, Image.Resampling.LANCZOS)
+    return image
@@ -0,0 +1,267 @@
+"""
+Backbone feature store for ReluRay
+Caches pooled VGG16 activations so head-only model updates skip the backbone
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    from .append_log import file_lock, map_rows, read_new_lines, truncate_lines
+except ImportError:  # Imported from the backend directory (the API)
+    from append_log import file_lock, map_rows, read_new_lines, truncate_lines
+
+logger = logging.getLogger(__name__)
+
+FEATURES_FILE = 'features.f32'
+KEYS_FILE = 'keys.txt'
+LOCK_FILE = 'store.lock'
+INITIAL_CAPACITY = 1024
+MODEL_INPUT_SIZE = (224, 224)
+
+
+def content_hash(data: bytes) -> str:
+    """Hash raw image file bytes into a feature store key"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def backbone_fingerprint(backbone) -> str:
+    """Short, stable version string derived from the backbone weights"""
+    digest = hashlib.sha256()
+    for weight in backbone.get_weights():
+        digest.update(str(weight.shape).encode())
+        digest.update(np.ascontiguousarray(weight).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def split_backbone_head(model):
+    """
+    Split a model at its GlobalAveragePooling2D layer.
+    Returns (backbone, head) sharing the original weights, or None if the
+    model has no pooled feature layer (e.g. the original Flatten model).
+    """
+    from tensorflow.keras import Input, Model
+    from tensorflow.keras.layers import GlobalAveragePooling2D
+
+    pool_index = None
+    for i, layer in enumerate(model.layers):
+        if isinstance(layer, GlobalAveragePooling2D):
+            pool_index = i
+            break
+    if pool_index is None:
+        return None
+
+    pool_layer = model.layers[pool_index]
+    backbone = Model(inputs=model.inputs, outputs=pool_layer.output, name='backbone')
+
+    # Head layers after pooling form a simple chain, so re-apply them on a feature input
+    head_input = Input(shape=pool_layer.output.shape[1:], name='pooled_features')
+    x = head_input
+    for layer in model.layers[pool_index + 1:]:
+        x = layer(x)
+    head = Model(inputs=head_input, outputs=x, name='head')
+
+    return backbone, head
+
+
+def load_image_array(path: str, target_size=MODEL_INPUT_SIZE) -> np.ndarray:
+    """Load an image file the same way the API preprocesses uploads"""
+    with Image.open(path) as image:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image = image.resize(target_size, Image.Resampling.LANCZOS)
+        return np.asarray(image, dtype=np.float32) / 255.0
+
+
+class FeatureStore:
+    """
+    Append-only store of pooled backbone features.
+    Layout: <root>/<backbone_version>/features.f32 (memory-mapped float32 rows)
+    and keys.txt (one content hash per row, in row order).
+    Several processes may share a store: appends happen under an exclusive
+    file lock after catching up on rows other processes added, and lookups
+    that miss catch up before giving up.
+    """
+
+    def __init__(self, root: str, backbone_version: str, dim: int):
+        self.backbone_version = backbone_version
+        self.dim = int(dim)
+        self.directory = os.path.join(root, backbone_version)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._features_path = os.path.join(self.directory, FEATURES_FILE)
+        self._keys_path = os.path.join(self.directory, KEYS_FILE)
+        self._lock_path = os.path.join(self.directory, LOCK_FILE)
+        self._lock = threading.Lock()
+        self._index = {}
+        self._count = 0
+        self._keys_offset = 0  # bytes of keys.txt already indexed
+        self._features = None
+
+        with file_lock(self._lock_path):
+            self._load()
+
+    def _load(self):
+        """Open the feature file and rebuild the in-memory key index"""
+        row_bytes = self.dim * 4
+        stored_rows = 0
+        if os.path.exists(self._features_path):
+            stored_rows = os.path.getsize(self._features_path) // row_bytes
+
+        self._read_new_keys()
+        # Keys are appended after their features, so a crash can only leave extra rows
+        if self._count > stored_rows:
+            logger.warning(f"Feature store has {self._count} keys but {stored_rows} rows; truncating index")
+            self._keys_offset = truncate_lines(self._keys_path, stored_rows)
+            self._index = {key: row for key, row in self._index.items() if row < stored_rows}
+            self._count = stored_rows
+        self._open(max(stored_rows, INITIAL_CAPACITY))
+
+    def _read_new_keys(self):
+        """Index keys appended to keys.txt (by any process) since the last read"""
+        keys, self._keys_offset = read_new_lines(self._keys_path, self._keys_offset)
+        for key in keys:
+            if key:
+                self._index.setdefault(key, self._count)
+                self._count += 1
+
+    def _sync(self):
+        """Catch up on rows other processes appended (caller holds the file lock)"""
+        self._read_new_keys()
+        if self._count > self._features.shape[0]:
+            self._open(self._count)
+
+    def _open(self, capacity: int):
+        """(Re)map the feature file with room for `capacity` rows"""
+        if self._features is not None:
+            self._features.flush()
+            del self._features
+        self._features = map_rows(self._features_path, capacity, self.dim)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key: str):
+        return key in self._index
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached feature vector for `key`, or None"""
+        with self._lock:
+            if key not in self._index:
+                with file_lock(self._lock_path, exclusive=False):
+                    self._sync()
+            row = self._index.get(key)
+            if row is None:
+                return None
+            return np.array(self._features[row])
+
+    def get_many(self, keys: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up many keys at once.
+        Returns (features, missing) where rows listed in `missing` are zero-filled.
+        """
+        features = np.zeros((len(keys), self.dim), dtype=np.float32)
+        missing = []
+        with self._lock:
+            if any(key not in self._index for key in keys):
+                with file_lock(self._lock_path, exclusive=False):
+                    self._sync()
+            rows = []
+            positions = []
+            for i, key in enumerate(keys):
+                row = self._index.get(key)
+                if row is None:
+                    missing.append(i)
+                else:
+                    rows.append(row)
+                    positions.append(i)
+            if rows:
+                features[positions] = self._features[np.asarray(rows)]
+        return features, missing
+
+    def put(self, key: str, features: np.ndarray):
+        self.put_many([key], np.asarray(features).reshape(1, -1))
+
+    def put_many(self, keys: Sequence[str], features: np.ndarray):
+        """Append features for keys not already stored"""
+        features = np.asarray(features, dtype=np.float32).reshape(len(keys), self.dim)
+        with self._lock, file_lock(self._lock_path):
+            # Another process may have appended since we last looked; write after its rows
+            self._sync()
+            new_keys = []
+            new_rows = []
+            seen = set()
+            for key, vector in zip(keys, features):
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+
+            needed = self._count + len(new_keys)
+            if needed > self._features.shape[0]:
+                capacity = self._features.shape[0]
+                while capacity < needed:
+                    capacity *= 2
+                self._open(capacity)
+
+            self._features[self._count:needed] = np.stack(new_rows)
+            self._features.flush()
+            with open(self._keys_path, 'a') as f:
+                f.write(''.join(f"{key}\n" for key in new_keys))
+
+            # Index our own lines the same way as other processes' lines
+            self._read_new_keys()
+
+    def flush(self):
+        with self._lock:
+            self._features.flush()
+
+
+def open_feature_store(root: str, backbone) -> FeatureStore:
+    """Open the store for this backbone's weights version"""
+    return FeatureStore(root, backbone_fingerprint(backbone), backbone.output_shape[-1])
+
+
+def extract_features(backbone, paths: Sequence[str], store: FeatureStore,
+                     batch_size: int = 64, transform=None, variant: Optional[str] = None) -> np.ndarray:
+    """
+    Pooled backbone features for image files, running the backbone only for
+    images whose features are not in the store yet. Rows follow `paths`.
+    `transform` (e.g. an augmentation) is applied to each image batch before
+    the backbone; its outputs are stored under '<hash>#<variant>'.
+    """
+    suffix = f"#{variant}" if variant else ''
+    keys = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            keys.append(content_hash(f.read()) + suffix)
+
+    features, missing = store.get_many(keys)
+    logger.info(f"Feature store: {len(paths) - len(missing)} cached, {len(missing)} to compute")
+
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start:start + batch_size]
+        batch = np.stack([load_image_array(paths[i]) for i in chunk])
+        if transform is not None:
+            batch = np.asarray(transform(batch))
+        computed = backbone.predict(batch, verbose=0)
+        features[chunk] = computed
+        store.put_many([keys[i] for i in chunk], computed)
+
+    return features
+
+
+def predict_files(backbone, head, paths: Sequence[str], store: FeatureStore,
+                  batch_size: int = 64) -> np.ndarray:
+    """Score image files through the feature store. Returns head outputs in the order of `paths`."""
+    features = extract_features(backbone, paths, store, batch_size=batch_size)
+    return head.predict(features, batch_size=max(batch_size, 256), verbose=0)
@@ -0,0 +1,294 @@
+"""
+Similar-case retrieval index for ReluRay
+Nearest-neighbour search over pooled model embeddings (GlobalAveragePooling2D output)
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .append_log import file_lock, map_rows, read_new_lines, truncate_lines
+except ImportError:  # Imported from the backend directory (the API)
+    from append_log import file_lock, map_rows, read_new_lines, truncate_lines
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = 'vectors.f32'
+IDS_FILE = 'ids.txt'
+IVF_FILE = 'ivf.npz'
+META_FILE = 'meta.json'
+LOCK_FILE = 'index.lock'
+INITIAL_CAPACITY = 1024
+
+# Below this size exact search is fast enough and always accurate
+APPROXIMATE_MIN_VECTORS = 50_000
+DEFAULT_NPROBE = 16
+SEARCH_CHUNK_ROWS = 65_536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def train_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10,
+                 seed: int = 42) -> np.ndarray:
+    """Spherical k-means on normalized vectors; returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        # Re-seed empty clusters from random points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+class SimilarityIndex:
+    """
+    Memory-mapped cosine-similarity index with incremental adds.
+    Uses exact NumPy search for small collections and an inverted-file
+    (IVF) index with k-means coarse clusters once trained on larger ones.
+    Layout: vectors.f32 (normalized float32 rows), ids.txt (case id per row),
+    meta.json (dimension) and ivf.npz (centroids + row assignments) when trained.
+    Appends from several processes are serialized with a file lock, and each
+    process picks up rows the others added before appending or searching,
+    as well as centroids another process trained and saved since.
+    """
+
+    def __init__(self, directory: str, dim: Optional[int] = None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, VECTORS_FILE)
+        self._ids_path = os.path.join(directory, IDS_FILE)
+        self._ivf_path = os.path.join(directory, IVF_FILE)
+        self._meta_path = os.path.join(directory, META_FILE)
+        self._lock_path = os.path.join(directory, LOCK_FILE)
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._ids = []
+        self._ids_offset = 0  # bytes of ids.txt already read
+        self._centroids = None
+        self._ivf_mtime = None  # ivf.npz version the centroids came from
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists = []
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r') as f:
+                stored_dim = json.load(f)['dim']
+            if dim is not None and dim != stored_dim:
+                raise ValueError(f"Index dimension is {stored_dim}, got {dim}")
+            dim = stored_dim
+        elif dim is None:
+            raise ValueError(f"No index found in {directory}; a dimension is required to create one")
+        else:
+            with open(self._meta_path, 'w') as f:
+                json.dump({'dim': int(dim), 'metric': 'cosine'}, f)
+        self.dim = int(dim)
+
+        with file_lock(self._lock_path):
+            self._load()
+
+    def _load(self):
+        row_bytes = self.dim * 4
+        stored_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        self._read_new_ids()
+        if len(self._ids) > stored_rows:
+            # Ids are appended after their vectors, so only a crash leaves extra ids
+            logger.warning(f"Similarity index has {len(self._ids)} ids but {stored_rows} rows; truncating ids")
+            self._ids_offset = truncate_lines(self._ids_path, stored_rows)
+            self._ids = self._ids[:stored_rows]
+        self._open(max(stored_rows, INITIAL_CAPACITY))
+        self._load_ivf()
+
+    def _saved_ivf_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._ivf_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_ivf(self):
+        """Load the saved centroids and row assignments, if any (caller holds the file lock)"""
+        self._ivf_mtime = self._saved_ivf_mtime()
+        if self._ivf_mtime is None:
+            return
+        ivf = np.load(self._ivf_path)
+        self._centroids = ivf['centroids']
+        assignments = ivf['assignments'][:len(self._ids)]
+        # Rows added after the last save are assigned now
+        if len(assignments) < len(self._ids):
+            extra = self._assign(self._vectors[len(assignments):len(self._ids)])
+            assignments = np.concatenate([assignments, extra])
+        self._set_assignments(assignments)
+
+    def _read_new_ids(self):
+        """Read ids appended to ids.txt (by any process) since the last read"""
+        ids, self._ids_offset = read_new_lines(self._ids_path, self._ids_offset)
+        self._ids.extend(ids)
+
+    def _sync(self):
+        """Catch up on rows and centroids other processes saved (caller holds the file lock)"""
+        start = len(self._ids)
+        self._read_new_ids()
+        if len(self._ids) > self._vectors.shape[0]:
+            self._open(len(self._ids))
+        if self._saved_ivf_mtime() != self._ivf_mtime:
+            # Retrained elsewhere: the new centroids replace ours and cover every row
+            self._load_ivf()
+        elif self._centroids is not None and len(self._ids) > start:
+            self._extend_assignments(start)
+
+    def _changed_on_disk(self) -> bool:
+        return ((os.path.exists(self._ids_path) and os.path.getsize(self._ids_path) != self._ids_offset)
+                or self._saved_ivf_mtime() != self._ivf_mtime)
+
+    def _open(self, capacity: int):
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        self._vectors = map_rows(self._vectors_path, capacity, self.dim)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def is_approximate(self) -> bool:
+        return self._centroids is not None
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), SEARCH_CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + SEARCH_CHUNK_ROWS])
+            assignments[start:start + len(chunk)] = np.argmax(chunk @ self._centroids.T, axis=1)
+        return assignments
+
+    def _set_assignments(self, assignments: np.ndarray):
+        self._assignments = assignments.astype(np.int32)
+        order = np.argsort(self._assignments, kind='stable')
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def _extend_assignments(self, start: int):
+        """Assign rows from `start` on to their IVF lists"""
+        new_assignments = self._assign(self._vectors[start:len(self._ids)])
+        self._assignments = np.concatenate([self._assignments, new_assignments])
+        for cluster in np.unique(new_assignments):
+            rows = start + np.flatnonzero(new_assignments == cluster)
+            self._lists[cluster] = np.concatenate([self._lists[cluster], rows])
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """Append vectors (normalized on the way in) with their case ids"""
+        vectors = normalize(np.asarray(vectors).reshape(len(ids), self.dim))
+        with self._lock, file_lock(self._lock_path):
+            # Write after any rows another process appended since we last looked
+            self._sync()
+            start = len(self._ids)
+            needed = start + len(ids)
+            if needed > self._vectors.shape[0]:
+                capacity = self._vectors.shape[0]
+                while capacity < needed:
+                    capacity *= 2
+                self._open(capacity)
+
+            self._vectors[start:needed] = vectors
+            self._vectors.flush()
+            with open(self._ids_path, 'a') as f:
+                f.write(''.join(f"{case_id}\n" for case_id in ids))
+            self._read_new_ids()
+
+            if self._centroids is not None:
+                self._extend_assignments(start)
+
+    def train(self, n_clusters: Optional[int] = None, sample_size: int = 100_000, seed: int = 42):
+        """Build the approximate (IVF) index over the current vectors"""
+        with self._lock:
+            with file_lock(self._lock_path, exclusive=False):
+                self._sync()
+            count = len(self._ids)
+            if count == 0:
+                logger.warning("Similarity index is empty; nothing to train")
+                return
+            if n_clusters is None:
+                n_clusters = max(1, min(4096, int(4 * np.sqrt(count))))
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(count, min(sample_size, count), replace=False))
+            # k-means seeds its centroids from distinct sample rows
+            n_clusters = min(n_clusters, len(sample_rows))
+            self._centroids = train_kmeans(np.asarray(self._vectors[sample_rows]), n_clusters, seed=seed)
+            self._set_assignments(self._assign(self._vectors[:count]))
+        logger.info(f"Similarity index trained: {count} vectors in {n_clusters} clusters")
+
+    def save(self):
+        """Persist IVF state (vectors and ids are written on every add)"""
+        with self._lock, file_lock(self._lock_path):
+            self._vectors.flush()
+            if self._centroids is not None:
+                tmp_path = self._ivf_path + '.tmp.npz'
+                np.savez(tmp_path, centroids=self._centroids, assignments=self._assignments)
+                os.replace(tmp_path, self._ivf_path)
+                self._ivf_mtime = self._saved_ivf_mtime()
+
+    def search(self, query: np.ndarray, k: int = 5, exact: Optional[bool] = None,
+               nprobe: int = DEFAULT_NPROBE) -> List[Tuple[str, float]]:
+        """
+        Return up to k (case_id, cosine distance) pairs, nearest first.
+        Exact search is used for small indexes or when `exact=True`.
+        """
+        query = normalize(np.asarray(query).reshape(self.dim))
+        with self._lock:
+            if self._changed_on_disk():
+                with file_lock(self._lock_path, exclusive=False):
+                    self._sync()
+            count = len(self._ids)
+            if count == 0:
+                return []
+            if exact is None:
+                exact = not self.is_approximate or count < APPROXIMATE_MIN_VECTORS
+
+            if exact:
+                scores = np.empty(count, dtype=np.float32)
+                for start in range(0, count, SEARCH_CHUNK_ROWS):
+                    end = min(start + SEARCH_CHUNK_ROWS, count)
+                    scores[start:end] = self._vectors[start:end] @ query
+                rows = _top_k(scores, k)
+                best = scores[rows]
+            else:
+                probes = _top_k(self._centroids @ query, nprobe)
+                candidates = np.sort(np.concatenate([self._lists[c] for c in probes]))
+                if len(candidates) == 0:
+                    return []
+                candidate_scores = self._vectors[candidates] @ query
+                top = _top_k(candidate_scores, k)
+                rows = candidates[top]
+                best = candidate_scores[top]
+
+            return [(self._ids[row], float(1.0 - score)) for row, score in zip(rows, best)]
+
+    def near_duplicates(self, vectors: np.ndarray, threshold: float = 0.01) -> List[Optional[Tuple[str, float]]]:
+        """For each vector, the closest existing case if within `threshold` cosine distance"""
+        matches = []
+        for vector in np.asarray(vectors).reshape(-1, self.dim):
+            hits = self.search(vector, k=1)
+            matches.append(hits[0] if hits and hits[0][1] <= threshold else None)
+        return matches
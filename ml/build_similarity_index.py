@@ -0,0 +1,72 @@
+"""
+Similarity Index Builder for ReluRay
+Embeds every image under a directory with the improved model's pooled
+features and adds it to the similar-case index, reporting near-duplicates.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from tensorflow.keras.models import load_model
+from backend.feature_store import extract_features, open_feature_store, split_backbone_head
+from backend.similarity_index import APPROXIMATE_MIN_VECTORS, SimilarityIndex
+from ml.rescore_archive import find_images
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add images to the similar-case retrieval index')
+    parser.add_argument('image_dir', help='Directory of images to index')
+    parser.add_argument('--model', default=os.path.join(base_dir, 'best_model_improved.keras'))
+    parser.add_argument('--index', default=os.path.join(base_dir, 'data', 'similarity_index'))
+    parser.add_argument('--feature-store', default=os.path.join(base_dir, 'data', 'feature_store'))
+    parser.add_argument('--duplicate-threshold', type=float, default=0.01,
+                        help='Cosine distance at or below which an image is reported as a near-duplicate')
+    parser.add_argument('--skip-duplicates', action='store_true', help='Do not index near-duplicates')
+    parser.add_argument('--train', action='store_true',
+                        help=f'(Re)train the approximate index (automatic from {APPROXIMATE_MIN_VECTORS} vectors)')
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"📦 Loading model: {args.model}")
+    split = split_backbone_head(load_model(args.model))
+    if split is None:
+        print("❌ Model has no GlobalAveragePooling2D layer; cannot extract embeddings")
+        return
+    backbone, _ = split
+
+    store = open_feature_store(args.feature_store, backbone)
+    index = SimilarityIndex(args.index, dim=backbone.output_shape[-1])
+    print(f"🗂️  Index: {args.index} ({len(index)} cases)")
+
+    paths = find_images(args.image_dir)
+    print(f"🔍 Found {len(paths)} images in {args.image_dir}")
+    embeddings = extract_features(backbone, paths, store, batch_size=args.batch_size)
+    case_ids = [os.path.relpath(path, args.image_dir) for path in paths]
+
+    duplicates = index.near_duplicates(embeddings, threshold=args.duplicate_threshold)
+    duplicate_count = 0
+    for case_id, match in zip(case_ids, duplicates):
+        if match is not None:
+            duplicate_count += 1
+            print(f"   ⚠️  Near-duplicate: {case_id} ~ {match[0]} (distance {match[1]:.4f})")
+    print(f"   {duplicate_count} near-duplicates of already indexed cases")
+
+    keep = [i for i, match in enumerate(duplicates) if not (args.skip_duplicates and match is not None)]
+    index.add([case_ids[i] for i in keep], embeddings[keep])
+    print(f"✅ Added {len(keep)} cases (index size: {len(index)})")
+
+    if args.train or (not index.is_approximate and len(index) >= APPROXIMATE_MIN_VECTORS):
+        print("🏗️  Training approximate index...")
+        index.train()
+    index.save()
+
+
+if __name__ == '__main__':
+    main()
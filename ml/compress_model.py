@@ -0,0 +1,111 @@
+"""
+Model Compression for ReluRay
+Prunes the lowest-L1 convolution filters of the trained model, fine-tunes
+the smaller network, clusters its weights and exports a compressed .keras
+artifact. The artifact is only kept if its data/val accuracy stays within
+--max-accuracy-drop of the original; a size / load time / RSS / latency
+report against the original is printed and saved either way.
+
+Usage:
+    python3 ml/compress_model.py [--keep-ratio 0.5] [--clusters 32] [--fine-tune-epochs 5]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.models import load_model
+
+from ml.src.compression import cluster_weights, compile_like_improved, prune_filters, save_compressed
+from ml.src.dataset_index import load_or_build_index
+from ml.src.model_report import print_comparison, profile_model, save_report
+from ml.src.model_training_improved import calculate_class_weights
+from ml.src.tensor_cache import TensorCacheSequence, ensure_tensor_cache
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prune, cluster and compress the trained model')
+    parser.add_argument('--model', default=os.path.join(base_dir, 'best_model_improved.keras'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'best_model_compressed.keras'))
+    parser.add_argument('--keep-ratio', type=float, default=0.5, help='Fraction of conv filters to keep')
+    parser.add_argument('--skip-layers', default='block1_conv1',
+                        help='Comma-separated conv layers left unpruned')
+    parser.add_argument('--clusters', type=int, default=32, help='Shared values per kernel (0 disables clustering)')
+    parser.add_argument('--fine-tune-epochs', type=int, default=5)
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help='Largest data/val accuracy loss accepted for the artifact')
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--tensor-cache', default=os.path.join(base_dir, 'data', 'tensor_cache'))
+    parser.add_argument('--report', default=os.path.join(base_dir, 'ml', 'logs', 'compression_report.json'))
+    args = parser.parse_args()
+    if not 0 < args.keep_ratio <= 1:
+        parser.error('--keep-ratio must be in (0, 1]')
+
+    print("🔬 ReluRay Model Compression")
+    print("=" * 60)
+    print(f"📦 Model: {args.model}")
+    print(f"✂️  Keeping {args.keep_ratio:.0%} of conv filters, "
+          f"{f'{args.clusters} clusters per kernel' if args.clusters else 'no clustering'}")
+
+    ensure_tensor_cache(load_or_build_index(args.data_dir), args.tensor_cache, splits=('train', 'val'))
+    train = TensorCacheSequence(args.tensor_cache, 'train', batch_size=args.batch_size, shuffle=True)
+    val = TensorCacheSequence(args.tensor_cache, 'val', batch_size=args.batch_size)
+
+    model = load_model(args.model)
+    pruned = compile_like_improved(
+        prune_filters(model, args.keep_ratio, skip_layers=[name for name in args.skip_layers.split(',') if name]),
+        learning_rate=args.learning_rate
+    )
+    print(f"   Parameters: {model.count_params():,} -> {pruned.count_params():,}")
+    del model
+
+    print("\n🔧 Fine-tuning the pruned model...")
+    pruned.fit(
+        train,
+        epochs=args.fine_tune_epochs,
+        validation_data=val,
+        class_weight=calculate_class_weights(train),
+        callbacks=[EarlyStopping(monitor='val_loss', patience=2, restore_best_weights=True, verbose=1)]
+    )
+    if args.clusters:
+        # After fine-tuning, so training doesn't pull the shared values apart again
+        print(f"\n🧮 Clustering weights into {args.clusters} values per kernel...")
+        cluster_weights(pruned, args.clusters)
+
+    candidate_path = os.path.splitext(args.output)[0] + '.candidate.keras'
+    save_compressed(pruned, candidate_path)
+    del pruned
+
+    print("\n🧪 Benchmarking on data/val...")
+    reports = {
+        'original': profile_model(args.model, val),
+        'compressed': profile_model(candidate_path, val),
+    }
+    print("\n📊 Original vs compressed")
+    print_comparison(reports, baseline='original')
+
+    drop = reports['original']['accuracy'] - reports['compressed']['accuracy']
+    reports['accepted'] = drop <= args.max_accuracy_drop
+    save_report(args.report, reports)
+    print(f"\n📄 Report saved to: {args.report}")
+
+    if not reports['accepted']:
+        os.remove(candidate_path)
+        print(f"❌ Validation accuracy dropped by {drop:.4f} (limit {args.max_accuracy_drop:.4f}); "
+              f"artifact discarded. Try a higher --keep-ratio, more --clusters or more --fine-tune-epochs.")
+        sys.exit(1)
+    os.replace(candidate_path, args.output)
+    print(f"✅ Validation accuracy change {-drop:+.4f} is within the limit; saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Dataset Deduplication Script for ReluRay
+Finds near-duplicate images across data/train, data/val and data/test with
+perceptual hashes, reports cross-split leakage and optionally removes copies.
+Removed images are recorded in data/dedupe_exclusions.txt, which
+scripts/preprocess_covid19.py honours on later runs.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.dedupe import (
+    DEFAULT_MAX_DISTANCE, EXCLUSIONS_FILENAME, compute_hashes, find_leakage,
+    group_near_duplicates, remove_duplicates, select_removals
+)
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect near-duplicates and split leakage')
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--max-distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help='Max Hamming distance between 64-bit hashes to count as duplicates')
+    parser.add_argument('--workers', type=int, default=1, help='Processes for decoding (0 = all cores)')
+    parser.add_argument('--remove', choices=['leakage', 'all'], default=None,
+                        help='Delete duplicates: only groups spanning splits, or every group')
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    print("🔬 ReluRay Near-duplicate Detection")
+    print("=" * 60)
+    index = load_or_build_index(args.data_dir)
+    print(f"🗂️  {len(index)} images indexed")
+
+    print("🔑 Computing perceptual hashes...")
+    hashes = compute_hashes(index.paths, workers=workers)
+
+    groups = group_near_duplicates(hashes, max_distance=args.max_distance)
+    leaking = find_leakage(groups, index.splits)
+    duplicates = sum(len(group) - 1 for group in groups)
+
+    print(f"\n📊 {len(groups)} near-duplicate groups ({duplicates} redundant images)")
+    print(f"   ⚠️  {len(leaking)} groups span more than one split")
+    for group in leaking[:20]:
+        print("   - " + ", ".join(f"{index.splits[i]}:{os.path.basename(index.paths[i])}" for i in group))
+    if len(leaking) > 20:
+        print(f"   ... and {len(leaking) - 20} more")
+
+    if args.remove:
+        targets = leaking if args.remove == 'leakage' else groups
+        removals = select_removals(targets, index.splits, index.paths)
+        remove_duplicates(args.data_dir, [index.paths[i] for i in removals])
+        print(f"\n🧹 Removed {len(removals)} duplicate images "
+              f"(listed in {EXCLUSIONS_FILENAME}, so preprocessing won't recreate them)")
+        load_or_build_index(args.data_dir, rebuild=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Knowledge Distillation for ReluRay
+Distills best_model_improved.keras into a compact student for CPU serving
+and reports size, load time, latency and test metrics against the teacher.
+
+Usage:
+    python3 ml/distill.py [--student mobilenet|cnn] [--temperature 4] [--alpha 0.3]
+
+Serve the student by setting MODEL_VERSION=student (the backend loads
+best_model_<MODEL_VERSION>.keras).
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from tensorflow.keras.models import load_model
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.distillation import STUDENT_ARCHITECTURES, build_student, distill
+from ml.src.model_report import print_comparison, profile_model, save_report
+from ml.src.tensor_cache import TensorCacheSequence, ensure_tensor_cache
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Distill the improved model into a compact student')
+    parser.add_argument('--teacher', default=os.path.join(base_dir, 'best_model_improved.keras'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'best_model_student.keras'))
+    parser.add_argument('--student', choices=STUDENT_ARCHITECTURES, default='mobilenet')
+    parser.add_argument('--temperature', type=float, default=4.0, help='Softening temperature for the targets')
+    parser.add_argument('--alpha', type=float, default=0.3, help='Weight of the hard-label loss')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--tensor-cache', default=os.path.join(base_dir, 'data', 'tensor_cache'))
+    parser.add_argument('--report', default=os.path.join(base_dir, 'ml', 'logs', 'distillation_report.json'))
+    args = parser.parse_args()
+
+    print("🔬 ReluRay Knowledge Distillation")
+    print("=" * 60)
+    print(f"🧑‍🏫 Teacher: {args.teacher}")
+    print(f"🧑‍🎓 Student: {args.student} (T={args.temperature}, alpha={args.alpha})")
+
+    ensure_tensor_cache(load_or_build_index(args.data_dir), args.tensor_cache)
+
+    teacher = load_model(args.teacher)
+    student = build_student(args.student)
+    print(f"   Parameters: teacher {teacher.count_params():,}, student {student.count_params():,}")
+
+    distill(teacher, student, args.tensor_cache, epochs=args.epochs, batch_size=args.batch_size,
+            temperature=args.temperature, alpha=args.alpha)
+    print(f"\n💾 Saving student to: {args.output}")
+    student.save(args.output)
+    del teacher, student
+
+    print("\n🧪 Comparing on the test split...")
+    test = TensorCacheSequence(args.tensor_cache, 'test', batch_size=args.batch_size)
+    reports = {
+        'teacher': profile_model(args.teacher, test),
+        'student': profile_model(args.output, test),
+    }
+    print("\n📊 Teacher vs student")
+    print_comparison(reports, baseline='teacher')
+    save_report(args.report, reports)
+    print(f"\n📄 Report saved to: {args.report}")
+    name = os.path.basename(args.output)
+    if name.startswith('best_model_') and name.endswith('.keras'):
+        print(f"🚀 Serve it with MODEL_VERSION={name[len('best_model_'):-len('.keras')]}")
+
+
+if __name__ == '__main__':
+    main()
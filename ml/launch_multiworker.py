@@ -0,0 +1,50 @@
+"""
+Local Multi-worker Launcher for ReluRay
+Starts N train_improved.py --distributed processes on this machine, each with
+its own TF_CONFIG, and splits the CPU cores between them. On a real cluster
+set TF_CONFIG on each host and run train_improved.py --distributed directly.
+
+Usage:
+    python3 ml/launch_multiworker.py --workers 2 [train_improved.py args...]
+"""
+
+import sys
+import os
+import argparse
+import subprocess
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from ml.src.distributed import local_cluster, worker_tf_config
+
+TRAIN_SCRIPT = os.path.join(parent_dir, 'ml', 'train_improved.py')
+
+
+def launch(script, num_workers, script_args, base_port=None):
+    """Run num_workers copies of script as one cluster; returns the worst exit code"""
+    cluster = local_cluster(num_workers, base_port)
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ,
+                   TF_CONFIG=worker_tf_config(cluster, index),
+                   TF_NUM_INTRAOP_THREADS=str(threads))
+        processes.append(subprocess.Popen([sys.executable, script, *script_args], env=env))
+    return max(process.wait() for process in processes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run multi-worker training as local processes')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2)')
+    parser.add_argument('--base-port', type=int, default=None, help='First worker port (default: free ports)')
+    args, train_args = parser.parse_known_args()
+
+    print(f"🚀 Launching {args.workers} local workers")
+    code = launch(TRAIN_SCRIPT, args.workers, ['--distributed', *train_args], args.base_port)
+    sys.exit(code)
+
+
+if __name__ == '__main__':
+    main()
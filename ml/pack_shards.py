@@ -0,0 +1,41 @@
+"""
+Shard Packing Script for ReluRay
+Packs data/train, data/val and data/test into TFRecord shards for training.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.shards import DEFAULT_SHARD_SIZE, pack_dataset
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack dataset splits into TFRecord shards')
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'data', 'shards'))
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='Records per shard')
+    args = parser.parse_args()
+
+    print("🔬 ReluRay Shard Packing")
+    print("=" * 60)
+    index = load_or_build_index(args.data_dir)
+    print(f"🗂️  {len(index)} images indexed in {args.data_dir}")
+
+    manifest = pack_dataset(index, args.output, shard_size=args.shard_size)
+
+    print("\n" + "=" * 60)
+    print(f"✅ Shards written to {args.output}")
+    for split, shards in manifest['splits'].items():
+        print(f"   {split}: {sum(s['records'] for s in shards)} records in {len(shards)} shards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+int8 Quantization for ReluRay
+Quantizes the trained model to a full-integer TFLite model calibrated on a
+data/val subset, then evaluates it against the float model on data/test
+with the evaluate_model metrics. The int8 artifact is only written when its
+AUC and recall stay within the configured tolerances of the float model.
+
+Usage:
+    python3 ml/quantize_model.py [--calibration-size 200] [--max-auc-drop 0.01] [--max-recall-drop 0.01]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from tensorflow.keras.models import load_model
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.model_report import print_comparison, profile_model, save_report
+from ml.src.quantization import TFLiteModel, calibration_subset, quantize_int8
+from ml.src.tensor_cache import TensorCacheSequence, ensure_tensor_cache
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrated int8 post-training quantization')
+    parser.add_argument('--model', default=os.path.join(base_dir, 'best_model_improved.keras'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'best_model_int8.tflite'))
+    parser.add_argument('--calibration-size', type=int, default=200, help='Validation images used for calibration')
+    parser.add_argument('--max-auc-drop', type=float, default=0.01, help='Largest test AUC loss accepted')
+    parser.add_argument('--max-recall-drop', type=float, default=0.01, help='Largest test recall loss accepted')
+    parser.add_argument('--threads', type=int, default=None, help='TFLite interpreter threads')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--tensor-cache', default=os.path.join(base_dir, 'data', 'tensor_cache'))
+    parser.add_argument('--report', default=os.path.join(base_dir, 'ml', 'logs', 'quantization_report.json'))
+    args = parser.parse_args()
+
+    print("🔬 ReluRay int8 Quantization")
+    print("=" * 60)
+    print(f"📦 Model: {args.model}")
+
+    ensure_tensor_cache(load_or_build_index(args.data_dir), args.tensor_cache, splits=('val', 'test'))
+
+    print(f"\n🎯 Calibrating on {args.calibration_size} validation images...")
+    calibration = calibration_subset(args.tensor_cache, 'val', args.calibration_size, args.seed)
+    flatbuffer = quantize_int8(load_model(args.model), calibration)
+
+    candidate_path = args.output + '.candidate'
+    with open(candidate_path, 'wb') as f:
+        f.write(flatbuffer)
+
+    print("\n🧪 Evaluating float vs int8 on data/test...")
+    test = TensorCacheSequence(args.tensor_cache, 'test', batch_size=64)
+    reports = {
+        'float': profile_model(args.model, test),
+        'int8': profile_model(candidate_path, test,
+                              load_fn=lambda path: TFLiteModel(path, num_threads=args.threads)),
+    }
+    print("\n📊 Float vs int8")
+    print_comparison(reports, baseline='float')
+
+    auc_drop = reports['float']['auc'] - reports['int8']['auc']
+    recall_drop = reports['float']['recall'] - reports['int8']['recall']
+    failures = []
+    if auc_drop > args.max_auc_drop:
+        failures.append(f"AUC dropped by {auc_drop:.4f} (limit {args.max_auc_drop:.4f})")
+    if recall_drop > args.max_recall_drop:
+        failures.append(f"recall dropped by {recall_drop:.4f} (limit {args.max_recall_drop:.4f})")
+    reports['accepted'] = not failures
+    save_report(args.report, reports)
+    print(f"\n📄 Report saved to: {args.report}")
+
+    if failures:
+        os.remove(candidate_path)
+        print(f"❌ int8 model refused: {'; '.join(failures)}. Try a larger --calibration-size.")
+        sys.exit(1)
+    os.replace(candidate_path, args.output)
+    print(f"✅ AUC {-auc_drop:+.4f}, recall {-recall_drop:+.4f} within tolerance; saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Archive Re-scoring Script for ReluRay
+Scores every image under a directory using the backbone feature store,
+so after a head-only model update only the dense head has to run.
+"""
+
+import sys
+import os
+import csv
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from tensorflow.keras.models import load_model
+from backend.feature_store import open_feature_store, predict_files, split_backbone_head
+from ml.src.dataset_index import scan_images
+
+base_dir = parent_dir
+
+
+def find_images(archive_dir):
+    """Collect image paths under archive_dir in a stable order"""
+    return [path for path, _ in scan_images(archive_dir, extensions={'.png', '.jpg', '.jpeg'})]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score an image archive using cached backbone features')
+    parser.add_argument('archive_dir', help='Directory of images to score')
+    parser.add_argument('--model', default=os.path.join(base_dir, 'best_model_improved.keras'))
+    parser.add_argument('--feature-store', default=os.path.join(base_dir, 'data', 'feature_store'))
+    parser.add_argument('--output', default='scores.csv')
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"📦 Loading model: {args.model}")
+    model = load_model(args.model)
+    split = split_backbone_head(model)
+    if split is None:
+        print("❌ Model has no GlobalAveragePooling2D layer; feature store not supported")
+        return
+    backbone, head = split
+
+    store = open_feature_store(args.feature_store, backbone)
+    print(f"🗂️  Feature store: {store.directory} ({len(store)} cached vectors)")
+
+    paths = find_images(args.archive_dir)
+    print(f"🔍 Found {len(paths)} images in {args.archive_dir}")
+
+    scores = predict_files(backbone, head, paths, store, batch_size=args.batch_size)
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['path', 'score', 'prediction'])
+        for path, score in zip(paths, scores[:, 0]):
+            writer.writerow([path, f"{score:.6f}", 'Pneumonia' if score > 0.5 else 'Normal'])
+
+    print(f"✅ Wrote {len(paths)} scores to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
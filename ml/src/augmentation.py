@@ -0,0 +1,136 @@
+"""
+Batched Augmentation for ReluRay
+Re-implements the ImageDataGenerator policy in AUGMENTATION_CONFIG as one
+vectorized layer: rotation, shifts, shear, zoom and flips are composed into a
+single affine matrix per image and applied to the whole batch with one
+projective warp, followed by channel shift and brightness as tensor ops.
+Runs inside a tf.data map or as the first layer of a model.
+"""
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Layer
+
+from ml.src.data_preprocessing import AUGMENTATION_CONFIG
+
+FILL_MODES = {'nearest': 'NEAREST', 'constant': 'CONSTANT', 'reflect': 'REFLECT', 'wrap': 'WRAP'}
+
+
+def _matrices(rows):
+    """(N, 3, 3) homogeneous matrices from three (a, b, c) rows of (N,) tensors"""
+    n = tf.shape(rows[0][0])[0]
+    last = tf.stack([tf.zeros([n]), tf.zeros([n]), tf.ones([n])], axis=-1)
+    return tf.stack([tf.stack(row, axis=-1) for row in rows] + [last], axis=1)
+
+
+def _zoom_bounds(zoom_range):
+    if np.isscalar(zoom_range):
+        return 1.0 - zoom_range, 1.0 + zoom_range
+    return float(zoom_range[0]), float(zoom_range[1])
+
+
+class BatchAugmentation(Layer):
+    """
+    ImageDataGenerator-equivalent augmentation for a batch of [0, 1] images.
+    Only active when called with training=True; config defaults to
+    AUGMENTATION_CONFIG.
+    """
+
+    def __init__(self, config=None, seed=42, **kwargs):
+        # Input-side op: stays float32 even under a mixed-precision policy
+        kwargs.setdefault('dtype', 'float32')
+        super().__init__(**kwargs)
+        self.config = dict(AUGMENTATION_CONFIG if config is None else config)
+        self.seed = seed
+
+    def _uniform(self, n, low, high, salt):
+        return tf.random.uniform([n], low, high, seed=self.seed + salt)
+
+    def _transforms(self, n, height, width):
+        """Output -> input pixel mappings, flattened for ImageProjectiveTransformV3"""
+        cfg = self.config
+        zeros, ones = tf.zeros([n]), tf.ones([n])
+
+        rotation = cfg.get('rotation_range', 0)
+        theta = self._uniform(n, -rotation, rotation, 1) * (np.pi / 180)
+        height_shift = cfg.get('height_shift_range', 0)
+        width_shift = cfg.get('width_shift_range', 0)
+        tx = self._uniform(n, -height_shift, height_shift, 2) * height
+        ty = self._uniform(n, -width_shift, width_shift, 3) * width
+        shear_range = cfg.get('shear_range', 0)  # degrees, as in ImageDataGenerator
+        shear = self._uniform(n, -shear_range, shear_range, 4) * (np.pi / 180)
+        zoom_low, zoom_high = _zoom_bounds(cfg.get('zoom_range', 0))
+        zx = self._uniform(n, zoom_low, zoom_high, 5)
+        zy = self._uniform(n, zoom_low, zoom_high, 6)
+
+        # Same composition as ImageDataGenerator, in (row, col) coordinates
+        matrix = (
+            _matrices([(tf.cos(theta), -tf.sin(theta), zeros), (tf.sin(theta), tf.cos(theta), zeros)])
+            @ _matrices([(ones, zeros, tx), (zeros, ones, ty)])
+            @ _matrices([(ones, -tf.sin(shear), zeros), (zeros, tf.cos(shear), zeros)])
+            @ _matrices([(zx, zeros, zeros), (zeros, zy, zeros)])
+        )
+        # Rotate / shear / zoom about the image centre
+        centre_row, centre_col = ones * (height / 2 - 0.5), ones * (width / 2 - 0.5)
+        matrix = (
+            _matrices([(ones, zeros, centre_row), (zeros, ones, centre_col)])
+            @ matrix
+            @ _matrices([(ones, zeros, -centre_row), (zeros, ones, -centre_col)])
+        )
+        # (row, col) -> (x, y) as expected by the image transform op
+        swap = tf.constant([[0., 1., 0.], [1., 0., 0.], [0., 0., 1.]])
+        matrix = swap @ matrix @ swap
+
+        if cfg.get('horizontal_flip'):
+            flip = self._uniform(n, 0.0, 1.0, 7) < 0.5
+            sign = tf.where(flip, -ones, ones)
+            matrix = matrix @ _matrices([(sign, zeros, tf.where(flip, width - 1, zeros)), (zeros, ones, zeros)])
+        if cfg.get('vertical_flip'):
+            flip = self._uniform(n, 0.0, 1.0, 8) < 0.5
+            sign = tf.where(flip, -ones, ones)
+            matrix = matrix @ _matrices([(ones, zeros, zeros), (zeros, sign, tf.where(flip, height - 1, zeros))])
+
+        return tf.reshape(matrix, [n, 9])[:, :8]
+
+    def call(self, images, training=None):
+        if not training:
+            return images
+        images = tf.convert_to_tensor(images, dtype=tf.float32)
+        shape = tf.shape(images)
+        n = shape[0]
+        height, width = tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32)
+
+        images = tf.raw_ops.ImageProjectiveTransformV3(
+            images=images,
+            transforms=self._transforms(n, height, width),
+            output_shape=shape[1:3],
+            fill_value=float(self.config.get('cval', 0.0)),
+            interpolation='BILINEAR',
+            fill_mode=FILL_MODES[self.config.get('fill_mode', 'nearest')]
+        )
+
+        # channel_shift_range is in 0-255 pixel units; these images are in [0, 1]
+        channel_shift = self.config.get('channel_shift_range', 0) / 255.0
+        if channel_shift:
+            intensity = tf.reshape(self._uniform(n, -channel_shift, channel_shift, 9), [-1, 1, 1, 1])
+            low = tf.reduce_min(images, axis=[1, 2, 3], keepdims=True)
+            high = tf.reduce_max(images, axis=[1, 2, 3], keepdims=True)
+            images = tf.clip_by_value(images + intensity, low, high)
+
+        brightness_range = self.config.get('brightness_range')
+        if brightness_range is not None:
+            factor = self._uniform(n, brightness_range[0], brightness_range[1], 10)
+            images = tf.clip_by_value(images * tf.reshape(factor, [-1, 1, 1, 1]), 0.0, 1.0)
+
+        return images
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'config': self.config, 'seed': self.seed})
+        return config
+
+
+def augment_batches(config=None, seed=42):
+    """(images, labels) -> (augmented images, labels), for directory_dataset(augment=...)"""
+    layer = BatchAugmentation(config, seed)
+    return lambda images, labels: (layer(images, training=True), labels)
@@ -0,0 +1,260 @@
+"""
+Resumable Training Checkpoints for ReluRay
+Every N steps (and at each epoch end) saves model weights, optimizer slots,
+learning rate, EarlyStopping / ReduceLROnPlateau / ModelCheckpoint state,
+RNG state and the input position, rotating old checkpoints so disk use stays
+bounded. A restored run continues from the saved epoch and batch. tf.data
+inputs are read through one iterator whose position is saved at the start of
+each epoch and replayed up to the saved batch on restore, so they continue
+the same shuffle order rather than starting a fresh one.
+"""
+
+import os
+import glob
+import pickle
+import random
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.utils import Sequence
+
+STATE_PREFIX = 'state-'
+DATA_PREFIX = 'data-'
+# Counters Keras callbacks reset in on_train_begin and that must survive a restart
+CALLBACK_STATE_ATTRS = ('wait', 'best', 'best_epoch', 'stopped_epoch', 'cooldown_counter')
+
+
+def _data_state(data, batches_seen):
+    """Sample order and augmentation position of a Sequence input, if it has one"""
+    if hasattr(data, 'get_state'):
+        return data.get_state()
+    if hasattr(data, 'index_array'):
+        # DirectoryIterator: per-epoch order plus the counter its augmentation seed derives from
+        return {'index_array': data.index_array, 'total_batches_seen': batches_seen}
+    return None
+
+
+def _restore_data_state(data, state):
+    if state is None:
+        return
+    if hasattr(data, 'set_state'):
+        data.set_state(state)
+    elif hasattr(data, 'index_array'):
+        data.index_array = state['index_array']
+        data.total_batches_seen = state['total_batches_seen']
+
+
+class ResumedEpoch(Sequence):
+    """The remainder of a Sequence's current epoch, starting at batch `start`"""
+
+    def __init__(self, data, start, **kwargs):
+        super().__init__(**kwargs)
+        self.data = data
+        self.start = start
+
+    def __len__(self):
+        return len(self.data) - self.start
+
+    def __getitem__(self, idx):
+        return self.data[idx + self.start]
+
+    def on_epoch_end(self):
+        self.data.on_epoch_end()
+
+
+class IteratorSequence(Sequence):
+    """
+    A tf.data dataset as a Sequence of `steps` batches per epoch, all read
+    from one endless iterator. Keras reads batches ahead of the step that
+    trains on them, so the iterator's position mid-epoch doesn't match the
+    training position; instead on_epoch_start(epoch, iterator), if set, is
+    called just before each epoch's first batch is read, and resume_at()
+    replays an epoch up to a saved batch.
+    """
+
+    def __init__(self, dataset, steps, **kwargs):
+        super().__init__(**kwargs)
+        self.iterator = iter(dataset.repeat())
+        self.steps = steps
+        self.epoch = 0
+        self.on_epoch_start = None
+        self._started = False
+        self._batches = {}
+
+    def __len__(self):
+        return self.steps
+
+    def __getitem__(self, idx):
+        if not self._started:
+            self._started = True
+            if self.on_epoch_start is not None:
+                self.on_epoch_start(self.epoch, self.iterator)
+        # Keras peeks at the first batches before training on them; serve those again
+        if idx not in self._batches:
+            self._batches[idx] = next(self.iterator)
+        for done in [key for key in self._batches if key < idx]:
+            del self._batches[done]
+        return self._batches[idx]
+
+    def resume_at(self, epoch, step):
+        """Continue `epoch` after its first `step` batches; the iterator must be at the epoch's start"""
+        self.epoch, self._started = epoch, True
+        self._batches.clear()
+        for _ in range(step):
+            next(self.iterator)
+
+    def on_epoch_end(self):
+        self._batches.clear()
+        self.epoch += 1
+        self._started = False
+
+
+class ResumableCheckpoint(Callback):
+    """
+    Step-level checkpoints that restore the whole training state.
+    Register it after the callbacks it tracks, so their own on_train_begin
+    resets run before it restores them.
+    """
+
+    def __init__(self, directory, every_n_steps=500, keep=3, tracked_callbacks=(), train_data=None,
+                 restore_directory=None):
+        super().__init__()
+        self.directory = directory
+        # Non-chief workers save to scratch space but resume from the chief's checkpoints
+        self.restore_directory = restore_directory or directory
+        self.every_n_steps = every_n_steps
+        self.keep = keep
+        self.tracked_callbacks = list(tracked_callbacks)
+        self.train_data = train_data
+        self.epoch = 0
+        self.step = 0
+        self.global_step = 0
+        self.step_offset = 0  # batches already done in a resumed epoch
+        self._pending = None
+        self._manager = None
+        if isinstance(train_data, IteratorSequence):
+            train_data.on_epoch_start = self._save_data_position
+
+    def _get_manager(self, model):
+        if self._manager is None:
+            os.makedirs(self.directory, exist_ok=True)
+            checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer)
+            self._manager = tf.train.CheckpointManager(checkpoint, self.directory, max_to_keep=self.keep)
+        return self._manager
+
+    def _state_path(self, number, directory=None):
+        return os.path.join(directory or self.directory, f"{STATE_PREFIX}{number}.pkl")
+
+    def _data_path(self, epoch, directory=None):
+        return os.path.join(directory or self.directory, f"{DATA_PREFIX}{epoch}")
+
+    def _save_data_position(self, epoch, iterator):
+        """Save a tf.data iterator as it stands at the start of `epoch`"""
+        os.makedirs(self.directory, exist_ok=True)
+        tf.train.Checkpoint(data=iterator).write(self._data_path(epoch))
+        # Every epoch ends with a save, so the kept checkpoints are all from the last `keep` epochs
+        for data_file in glob.glob(os.path.join(self.directory, f"{DATA_PREFIX}*")):
+            if int(os.path.basename(data_file)[len(DATA_PREFIX):].split('.', 1)[0]) <= epoch - self.keep:
+                os.remove(data_file)
+
+    def _callback_states(self):
+        states = []
+        for callback in self.tracked_callbacks:
+            state = {attr: getattr(callback, attr) for attr in CALLBACK_STATE_ATTRS if hasattr(callback, attr)}
+            if getattr(callback, 'best_weights', None) is not None:
+                state['best_weights'] = callback.best_weights
+            states.append(state)
+        return states
+
+    def _apply_callback_states(self, states):
+        for callback, state in zip(self.tracked_callbacks, states):
+            for attr, value in state.items():
+                setattr(callback, attr, value)
+
+    def save(self):
+        manager = self._get_manager(self.model)
+        manager.save(checkpoint_number=self.global_step)
+        steps_per_epoch = len(self.train_data) if hasattr(self.train_data, '__len__') else 0
+        state = {
+            'epoch': self.epoch,
+            'step': self.step,
+            'global_step': self.global_step,
+            'learning_rate': float(np.array(self.model.optimizer.learning_rate)),
+            'callbacks': self._callback_states(),
+            'python_rng': random.getstate(),
+            'numpy_rng': np.random.get_state(),
+            'data': _data_state(self.train_data, self.epoch * steps_per_epoch + self.step),
+        }
+        path = self._state_path(self.global_step)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+        # Drop state files whose checkpoint the manager has rotated out
+        kept = {int(checkpoint.rsplit('-', 1)[1]) for checkpoint in manager.checkpoints}
+        for state_file in glob.glob(os.path.join(self.directory, f"{STATE_PREFIX}*.pkl")):
+            if int(os.path.basename(state_file)[len(STATE_PREFIX):-len('.pkl')]) not in kept:
+                os.remove(state_file)
+
+    def restore(self, model):
+        """
+        Load the newest complete checkpoint into `model` (compiled) and queue
+        the callback state for on_train_begin. Returns (epoch, step) to resume
+        from, or None when there is nothing to resume.
+        """
+        manager = self._get_manager(model)
+        checkpoints = tf.train.get_checkpoint_state(self.restore_directory)
+        if checkpoints is None:
+            return None
+        for checkpoint in reversed(checkpoints.all_model_checkpoint_paths):
+            number = int(checkpoint.rsplit('-', 1)[1])
+            if os.path.exists(self._state_path(number, self.restore_directory)):
+                break
+        else:
+            return None
+
+        # Create the optimizer slots so they restore immediately, not lazily
+        model.optimizer.build(model.trainable_variables)
+        manager.checkpoint.restore(checkpoint).expect_partial()
+        with open(self._state_path(number, self.restore_directory), 'rb') as f:
+            state = pickle.load(f)
+
+        model.optimizer.learning_rate = state['learning_rate']
+        random.setstate(state['python_rng'])
+        np.random.set_state(state['numpy_rng'])
+        _restore_data_state(self.train_data, state['data'])
+        if isinstance(self.train_data, IteratorSequence):
+            data_path = self._data_path(state['epoch'], self.restore_directory)
+            if os.path.exists(data_path + '.index'):
+                tf.train.Checkpoint(data=self.train_data.iterator).read(data_path).expect_partial()
+                self.train_data.resume_at(state['epoch'], state['step'])
+            else:
+                print(f"⚠️  No input position saved for epoch {state['epoch'] + 1}; "
+                      "its batches come from a fresh iterator")
+                self.train_data.epoch = state['epoch']
+        self.epoch, self.step, self.global_step = state['epoch'], state['step'], state['global_step']
+        self._pending = state['callbacks']
+        return self.epoch, self.step
+
+    def on_train_begin(self, logs=None):
+        # Runs after the tracked callbacks have reset themselves
+        if self._pending is not None:
+            self._apply_callback_states(self._pending)
+
+    def on_train_end(self, logs=None):
+        # Carry state over into a follow-up fit() call (resumed partial epoch)
+        self._pending = self._callback_states()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step = self.step_offset + batch + 1
+        self.global_step += 1
+        if self.every_n_steps and self.global_step % self.every_n_steps == 0:
+            self.save()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch, self.step, self.step_offset = epoch + 1, 0, 0
+        self.save()
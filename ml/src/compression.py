@@ -0,0 +1,142 @@
+"""
+Model Compression for ReluRay
+Structured filter pruning and weight clustering for the improved model.
+Pruning drops each convolution's lowest-L1 filters (and the matching input
+channels of the next layer), so the result is a genuinely smaller dense
+model: fewer parameters, a smaller file and less compute, loadable with
+plain load_model. Clustering snaps each kernel to a few shared values,
+which the deflate-compressed .keras archive then stores compactly.
+"""
+
+import os
+import zipfile
+import tempfile
+
+import numpy as np
+from tensorflow.keras import Input, Model
+from tensorflow.keras.layers import BatchNormalization, Conv2D, Dense, InputLayer
+from tensorflow.keras.optimizers import Adam
+
+
+def _filter_order(kernel):
+    """Output filters by L1 norm, strongest first"""
+    return np.argsort(-np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0))
+
+
+def prune_filters(model, keep_ratio=0.5, skip_layers=()):
+    """
+    Rebuild a single-chain model (the improved VGG16 model) keeping the top
+    keep_ratio of every Conv2D layer's filters by L1 norm. Layers named in
+    skip_layers keep all filters. Weights are copied across; the returned
+    model is uncompiled and fully trainable, ready for fine-tuning.
+    """
+    x = inputs = None
+    kept = None  # surviving channels of the previous layer's output
+    for layer in model.layers:
+        if isinstance(layer, InputLayer):
+            x = inputs = Input(shape=model.input_shape[1:])
+            kept = np.arange(model.input_shape[-1])
+            continue
+
+        config = layer.get_config()
+        weights = layer.get_weights()
+        if isinstance(layer, Conv2D):
+            kernel = weights[0][:, :, kept, :]
+            keep = np.arange(kernel.shape[-1])
+            if layer.name not in skip_layers:
+                keep = np.sort(_filter_order(kernel)[:max(1, int(round(keep_ratio * kernel.shape[-1])))])
+            config['filters'] = len(keep)
+            weights = [kernel[..., keep]] + [w[keep] for w in weights[1:]]
+            kept = keep
+        elif isinstance(layer, BatchNormalization):
+            weights = [w[kept] for w in weights]
+        elif isinstance(layer, Dense):
+            weights = [weights[0][kept, :]] + weights[1:]
+            kept = np.arange(config['units'])
+
+        new_layer = layer.__class__.from_config(config)
+        x = new_layer(x)
+        if weights:
+            new_layer.set_weights(weights)
+        new_layer.trainable = True
+
+    return Model(inputs=inputs, outputs=x, name=f"{model.name}_pruned")
+
+
+def _kmeans_1d(values, n_clusters, iterations=15):
+    """Shared values and per-weight assignments for a flat array (linear init, Lloyd updates)"""
+    centroids = np.linspace(values.min(), values.max(), n_clusters)
+    for _ in range(iterations):
+        assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        sums = np.bincount(assignment, weights=values, minlength=n_clusters)
+        centroids = np.sort(np.where(counts > 0, sums / np.maximum(counts, 1), centroids))
+    assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+    return centroids, assignment
+
+
+def cluster_weights(model, n_clusters=32):
+    """Replace every Conv2D/Dense kernel with its k-means clustered version, in place"""
+    for layer in model.layers:
+        if not isinstance(layer, (Conv2D, Dense)):
+            continue
+        weights = layer.get_weights()
+        kernel = weights[0]
+        if kernel.size <= n_clusters:
+            continue
+        centroids, assignment = _kmeans_1d(kernel.ravel().astype(np.float64), n_clusters)
+        weights[0] = centroids[assignment].astype(kernel.dtype).reshape(kernel.shape)
+        layer.set_weights(weights)
+    return model
+
+
+def compile_like_improved(model, learning_rate=1e-4):
+    """Same loss and metrics as build_improved_model"""
+    from tensorflow.keras.metrics import Precision, Recall
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='binary_crossentropy',
+                  metrics=['accuracy', Precision(name='precision'), Recall(name='recall')])
+    return model
+
+
+def optimizer_variable_count(path):
+    """Number of optimizer variables stored in a .keras archive (0 for an uncompiled save)"""
+    import h5py
+    count = 0
+
+    def visit(name, item):
+        nonlocal count
+        if isinstance(item, h5py.Dataset):
+            count += 1
+
+    with zipfile.ZipFile(path) as archive, archive.open('model.weights.h5') as weights:
+        with h5py.File(weights, 'r') as f:
+            if 'optimizer' in f:
+                f['optimizer'].visititems(visit)
+    return count
+
+
+def save_compressed(model, path):
+    """
+    Save as .keras with deflate compression on the archive members. Keras
+    writes them uncompressed; zipfile reads either, so load_model is unchanged.
+    An uncompiled copy is saved: after fine-tuning, Adam's moment buffers for
+    every weight would otherwise be stored too, unclustered and twice the size
+    of the model itself. Load it with compile_like_improved to train further.
+    """
+    from tensorflow.keras.models import clone_model
+
+    export = clone_model(model)
+    export.set_weights(model.get_weights())
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path = os.path.join(tmp, 'model.keras')
+        export.save(plain_path)
+        tmp_path = path + '.tmp'
+        with zipfile.ZipFile(plain_path) as source, \
+                zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+            for item in source.infolist():
+                target.writestr(item.filename, source.read(item.filename))
+    stored = optimizer_variable_count(tmp_path)
+    if stored:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Compressed model would contain {stored} optimizer variables")
+    os.replace(tmp_path, path)
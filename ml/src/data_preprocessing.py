@@ -1,22 +1,29 @@
-import cv2
 import os
 import numpy as np
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 
+# Training augmentation policy, in ImageDataGenerator terms. Shared by
+# data_augmentation(), create_data_generators and the batched
+# BatchAugmentation layer so every pipeline augments the same way.
+AUGMENTATION_CONFIG = {
+    'rotation_range': 20,
+    'width_shift_range': 0.2,
+    'height_shift_range': 0.2,
+    'shear_range': 0.2,
+    'zoom_range': 0.2,
+    'horizontal_flip': True,
+    'fill_mode': 'nearest',
+    'brightness_range': [0.8, 1.2],
+    'channel_shift_range': 0.1,
+}
+
 def preprocess_image(image_path, target_size=(224, 224)):
+    import cv2  # only needed here; keeps the augmentation config importable without OpenCV
     image = cv2.imread(image_path)
     image = cv2.resize(image, target_size)
     image = image / 255.0 # for me to normalize the image
     return image
 
 def data_augmentation():
-    datagen = ImageDataGenerator(
-        rotation_range=20,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        shear_range=0.2,
-        zoom_range=0.2,
-        horizontal_flip=True,
-        fill_mode='nearest'
-    )
-    return datagen
\ No newline at end of file
+    datagen = ImageDataGenerator(**AUGMENTATION_CONFIG)
+    return datagen
@@ -0,0 +1,173 @@
+"""
+Dataset Index for ReluRay
+Walks an image tree once with os.scandir and stores path, class, split and
+file size as columns in a single .npz file, so training, preprocessing and
+evaluation don't each rescan directories of tens of thousands of files. The
+mtime of every directory walked is stored too, so a change anywhere in the
+tree triggers a rebuild.
+"""
+
+import os
+from collections import Counter
+
+import numpy as np
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.dcm', '.dicom'}
+SPLITS = ('train', 'val', 'test')
+INDEX_FILENAME = 'dataset_index.npz'
+
+
+def scan_images(root, extensions=IMAGE_EXTENSIONS, dir_mtimes=None):
+    """
+    Yield (path, size) for every image under root in a single walk.
+    Paths are yielded in sorted order and each file only once, even when
+    reachable through several symlinks. Each directory is entered once too,
+    so a symlink pointing back up the tree can't loop forever. A dict passed
+    as dir_mtimes is filled with {directory: mtime_ns} for every directory
+    entered.
+    """
+    seen = set()
+    visited_dirs = set()
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            stat = os.stat(directory)
+            dir_id = (stat.st_dev, stat.st_ino)
+            if dir_id in visited_dirs:
+                continue
+            visited_dirs.add(dir_id)
+            if dir_mtimes is not None:
+                dir_mtimes[directory] = stat.st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in extensions:
+                stat = entry.stat()
+                file_id = (stat.st_dev, stat.st_ino)
+                if file_id in seen:
+                    continue
+                seen.add(file_id)
+                yield entry.path, stat.st_size
+        # Reverse so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
+
+
+class DatasetIndex:
+    """
+    Columnar image index: parallel arrays of path, split, class name and size,
+    plus {directory: mtime_ns} for the directories it was built from
+    """
+
+    def __init__(self, paths, splits, classes, sizes, dir_mtimes=None):
+        self.paths = np.asarray(paths, dtype=str)
+        self.splits = np.asarray(splits, dtype=str)
+        self.classes = np.asarray(classes, dtype=str)
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.dir_mtimes = dir_mtimes
+
+    def __len__(self):
+        return len(self.paths)
+
+    @classmethod
+    def from_directory(cls, data_dir, splits=SPLITS):
+        """Index a <data_dir>/<split>/<CLASS>/... tree"""
+        paths, split_col, class_col, sizes = [], [], [], []
+        dir_mtimes = {}
+        for split in splits:
+            split_dir = os.path.join(data_dir, split)
+            if not os.path.isdir(split_dir):
+                continue
+            # Before listing, so a change made during the walk still shows up as one
+            dir_mtimes[split_dir] = os.stat(split_dir).st_mtime_ns
+            for class_name in sorted(os.listdir(split_dir)):
+                class_dir = os.path.join(split_dir, class_name)
+                if class_name.startswith('.') or not os.path.isdir(class_dir):
+                    continue
+                for path, size in scan_images(class_dir, dir_mtimes=dir_mtimes):
+                    paths.append(path)
+                    split_col.append(split)
+                    class_col.append(class_name)
+                    sizes.append(size)
+        return cls(paths, split_col, class_col, sizes, dir_mtimes)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        dir_mtimes = self.dir_mtimes or {}
+        np.savez_compressed(tmp_path, paths=self.paths, splits=self.splits,
+                            classes=self.classes, sizes=self.sizes,
+                            dirs=np.asarray(list(dir_mtimes), dtype=str),
+                            dir_mtimes=np.asarray(list(dir_mtimes.values()), dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            dir_mtimes = None
+            if 'dirs' in data.files:
+                dir_mtimes = dict(zip(data['dirs'].tolist(), data['dir_mtimes'].tolist()))
+            return cls(data['paths'], data['splits'], data['classes'], data['sizes'], dir_mtimes)
+
+    def select(self, split=None, class_name=None):
+        """Sub-index for one split and/or class"""
+        mask = np.ones(len(self), dtype=bool)
+        if split is not None:
+            mask &= self.splits == split
+        if class_name is not None:
+            mask &= self.classes == class_name
+        return DatasetIndex(self.paths[mask], self.splits[mask], self.classes[mask], self.sizes[mask])
+
+    def class_names(self):
+        """Sorted class names, matching flow_from_directory's class indices"""
+        return sorted(set(self.classes.tolist()))
+
+    def labels(self, class_names=None):
+        """Integer label per entry (index into class_names)"""
+        class_names = class_names or self.class_names()
+        lookup = {name: i for i, name in enumerate(class_names)}
+        return np.array([lookup[c] for c in self.classes], dtype=np.int64)
+
+    def counts(self):
+        """{(split, class): image count}"""
+        return dict(Counter(zip(self.splits.tolist(), self.classes.tolist())))
+
+
+def _index_is_stale(index, data_dir, splits):
+    """
+    The index is stale if any directory it walked changed (files or
+    subdirectories added, removed or renamed anywhere in the tree), or a
+    split directory appeared. Indexes saved without directory mtimes are stale.
+    """
+    if index.dir_mtimes is None:
+        return True
+    for split in splits:
+        split_dir = os.path.join(data_dir, split)
+        if os.path.isdir(split_dir) and split_dir not in index.dir_mtimes:
+            return True
+    for directory, mtime_ns in index.dir_mtimes.items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime_ns:
+                return True
+        except OSError:
+            return True
+    return False
+
+
+def load_or_build_index(data_dir, index_path=None, splits=SPLITS, rebuild=False):
+    """Load the saved index for data_dir, rebuilding it when missing or stale"""
+    index_path = index_path or os.path.join(data_dir, INDEX_FILENAME)
+    if not rebuild and os.path.exists(index_path):
+        index = DatasetIndex.load(index_path)
+        if not _index_is_stale(index, data_dir, splits):
+            return index
+    index = DatasetIndex.from_directory(data_dir, splits)
+    index.save(index_path)
+    return index
@@ -0,0 +1,200 @@
+"""
+Perceptual-hash Deduplication for ReluRay
+Computes 64-bit DCT perceptual hashes in batched NumPy, groups near-duplicates
+through a multi-index (banded) hash table in sub-quadratic time, and reports
+groups that leak across train/val/test splits.
+"""
+
+import os
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 low-frequency DCT block -> 64-bit hash
+IMAGE_SIZE = 32  # Images are reduced to 32x32 grayscale before the DCT
+DEFAULT_MAX_DISTANCE = 6  # Hamming distance treated as a near-duplicate
+SPLIT_PRIORITY = {'train': 0, 'val': 1, 'test': 2}
+# Processed images removed as duplicates, relative to the data dir; preprocessing skips them
+EXCLUSIONS_FILENAME = 'dedupe_exclusions.txt'
+
+# Popcount per byte for vectorized Hamming distances
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(IMAGE_SIZE)
+
+
+def load_thumbnail(path):
+    """32x32 grayscale thumbnail; JPEGs are DCT-downscaled while decoding"""
+    with Image.open(path) as img:
+        img.draft('L', (IMAGE_SIZE * 2, IMAGE_SIZE * 2))
+        img = img.convert('L').resize((IMAGE_SIZE, IMAGE_SIZE), Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+
+
+def phash_batch(thumbnails):
+    """
+    64-bit perceptual hashes for a (N, 32, 32) batch: 2-D DCT of each image,
+    keep the 8x8 low-frequency block and threshold against its median.
+    """
+    coeffs = np.einsum('ij,njk,lk->nil', _DCT, np.asarray(thumbnails, dtype=np.float32), _DCT)
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(len(coeffs), -1)
+    # Median excludes the DC term, which only tracks overall brightness
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def _hash_chunk(paths):
+    thumbnails = np.stack([load_thumbnail(path) for path in paths])
+    return phash_batch(thumbnails)
+
+
+def compute_hashes(paths, batch_size=512, workers=1):
+    """Perceptual hashes for image paths, decoded in batches (optionally on a process pool)"""
+    paths = list(paths)
+    chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    if not chunks:
+        return np.empty(0, dtype=np.uint64)
+    if workers <= 1:
+        return np.concatenate([_hash_chunk(chunk) for chunk in chunks])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_hash_chunk, chunks)))
+
+
+def hamming(a, b):
+    """Elementwise Hamming distance between uint64 hash arrays"""
+    xor = np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    return _POPCOUNT[xor.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _band_widths(bands):
+    """Split 64 bits into `bands` widths that differ by at most one bit"""
+    base, extra = divmod(64, bands)
+    return [base + 1] * extra + [base] * (bands - extra)
+
+
+def _bucket_pairs(order, boundaries):
+    """
+    (left, right) index pairs of every two members sharing a bucket.
+    `order` lists indices grouped by bucket, `boundaries` marks where each
+    bucket starts. Buckets of equal size are stacked and paired in one step.
+    """
+    starts = np.concatenate([[0], boundaries])
+    sizes = np.diff(np.concatenate([starts, [len(order)]]))
+    left, right = [], []
+    for size in np.unique(sizes[sizes > 1]):
+        members = order[starts[sizes == size][:, None] + np.arange(size)]
+        i, j = np.triu_indices(size, 1)
+        left.append(members[:, i].ravel())
+        right.append(members[:, j].ravel())
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def candidate_pairs(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Pairs of indices whose hashes agree exactly on at least one of
+    max_distance + 1 bands (each pair once, smaller index first). By the
+    pigeonhole principle every pair within max_distance bits is among them.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    pairs = []
+    shift = 0
+    for width in _band_widths(max_distance + 1):
+        keys = (hashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        shift += width
+        order = np.argsort(keys, kind='stable')
+        left, right = _bucket_pairs(order, np.flatnonzero(np.diff(keys[order])) + 1)
+        pairs.append(np.stack([np.minimum(left, right), np.maximum(left, right)], axis=1))
+    pairs = np.concatenate(pairs)
+    # A pair close in several bands shows up once per band
+    return np.unique(pairs, axis=0) if len(pairs) else pairs
+
+
+def _connected_components(n, left, right):
+    """Component label (smallest member index) per node, for edges left[k]-right[k]"""
+    labels = np.arange(n)
+    while True:
+        # Hook each edge's larger root onto its smaller one, then flatten the trees
+        roots_left, roots_right = labels[left], labels[right]
+        if np.array_equal(roots_left, roots_right):
+            return labels
+        low = np.minimum(roots_left, roots_right)
+        np.minimum.at(labels, roots_left, low)
+        np.minimum.at(labels, roots_right, low)
+        while True:
+            flattened = labels[labels]
+            if np.array_equal(flattened, labels):
+                break
+            labels = flattened
+
+
+def group_near_duplicates(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Group hashes within max_distance bits of each other (transitively).
+    Multi-index hashing: only pairs sharing a band value (candidate_pairs)
+    are compared, in one vectorized Hamming pass. Returns a list of index
+    arrays, one per group of two or more images.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    pairs = candidate_pairs(hashes, max_distance)
+    close = pairs[hamming(hashes[pairs[:, 0]], hashes[pairs[:, 1]]) <= max_distance] if len(pairs) else pairs
+
+    roots = _connected_components(len(hashes), close[:, 0], close[:, 1])
+    order = np.argsort(roots, kind='stable')
+    groups = np.split(order, np.flatnonzero(np.diff(roots[order])) + 1)
+    return [group for group in groups if len(group) > 1]
+
+
+def find_leakage(groups, splits):
+    """Groups whose members fall into more than one split"""
+    splits = np.asarray(splits)
+    return [group for group in groups if len(set(splits[group].tolist())) > 1]
+
+
+def select_removals(groups, splits, paths):
+    """
+    Keep one image per group (earliest split in train/val/test order, then
+    path) and return the indices of all others.
+    """
+    splits = np.asarray(splits)
+    paths = np.asarray(paths)
+    removals = []
+    for group in groups:
+        keep = min(group, key=lambda i: (SPLIT_PRIORITY.get(splits[i], len(SPLIT_PRIORITY)), paths[i]))
+        removals.extend(int(i) for i in group if i != keep)
+    return sorted(removals)
+
+
+def load_exclusions(data_dir):
+    """Relative paths (e.g. 'train/NORMAL/x.jpeg') of images removed as duplicates"""
+    path = os.path.join(data_dir, EXCLUSIONS_FILENAME)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def remove_duplicates(data_dir, paths):
+    """
+    Delete processed images and record them as exclusions, so re-running
+    preprocessing doesn't regenerate them from their sources.
+    """
+    relative = [os.path.relpath(path, data_dir).replace(os.sep, '/') for path in paths]
+    # Record first: an interrupted run must not leave a deleted image unexcluded
+    with open(os.path.join(data_dir, EXCLUSIONS_FILENAME), 'a') as f:
+        f.write(''.join(f"{path}\n" for path in relative))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
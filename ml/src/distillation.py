@@ -0,0 +1,127 @@
+"""
+Knowledge Distillation for ReluRay
+Trains a compact student (MobileNetV2 or a small CNN) on the VGG16 teacher's
+soft targets from the tensor cache. The teacher runs once per image; its
+logits travel with the labels as batch targets. The student keeps a
+GlobalAveragePooling2D feature layer and takes the same [0, 1] 224x224 input
+as the teacher, so the backend serves it unchanged.
+"""
+
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import Input, Model
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.layers import (
+    Activation, BatchNormalization, Conv2D, Dense, Dropout, GlobalAveragePooling2D, MaxPooling2D, Rescaling
+)
+from tensorflow.keras.metrics import Precision, Recall
+from tensorflow.keras.optimizers import Adam
+
+from ml.src.tensor_cache import TensorCacheSequence
+
+STUDENT_ARCHITECTURES = ('mobilenet', 'cnn')
+MOBILENET_ALPHA = 0.35
+
+
+def _mobilenet_backbone(inputs):
+    from tensorflow.keras.applications import MobileNetV2
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    weights_path = os.path.abspath(os.path.join(
+        current_dir, '..', '..', 'weights',
+        f'mobilenet_v2_weights_tf_dim_ordering_tf_kernels_{MOBILENET_ALPHA}_224_no_top.h5'
+    ))
+    if not os.path.exists(weights_path):
+        print(f"⚠️  Local weights not found at {weights_path}, using ImageNet weights")
+        weights_path = 'imagenet'
+    # MobileNetV2 expects [-1, 1]; the served input is [0, 1]
+    x = Rescaling(2.0, offset=-1.0)(inputs)
+    backbone = MobileNetV2(input_shape=tuple(inputs.shape[1:]), alpha=MOBILENET_ALPHA,
+                           include_top=False, weights=weights_path)
+    return backbone(x)
+
+
+def _cnn_backbone(inputs, filters=(32, 64, 128, 192, 256)):
+    x = inputs
+    for width in filters:
+        x = Conv2D(width, 3, padding='same', use_bias=False)(x)
+        x = BatchNormalization()(x)
+        x = Activation('relu')(x)
+        x = MaxPooling2D()(x)
+    return x
+
+
+def build_student(architecture='mobilenet', input_shape=(224, 224, 3), dropout_rate=0.2):
+    """
+    Student with a linear 'logits' layer followed by a float32 sigmoid, so
+    training can read logits while the saved model outputs probabilities
+    like the teacher.
+    """
+    if architecture not in STUDENT_ARCHITECTURES:
+        raise ValueError(f"Unknown student architecture {architecture!r}, expected one of {STUDENT_ARCHITECTURES}")
+    inputs = Input(shape=input_shape)
+    x = _mobilenet_backbone(inputs) if architecture == 'mobilenet' else _cnn_backbone(inputs)
+    x = GlobalAveragePooling2D()(x)
+    x = Dropout(dropout_rate)(x)
+    logits = Dense(1, name='logits', dtype='float32')(x)
+    outputs = Activation('sigmoid', dtype='float32')(logits)
+    return Model(inputs=inputs, outputs=outputs, name=f'student_{architecture}')
+
+
+def teacher_logits(teacher, data, eps=1e-7):
+    """Teacher logits for an unshuffled Sequence, in its sample order"""
+    probs = np.clip(np.ravel(teacher.predict(data, verbose=1)), eps, 1 - eps)
+    return np.log(probs) - np.log1p(-probs)
+
+
+def distillation_loss(temperature=4.0, alpha=0.3):
+    """
+    alpha * BCE(labels, student) + (1 - alpha) * T^2 * BCE(teacher_T, student_T),
+    where _T softens the logits by T. Targets are [label, teacher_logit]
+    pairs; predictions are student logits. T^2 keeps the soft-target gradients
+    on the same scale as the hard ones.
+    """
+    def loss(y_true, logits):
+        labels, soft_logits = y_true[:, :1], y_true[:, 1:]
+        hard = tf.nn.sigmoid_cross_entropy_with_logits(labels=labels, logits=logits)
+        soft = tf.nn.sigmoid_cross_entropy_with_logits(labels=tf.sigmoid(soft_logits / temperature),
+                                                       logits=logits / temperature)
+        return tf.reduce_mean(alpha * hard + (1 - alpha) * temperature ** 2 * soft, axis=-1)
+    return loss
+
+
+def distill(teacher, student, cache_dir, epochs=20, batch_size=64, temperature=4.0, alpha=0.3,
+            learning_rate=1e-3, verbose=1):
+    """
+    Train `student` in place on the teacher's soft targets for the cached
+    train split, validating on val. Returns the Keras history; the student is
+    left compiled like the improved model, ready to save.
+    """
+    targets = {}
+    for split in ('train', 'val'):
+        print(f"\n🧑‍🏫 Teacher predictions for {split}...")
+        ordered = TensorCacheSequence(cache_dir, split, batch_size=batch_size)
+        targets[split] = np.stack([ordered.classes, teacher_logits(teacher, ordered)], axis=1)
+
+    train = TensorCacheSequence(cache_dir, 'train', batch_size=batch_size, shuffle=True, targets=targets['train'])
+    val = TensorCacheSequence(cache_dir, 'val', batch_size=batch_size, targets=targets['val'])
+
+    # Same layers as the student, stopping at the logits
+    trainer = Model(inputs=student.inputs, outputs=student.get_layer('logits').output)
+    trainer.compile(optimizer=Adam(learning_rate=learning_rate), loss=distillation_loss(temperature, alpha))
+    history = trainer.fit(
+        train,
+        epochs=epochs,
+        validation_data=val,
+        callbacks=[
+            EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=2, min_lr=1e-6, verbose=1),
+        ],
+        verbose=verbose
+    )
+
+    student.compile(optimizer=Adam(learning_rate=learning_rate), loss='binary_crossentropy',
+                    metrics=['accuracy', Precision(name='precision'), Recall(name='recall')])
+    return history
@@ -0,0 +1,116 @@
+"""
+Multi-worker Training for ReluRay
+Data-parallel training across processes and hosts with
+MultiWorkerMirroredStrategy. The cluster comes from the standard TF_CONFIG
+environment variable; each worker decodes only its shard of every split, and
+only the chief writes checkpoints and logs.
+"""
+
+import os
+import json
+import atexit
+import shutil
+import socket
+import tempfile
+
+import tensorflow as tf
+
+from ml.src.input_pipeline import directory_dataset, list_directory
+
+
+def tf_config():
+    """Parsed TF_CONFIG, or None when not running as part of a cluster"""
+    raw = os.environ.get('TF_CONFIG')
+    return json.loads(raw) if raw else None
+
+
+def local_cluster(num_workers, base_port=None):
+    """Cluster spec for num_workers processes on this machine (free ports by default)"""
+    ports = []
+    for i in range(num_workers):
+        if base_port is not None:
+            ports.append(base_port + i)
+            continue
+        with socket.socket() as s:
+            s.bind(('localhost', 0))
+            ports.append(s.getsockname()[1])
+    return {'worker': [f"localhost:{port}" for port in ports]}
+
+
+def worker_tf_config(cluster, index):
+    """TF_CONFIG value for worker `index` of `cluster`"""
+    return json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+
+
+def make_strategy():
+    """
+    MultiWorkerMirroredStrategy when TF_CONFIG describes a cluster, else the
+    default (single-process) strategy. Must be called before any other TF op.
+    """
+    if tf_config() is None:
+        return tf.distribute.get_strategy()
+    options = tf.distribute.experimental.CommunicationOptions(
+        implementation=tf.distribute.experimental.CommunicationImplementation.RING
+    )
+    return tf.distribute.MultiWorkerMirroredStrategy(communication_options=options)
+
+
+def worker_info():
+    """(task_type, task_index, num_workers) for this process"""
+    config = tf_config()
+    if config is None:
+        return 'worker', 0, 1
+    task = config.get('task', {})
+    num_workers = sum(len(config['cluster'].get(kind, [])) for kind in ('chief', 'worker'))
+    return task.get('type', 'worker'), int(task.get('index', 0)), num_workers
+
+
+def is_chief():
+    """The chief task, or worker 0 when the cluster has no explicit chief"""
+    task_type, task_index, _ = worker_info()
+    config = tf_config()
+    if task_type == 'chief':
+        return True
+    return task_type == 'worker' and task_index == 0 and not (config and config['cluster'].get('chief'))
+
+
+_scratch_dir = None
+
+
+def chief_path(path):
+    """
+    Where this worker should write `path`. Every worker has to take part in
+    saving, but only the chief's copy is kept; the others write into one
+    scratch directory per process, removed when the process exits.
+    """
+    global _scratch_dir
+    if is_chief():
+        return path
+    if _scratch_dir is None:
+        _, task_index, _ = worker_info()
+        _scratch_dir = tempfile.mkdtemp(prefix=f"reluray_worker{task_index}_")
+        atexit.register(shutil.rmtree, _scratch_dir, ignore_errors=True)
+    return os.path.join(_scratch_dir, os.path.basename(path))
+
+
+def distributed_directory_dataset(strategy, directory, global_batch_size, training=False, index=None, **kwargs):
+    """
+    (distributed dataset, steps per epoch, classes) for one split directory.
+    Each input pipeline decodes only its shard of the files at the per-replica
+    batch size; every worker runs the same number of steps (sized by the
+    smallest shard) so collectives never wait on a finished worker.
+    index: optional DatasetIndex of this split, used instead of rescanning.
+    """
+    filepaths, classes, _ = list_directory(directory, index=index)
+    num_pipelines = worker_info()[2]  # one input pipeline per worker
+    per_replica = global_batch_size // strategy.num_replicas_in_sync
+    steps = max(1, (len(filepaths) // num_pipelines) // per_replica)
+
+    def dataset_fn(input_context):
+        batch_size = input_context.get_per_replica_batch_size(global_batch_size)
+        dataset = directory_dataset(directory, batch_size, training=training,
+                                    num_shards=input_context.num_input_pipelines,
+                                    shard_index=input_context.input_pipeline_id, index=index, **kwargs)
+        return dataset.repeat()
+
+    return strategy.distribute_datasets_from_function(dataset_fn), steps, classes
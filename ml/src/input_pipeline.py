@@ -0,0 +1,123 @@
+"""
+tf.data Input Pipeline for ReluRay
+Drop-in replacement for ImageDataGenerator.flow_from_directory: parallel
+decode, optional caching, prefetch and seeded shuffling. Datasets carry the
+same `.classes`, `.class_indices` and `.filepaths` as a DirectoryIterator, so
+class weights, training and evaluate_model work unchanged.
+"""
+
+import os
+import numpy as np
+import tensorflow as tf
+
+from ml.src.dataset_index import scan_images
+
+# Formats tf.io.decode_image handles (DICOMs are converted by preprocessing)
+DECODABLE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif'}
+
+
+def shuffle_all(dataset, count, seed):
+    """
+    Reshuffle a dataset of `count` small elements (paths, row indices) every
+    epoch, seeded. Permuting those is cheap, so the buffer holds the whole
+    dataset and the shuffle is uniform, unlike a bounded buffer of images.
+    """
+    return dataset.shuffle(count, seed=seed, reshuffle_each_iteration=True)
+
+
+def list_directory(directory, extensions=DECODABLE_EXTENSIONS, index=None):
+    """
+    (filepaths, classes, class_indices) for a <directory>/<CLASS>/... tree,
+    ordered like flow_from_directory: classes sorted by name, files sorted
+    within each class. With `index` (the DatasetIndex of this split, e.g.
+    dataset_index.select(split='train')) the lists come from the index
+    instead of a directory walk; its rows are already in that order.
+    """
+    if index is not None:
+        class_names = index.class_names()
+        class_indices = {name: i for i, name in enumerate(class_names)}
+        keep = np.array([os.path.splitext(path)[1].lower() in extensions for path in index.paths], dtype=bool)
+        filepaths = index.paths[keep].tolist()
+        classes = np.array([class_indices[name] for name in index.classes[keep]], dtype=np.int32)
+        return filepaths, classes, class_indices
+
+    class_names = sorted(name for name in os.listdir(directory)
+                         if not name.startswith('.') and os.path.isdir(os.path.join(directory, name)))
+    class_indices = {name: i for i, name in enumerate(class_names)}
+    filepaths, classes = [], []
+    for name in class_names:
+        for path, _ in scan_images(os.path.join(directory, name), extensions):
+            filepaths.append(path)
+            classes.append(class_indices[name])
+    return filepaths, np.array(classes, dtype=np.int32), class_indices
+
+
+def _load_image(path, label, target_size):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, target_size)
+    image = tf.cast(image, tf.float32) / 255.0
+    return image, label
+
+
+def directory_dataset(directory, batch_size=32, training=False, target_size=(224, 224),
+                      cache=None, augment=None, shuffle_buffer=4096, seed=42,
+                      num_shards=1, shard_index=0, index=None):
+    """
+    Batched (image, label) dataset for one split directory.
+
+    training: reshuffle every epoch (seeded, so runs are reproducible)
+    cache: None for no caching, '' to cache decoded images in memory, or a
+        file path to cache them on disk after the first epoch
+    augment: optional callable applied to each (images, labels) batch
+    num_shards, shard_index: read only every num_shards-th file (multi-worker
+        training), sharded before decode so each worker decodes its own part
+    index: optional DatasetIndex of this split, used instead of rescanning
+    """
+    filepaths, classes, class_indices = list_directory(directory, index=index)
+    labels = classes.astype(np.float32)  # class_mode='binary'
+
+    dataset = tf.data.Dataset.from_tensor_slices((filepaths, labels))
+    if num_shards > 1:
+        dataset = dataset.shard(num_shards, shard_index)
+    if training and cache is None:
+        dataset = shuffle_all(dataset, -(-len(filepaths) // num_shards), seed)
+    dataset = dataset.map(lambda path, label: _load_image(path, label, target_size),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    if cache is not None:
+        dataset = dataset.cache(cache)
+        if training:
+            # Decoded images are large; shuffle within a bounded buffer
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    if augment is not None:
+        dataset = dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+
+    options = tf.data.Options()
+    options.deterministic = True
+    dataset = dataset.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+    # DirectoryIterator-compatible metadata
+    dataset.filepaths = filepaths
+    dataset.classes = classes
+    dataset.class_indices = class_indices
+    dataset.samples = len(filepaths)
+    return dataset
+
+
+def create_datasets(train_dir, val_dir, test_dir, batch_size=32, target_size=(224, 224),
+                    cache=None, augment=None, seed=42, index=None):
+    """
+    tf.data counterpart of create_data_generators: shuffled training split,
+    ordered validation and test splits. `index` is the DatasetIndex of the
+    whole data directory; file lists then come from it, not a rescan.
+    """
+    def split_index(split):
+        return index.select(split=split) if index is not None else None
+
+    train_dataset = directory_dataset(train_dir, batch_size, training=True, target_size=target_size,
+                                      cache=cache, augment=augment, seed=seed, index=split_index('train'))
+    val_dataset = directory_dataset(val_dir, batch_size, target_size=target_size,
+                                    cache=cache and cache + '.val', index=split_index('val'))
+    test_dataset = directory_dataset(test_dir, batch_size, target_size=target_size,
+                                     cache=cache and cache + '.test', index=split_index('test'))
+    return train_dataset, val_dataset, test_dataset
@@ -0,0 +1,139 @@
+"""
+Mixed-precision Training for ReluRay
+Opt-in mixed_bfloat16 policy for CPUs with native bfloat16 support
+(AVX512-BF16 / AMX), with a float32 fallback everywhere else. Each run's
+step time and validation metrics are recorded per policy under its full
+training configuration and hardware, so a speedup and metric delta are only
+reported against a float32 run that differed in nothing but the policy.
+"""
+
+import os
+import json
+import time
+import platform
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+PRECISION_RUNS_FILE = 'precision_runs.json'
+BF16_CPU_FLAGS = {'avx512_bf16', 'amx_bf16'}
+
+
+def _cpuinfo_field(name):
+    """First value of a /proc/cpuinfo field (Linux only), or None"""
+    if platform.system() != 'Linux':
+        return None
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.split(':', 1)[0].strip() == name:
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return None
+
+
+def cpu_supports_bf16():
+    """True when the CPU advertises native bfloat16 arithmetic (Linux /proc/cpuinfo)"""
+    flags = _cpuinfo_field('flags')
+    return bool(flags and BF16_CPU_FLAGS & set(flags.split()))
+
+
+def hardware_description():
+    """CPU model, core count and accelerators, so runs on different machines aren't compared"""
+    return {
+        'cpu': _cpuinfo_field('model name') or platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'gpus': len(tf.config.list_physical_devices('GPU')),
+    }
+
+
+def enable_mixed_precision():
+    """
+    Switch the global Keras policy to mixed_bfloat16 if the CPU supports it.
+    bfloat16 keeps float32's exponent range, so no loss scaling is needed
+    (Keras adds a LossScaleOptimizer itself only for mixed_float16).
+    Returns the active policy name; models must be built after this call.
+    """
+    if not cpu_supports_bf16():
+        print("⚠️  CPU has no native bfloat16 support (avx512_bf16 / amx_bf16); training in float32")
+        tf.keras.mixed_precision.set_global_policy('float32')
+        return 'float32'
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    print("⚡ Mixed precision enabled: mixed_bfloat16 compute, float32 variables and output")
+    return 'mixed_bfloat16'
+
+
+class StepTimeCallback(Callback):
+    """Mean wall time per training batch, skipping each epoch's first (warm-up) batch"""
+
+    def __init__(self):
+        super().__init__()
+        self.step_times = []
+        self._start = None
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        if batch > 0:
+            self.step_times.append(time.perf_counter() - self._start)
+
+    @property
+    def mean_step_ms(self):
+        return 1000 * sum(self.step_times) / len(self.step_times) if self.step_times else None
+
+
+def record_precision_run(logs_dir, policy, step_timer, history, config):
+    """
+    Store this run's step time and best validation metrics under its policy
+    and configuration (a JSON-serializable dict: input pipeline, batch size,
+    image size, progressive schedule, ...; the hardware is added here), and
+    report speedup / metric delta against the float32 run of the exact same
+    configuration, if one was recorded.
+    """
+    path = os.path.join(logs_dir, PRECISION_RUNS_FILE)
+    runs = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            runs = json.load(f)
+
+    config = dict(config, hardware=hardware_description())
+    key = json.dumps(config, sort_keys=True)
+
+    run = {
+        'mean_step_ms': step_timer.mean_step_ms,
+        'best_val_loss': min(history.history['val_loss']),
+        'best_val_accuracy': max(history.history['val_accuracy']),
+    }
+    entry = runs.setdefault(key, {'config': config, 'policies': {}})
+    entry['policies'][policy] = run
+    with open(path, 'w') as f:
+        json.dump(runs, f, indent=2)
+
+    if run['mean_step_ms'] is None:
+        return run
+    print(f"\n⏱️  {policy}: {run['mean_step_ms']:.1f} ms/step")
+    if policy == 'float32':
+        return run
+    baseline = entry['policies'].get('float32')
+    if not baseline or not baseline.get('mean_step_ms'):
+        print("   No float32 run with this exact configuration yet; rerun without "
+              "--mixed-precision to measure the speedup")
+        return run
+    print(f"   Step-time speedup vs float32: {baseline['mean_step_ms'] / run['mean_step_ms']:.2f}x")
+    print(f"   Val accuracy delta vs float32: {run['best_val_accuracy'] - baseline['best_val_accuracy']:+.4f}")
+    print(f"   Val loss delta vs float32: {run['best_val_loss'] - baseline['best_val_loss']:+.4f}")
+    return run
+
+
+def export_float32(model, build_fn):
+    """
+    Rebuild the model under the float32 policy and copy the weights across, so
+    the served model doesn't depend on bfloat16 hardware. Variables are
+    float32 under mixed precision, so this is lossless.
+    """
+    tf.keras.mixed_precision.set_global_policy('float32')
+    float_model = build_fn()
+    float_model.set_weights(model.get_weights())
+    return float_model
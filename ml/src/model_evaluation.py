@@ -2,25 +2,45 @@ import matplotlib.pyplot as plt
 from scipy.constants import precision
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_curve, auc
 import numpy as np
+from backend.feature_store import open_feature_store, predict_files, split_backbone_head
 
-def evaluate_model(model, test_data_generator):
+def classification_metrics(y_true, y_pred, threshold=0.5):
+    # the metrics evaluate_model reports, from true labels and predicted probabilities
+    y_pred = np.ravel(y_pred)
+    y_pred_binary = np.where(y_pred > threshold, 1, 0)
+    fpr, tpr, _ = roc_curve(y_true, y_pred)
+    return {
+        'accuracy': accuracy_score(y_true, y_pred_binary),
+        'precision': precision_score(y_true, y_pred_binary),
+        'recall': recall_score(y_true, y_pred_binary),
+        'f1': f1_score(y_true, y_pred_binary),
+        'auc': auc(fpr, tpr),
+    }
+
+def evaluate_model(model, test_data_generator, feature_store_dir=None):
     # atleast to generate predictions and true labels too
-    y_pred = model.predict(test_data_generator)
+    y_pred = None
+    if feature_store_dir:
+        # reuse cached backbone features so only the head has to run
+        split = split_backbone_head(model)
+        if split is not None:
+            backbone, head = split
+            store = open_feature_store(feature_store_dir, backbone)
+            y_pred = predict_files(backbone, head, test_data_generator.filepaths, store)
+    if y_pred is None:
+        y_pred = model.predict(test_data_generator)
     y_true = test_data_generator.classes
 
     # then convert predictions to binary labels (let's assume it is binary classification)
     y_pred_binary = np.where(y_pred > 0.5, 1, 0)
 
     # time to calculate the metrics
-    accuracy = accuracy_score(y_true, y_pred_binary)
-    precision = precision_score(y_true, y_pred_binary)
-    recall = recall_score(y_true, y_pred_binary)
-    f1 = f1_score(y_true, y_pred_binary)
+    metrics = classification_metrics(y_true, y_pred)
 
-    print(f"Accuracy: {accuracy:.4f}")
-    print(f"Precision: {precision:.4f}")
-    print(f"Recall: {recall:.4f}")
-    print(f"F1 Score: {f1:.4f}")
+    print(f"Accuracy: {metrics['accuracy']:.4f}")
+    print(f"Precision: {metrics['precision']:.4f}")
+    print(f"Recall: {metrics['recall']:.4f}")
+    print(f"F1 Score: {metrics['f1']:.4f}")
     
     # about confusion matrix
     cm = confusion_matrix(y_true, y_pred_binary)
@@ -29,7 +49,7 @@ def evaluate_model(model, test_data_generator):
 
     # ROC Curve and AUC
     fpr, tpr, _ = roc_curve(y_true, y_pred)
-    roc_auc = auc(fpr, tpr)
+    roc_auc = metrics['auc']
 
     plt.figure()
     plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc:.4f})')
@@ -40,6 +60,8 @@ def evaluate_model(model, test_data_generator):
     plt.legend(loc="lower right")
     plt.show()
 
+    return metrics
+
 def plot_metrics(history):
     # this would be for plot training and validation accuracy values
     plt.figure(figsize=(12, 4))
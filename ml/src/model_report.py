@@ -0,0 +1,92 @@
+"""
+Model Cost Report for ReluRay
+Serving-side cost of a model artifact (file size, load time, resident
+memory, parameter count, single-image CPU latency) alongside its test
+metrics, so compact models can be compared against the full VGG16 model.
+"""
+
+import os
+import gc
+import json
+import time
+import statistics
+
+import numpy as np
+
+from ml.src.model_evaluation import classification_metrics
+from ml.src.profiling import current_rss_mb
+
+LATENCY_WARMUP = 5
+
+
+def measure_latency(predict_fn, sample, runs=50):
+    """Median and p95 wall time (ms) of predict_fn(sample), after a warm-up"""
+    for _ in range(LATENCY_WARMUP):
+        predict_fn(sample)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predict_fn(sample)
+        times.append(1000 * (time.perf_counter() - start))
+    times.sort()
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))]
+
+
+def profile_model(path, test_data, load_fn=None, predict_fn=None, runs=50):
+    """
+    Load the artifact at `path` and measure it. load_fn defaults to Keras
+    load_model; predict_fn(model, batch) defaults to predict_on_batch.
+    test_data is a Sequence of (images, labels) with `.classes`.
+    """
+    if load_fn is None:
+        from tensorflow.keras.models import load_model
+        load_fn = load_model
+    if predict_fn is None:
+        def predict_fn(model, batch):
+            return model.predict_on_batch(batch)
+
+    gc.collect()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    model = load_fn(path)
+    load_s = time.perf_counter() - start
+    # Memory the loaded model added to this process
+    rss_mb = current_rss_mb() - rss_before
+
+    sample = test_data[0][0][:1]
+    latency_ms, latency_p95_ms = measure_latency(lambda batch: predict_fn(model, batch), sample, runs)
+
+    y_pred = np.concatenate([np.ravel(predict_fn(model, test_data[i][0])) for i in range(len(test_data))])
+    report = {
+        'path': path,
+        'size_mb': os.path.getsize(path) / 2 ** 20,
+        'load_s': load_s,
+        'rss_mb': rss_mb,
+        'params': int(model.count_params()) if hasattr(model, 'count_params') else None,
+        'latency_ms': latency_ms,
+        'latency_p95_ms': latency_p95_ms,
+    }
+    report.update({name: float(value) for name, value in
+                   classification_metrics(test_data.classes, y_pred).items()})
+    return report
+
+
+def print_comparison(reports, baseline='baseline'):
+    """Side-by-side table of profile_model reports, keyed by name; ratios are against `baseline`"""
+    base = reports[baseline]
+    print(f"   {'':<12}{'Size MB':>9}{'Load s':>8}{'RSS MB':>8}{'Latency ms':>12}{'AUC':>8}{'Recall':>8}")
+    for name, report in reports.items():
+        print(f"   {name:<12}{report['size_mb']:>9.1f}{report['load_s']:>8.2f}{report['rss_mb']:>8.0f}"
+              f"{report['latency_ms']:>12.1f}{report['auc']:>8.4f}{report['recall']:>8.4f}")
+    for name, report in reports.items():
+        if name == baseline:
+            continue
+        print(f"   {name}: {base['size_mb'] / report['size_mb']:.1f}x smaller, "
+              f"{base['latency_ms'] / report['latency_ms']:.1f}x faster, "
+              f"AUC {report['auc'] - base['auc']:+.4f}, recall {report['recall'] - base['recall']:+.4f}")
+
+
+def save_report(path, reports):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(reports, f, indent=2)
@@ -8,15 +8,22 @@ from tensorflow.keras.models import Sequential, Model
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, BatchNormalization
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras.utils import Sequence
 from tensorflow.keras.callbacks import (
     ModelCheckpoint, EarlyStopping, ReduceLROnPlateau, 
     TensorBoard, CSVLogger
 )
 import os
 import numpy as np
+import tensorflow as tf
 
+from ml.src.data_preprocessing import AUGMENTATION_CONFIG
+from ml.src.checkpointing import IteratorSequence, ResumableCheckpoint, ResumedEpoch
+from ml.src.profiling import ThroughputProfiler
+from backend.feature_store import extract_features, open_feature_store, split_backbone_head
 
-def build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5):
+
+def build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5, learning_rate=0.001):
     """
     Build improved model with better architecture:
     - GlobalAveragePooling2D instead of Flatten (reduces overfitting)
@@ -59,8 +66,8 @@ def build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5):
     x = BatchNormalization()(x)
     x = Dropout(dropout_rate * 0.5)(x)  # Less dropout in second layer
     
-    # Output layer
-    outputs = Dense(1, activation='sigmoid')(x)
+    # Output layer (kept in float32 under mixed precision for a stable sigmoid/loss)
+    outputs = Dense(1, activation='sigmoid', dtype='float32')(x)
     
     model = Model(inputs=inputs, outputs=outputs)
     
@@ -73,7 +80,7 @@ def build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5):
         metrics = ['accuracy']  # Fallback for older TF versions
     
     model.compile(
-        optimizer=Adam(learning_rate=0.001),  # Start with higher LR
+        optimizer=Adam(learning_rate=learning_rate),  # Start with higher LR
         loss='binary_crossentropy',
         metrics=metrics
     )
@@ -88,18 +95,8 @@ def create_data_generators(train_dir, val_dir, test_dir, batch_size=32,
     """
     if use_augmentation:
         # Training data generator with augmentation
-        train_datagen = ImageDataGenerator(
-            rescale=1.0/255,
-            rotation_range=20,
-            width_shift_range=0.2,
-            height_shift_range=0.2,
-            shear_range=0.2,
-            zoom_range=0.2,
-            horizontal_flip=True,
-            fill_mode='nearest',
-            brightness_range=[0.8, 1.2],  # Brightness variation
-            channel_shift_range=0.1  # Color variation
-        )
+        # Same policy as data_augmentation() and BatchAugmentation
+        train_datagen = ImageDataGenerator(rescale=1.0/255, **AUGMENTATION_CONFIG)
     else:
         train_datagen = ImageDataGenerator(rescale=1.0/255)
     
@@ -140,8 +137,9 @@ def create_data_generators(train_dir, val_dir, test_dir, batch_size=32,
 def calculate_class_weights(train_generator):
     """
     Calculate class weights to handle imbalanced datasets
+    (accepts a generator with `.classes` or an array of labels)
     """
-    class_counts = train_generator.classes
+    class_counts = np.asarray(getattr(train_generator, 'classes', train_generator))
     total = len(class_counts)
     class_0_count = np.sum(class_counts == 0)
     class_1_count = np.sum(class_counts == 1)
@@ -162,9 +160,20 @@ def calculate_class_weights(train_generator):
 def train_improved_model(model, train_generator, val_generator, 
                         epochs=30, batch_size=32, class_weights=None,
                         model_save_path='best_model.keras',
-                        logs_dir='logs'):
+                        logs_dir='logs', extra_callbacks=None,
+                        steps_per_epoch=None, validation_steps=None, verbose=1,
+                        checkpoint_dir=None, checkpoint_every=500, keep_checkpoints=3,
+                        resume=False, resume_dir=None, profile=False, trace_steps=None):
     """
     Train model with improved callbacks and monitoring
+    (steps default to the generators' lengths; pass them for endless or
+    distributed datasets). With checkpoint_dir, full training state is saved
+    every checkpoint_every steps; resume=True continues from the newest one
+    (read from resume_dir when it differs, e.g. on non-chief workers). A
+    tf.data training set is then read through one iterator whose position
+    is checkpointed at epoch starts.
+    profile=True writes per-step throughput to logs_dir/throughput.csv and
+    trace_steps=(first, last) captures a profiler trace of those steps.
     """
     # Create logs directory
     os.makedirs(logs_dir, exist_ok=True)
@@ -178,7 +187,7 @@ def train_improved_model(model, train_generator, val_generator,
             save_best_only=True,
             save_weights_only=False,
             mode='min',
-            verbose=1
+            verbose=verbose
         ),
         
         # Early stopping to prevent overfitting
@@ -206,16 +215,40 @@ def train_improved_model(model, train_generator, val_generator,
         #     update_freq='epoch'
         # ),
         
-        # CSV logger
+        # CSV logger (appends when continuing an interrupted run)
         CSVLogger(
             os.path.join(logs_dir, 'training.log'),
-            append=False
+            append=resume
         )
-    ]
+    ] + list(extra_callbacks or [])
     
     # Calculate steps per epoch
-    steps_per_epoch = len(train_generator)
-    validation_steps = len(val_generator)
+    steps_per_epoch = steps_per_epoch or len(train_generator)
+    validation_steps = validation_steps or len(val_generator)
+    
+    profiler = None
+    if profile or trace_steps:
+        profiler = ThroughputProfiler(logs_dir, batch_size=batch_size, trace_steps=trace_steps, append=resume)
+        callbacks.append(profiler)
+    
+    initial_epoch, start_step = 0, 0
+    checkpointer = None
+    if checkpoint_dir:
+        if isinstance(train_generator, tf.data.Dataset):
+            train_generator = IteratorSequence(train_generator, steps_per_epoch)
+        # Last, so the callbacks it tracks have reset themselves before it restores them
+        tracked = [callback for callback in callbacks
+                   if isinstance(callback, (ModelCheckpoint, EarlyStopping, ReduceLROnPlateau))]
+        checkpointer = ResumableCheckpoint(checkpoint_dir, checkpoint_every, keep_checkpoints,
+                                           tracked_callbacks=tracked, train_data=train_generator,
+                                           restore_directory=resume_dir)
+        callbacks.append(checkpointer)
+        position = checkpointer.restore(model) if resume else None
+        if position is not None:
+            initial_epoch, start_step = position
+            print(f"\n♻️  Resuming from {checkpoint_dir}: epoch {initial_epoch + 1}, step {start_step}")
+        elif resume:
+            print(f"\n⚠️  No checkpoint found in {checkpoint_dir}; starting from scratch")
     
     print(f"\n🚀 Starting training...")
     print(f"   Steps per epoch: {steps_per_epoch}")
@@ -223,37 +256,134 @@ def train_improved_model(model, train_generator, val_generator,
     print(f"   Total epochs: {epochs}")
     print(f"   Batch size: {batch_size}\n")
     
-    # Train model
-    history = model.fit(
-        train_generator,
-        steps_per_epoch=steps_per_epoch,
-        epochs=epochs,
+    fit_args = dict(
         validation_data=val_generator,
         validation_steps=validation_steps,
         callbacks=callbacks,
         class_weight=class_weights,
-        verbose=1
+        verbose=verbose
     )
+    histories = []
+    
+    if start_step:
+        # Finish the interrupted epoch from the saved batch, then continue normally
+        checkpointer.step_offset = start_step
+        resumed = ResumedEpoch(train_generator, start_step) if isinstance(train_generator, Sequence) \
+            else train_generator
+        if profiler:
+            resumed = profiler.wrap(resumed)
+        histories.append(model.fit(resumed, steps_per_epoch=steps_per_epoch - start_step,
+                                   initial_epoch=initial_epoch, epochs=initial_epoch + 1, **fit_args))
+        initial_epoch += 1
+    
+    # Train model (the profiler times batch waits; the checkpointer keeps the unwrapped input)
+    if not (histories and model.stop_training):
+        histories.append(model.fit(
+            profiler.wrap(train_generator) if profiler else train_generator,
+            steps_per_epoch=steps_per_epoch,
+            initial_epoch=initial_epoch,
+            epochs=epochs,
+            **fit_args
+        ))
+    
+    history = histories[0]
+    for later in histories[1:]:
+        for key, values in later.history.items():
+            history.history.setdefault(key, []).extend(values)
+        history.epoch.extend(later.epoch)
     
     return history
 
 
+def train_head_on_features(model, train_paths, train_labels, val_paths, val_labels,
+                           feature_store_dir, epochs=30, batch_size=64, class_weights=None,
+                           augment_variants=0, model_save_path='best_model.keras',
+                           logs_dir='logs', extra_callbacks=None):
+    """
+    Train only the classifier head on cached pooled backbone features.
+    The frozen VGG16 runs once per image (and once per augmentation variant);
+    its features live in the feature store, so later runs skip it entirely.
+    The head shares its layers with `model`, so the full model is saved with
+    the trained head and stays servable as-is.
+    """
+    from ml.src.augmentation import BatchAugmentation
+
+    split = split_backbone_head(model)
+    if split is None:
+        raise ValueError("Model has no GlobalAveragePooling2D layer to split the head at")
+    backbone, head = split
+    store = open_feature_store(feature_store_dir, backbone)
+    print(f"\n🗄️  Feature store: {store.directory} ({len(store)} cached vectors)")
+
+    print(f"   Extracting train features ({len(train_paths)} images)...")
+    x_train = [extract_features(backbone, train_paths, store, batch_size=batch_size)]
+    for variant in range(1, augment_variants + 1):
+        print(f"   Extracting augmentation variant {variant}/{augment_variants}...")
+        augmentation = BatchAugmentation(seed=42 + variant)
+        x_train.append(extract_features(
+            backbone, train_paths, store, batch_size=batch_size,
+            transform=lambda batch: augmentation(batch, training=True), variant=f"aug{variant}"
+        ))
+    x_train = np.concatenate(x_train)
+    y_train = np.tile(np.asarray(train_labels, dtype=np.float32), augment_variants + 1)
+
+    print(f"   Extracting val features ({len(val_paths)} images)...")
+    x_val = extract_features(backbone, val_paths, store, batch_size=batch_size)
+    y_val = np.asarray(val_labels, dtype=np.float32)
+
+    try:
+        from tensorflow.keras.metrics import Precision, Recall
+        metrics = ['accuracy', Precision(name='precision'), Recall(name='recall')]
+    except ImportError:
+        metrics = ['accuracy']
+
+    head.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='binary_crossentropy',
+        metrics=metrics
+    )
+
+    os.makedirs(logs_dir, exist_ok=True)
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True, verbose=1),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-7, verbose=1),
+        CSVLogger(os.path.join(logs_dir, 'head_training.log'), append=False)
+    ] + list(extra_callbacks or [])
+
+    print(f"\n🚀 Training head on {len(x_train)} cached feature vectors...")
+    history = head.fit(
+        x_train, y_train,
+        batch_size=batch_size,
+        epochs=epochs,
+        validation_data=(x_val, y_val),
+        callbacks=callbacks,
+        class_weight=class_weights,
+        shuffle=True,
+        verbose=1
+    )
+
+    # Head layers are the model's own layers, so the full model already has the trained head
+    model.save(model_save_path)
+    print(f"💾 Full model with trained head saved to: {model_save_path}")
+    return history
+
+
 def unfreeze_and_finetune(model, train_generator, val_generator,
-                         epochs=10, fine_tune_lr=1e-5):
+                         epochs=10, fine_tune_lr=1e-5, fine_tune_layers=6,
+                         callbacks=None, verbose=1):
     """
     Unfreeze some layers for fine-tuning (optional advanced step)
     """
-    print("\n🔧 Fine-tuning: Unfreezing last few layers...")
+    print(f"\n🔧 Fine-tuning: Unfreezing last {fine_tune_layers} backbone layers...")
     
-    # Unfreeze last 3 blocks of VGG16
-    base_model = model.layers[0]
-    base_model.trainable = True
+    # VGG16 layers are inlined in the functional model, up to the pooling layer
+    pool_index = next(i for i, layer in enumerate(model.layers)
+                      if isinstance(layer, GlobalAveragePooling2D))
+    backbone_layers = model.layers[:pool_index]
     
     # Freeze early layers, unfreeze later layers
-    for layer in base_model.layers[:-6]:
-        layer.trainable = False
-    for layer in base_model.layers[-6:]:
-        layer.trainable = True
+    for i, layer in enumerate(backbone_layers):
+        layer.trainable = i >= len(backbone_layers) - fine_tune_layers
     
     # Recompile with lower learning rate
     try:
@@ -277,7 +407,8 @@ def unfreeze_and_finetune(model, train_generator, val_generator,
         epochs=epochs,
         validation_data=val_generator,
         validation_steps=len(val_generator),
-        verbose=1
+        callbacks=callbacks,
+        verbose=verbose
     )
     
     return history
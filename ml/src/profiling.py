@@ -0,0 +1,215 @@
+"""
+Training Throughput Profiler for ReluRay
+Per-step wall time, model step time, input wait time, images/s and
+process RSS, written as CSV next to training.log. Steps that spent most of
+their time waiting for a batch are flagged input-bound, and a TensorFlow
+profiler trace can be captured for a window of steps.
+"""
+
+import os
+import csv
+import json
+import time
+import threading
+import statistics
+from collections import deque
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.utils import Sequence
+
+try:
+    import psutil
+except ImportError:  # RSS falls back to the peak reported by resource
+    psutil = None
+
+THROUGHPUT_FILE = 'throughput.csv'
+SUMMARY_FILE = 'throughput_summary.json'
+
+
+def current_rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10  # peak, in KiB on Linux
+
+
+class TimedSequence(Sequence):
+    """
+    Sequence wrapper recording when each batch became ready, in the order
+    produced. Keras loads batches ahead of the step that uses them, so the
+    load time itself says little; what matters is whether the batch was
+    ready by the time the step asked for it.
+    """
+
+    def __init__(self, data, **kwargs):
+        super().__init__(**kwargs)
+        self.data = data
+        self.timings = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        batch = self.data[idx]
+        ready = time.perf_counter()
+        with self._lock:
+            self.timings.append((ready, len(batch[0])))
+        return batch
+
+    def on_epoch_end(self):
+        self.data.on_epoch_end()
+
+    def pop_timing(self):
+        with self._lock:
+            return self.timings.popleft() if self.timings else (None, None)
+
+    def clear(self):
+        with self._lock:
+            self.timings.clear()
+
+
+class ThroughputProfiler(Callback):
+    """
+    Records one CSV row per training step: step_ms (wall time since the
+    previous step), data_ms (how long the step waited for its batch to be
+    ready, for Sequence inputs passed through wrap()), compute_ms (the rest
+    of the step), images/s and RSS. A step is input-bound when that wait was
+    at least `input_bound_threshold` of the step time: past that point the
+    model is waiting on the input pipeline rather than training. tf.data
+    inputs are left as they are (wrapping would change the pipeline being
+    measured); use trace_steps and the trace's input-pipeline analysis for them.
+    Rows and the step count carry over between fit() calls on the same
+    instance (resumed partial epochs); append=True continues an earlier file.
+    """
+
+    def __init__(self, logs_dir, batch_size=None, timed_input=None, input_bound_threshold=0.8,
+                 trace_steps=None, append=False):
+        super().__init__()
+        self.logs_dir = logs_dir
+        self.batch_size = batch_size
+        self.timed_input = timed_input
+        self.input_bound_threshold = input_bound_threshold
+        self.trace_steps = trace_steps  # (first, last) global steps to trace, or None
+        self.append = append
+        self.global_step = 0
+        self.rows = []
+        self._file = None
+        self._writer = None
+        self._tracing = False
+        self._epoch = 0
+        self._last_end = None
+        self._batch_begin = None
+
+    def wrap(self, data):
+        """Instrument a Sequence input so step wait times are measured; other inputs pass through"""
+        if isinstance(data, Sequence):
+            self.timed_input = TimedSequence(data)
+            return self.timed_input
+        return data
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.logs_dir, exist_ok=True)
+        path = os.path.join(self.logs_dir, THROUGHPUT_FILE)
+        append = self.append or self.global_step > 0
+        new_file = not (append and os.path.exists(path) and os.path.getsize(path))
+        self._file = open(path, 'a' if append else 'w', newline='')
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(['epoch', 'step', 'step_ms', 'compute_ms', 'data_ms',
+                                   'images_per_sec', 'rss_mb', 'input_bound'])
+        # fit() reads a couple of batches up front to infer the input signature
+        if self.timed_input is not None:
+            self.timed_input.clear()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._last_end = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self.global_step == self.trace_steps[0] and not self._tracing:
+            tf.profiler.experimental.start(os.path.join(self.logs_dir, 'profile'))
+            self._tracing = True
+        self._batch_begin = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        step_ms = 1000 * (now - self._last_end)
+        self._last_end = now
+
+        data_ms, images = None, self.batch_size
+        compute_ms = 1000 * (now - self._batch_begin)
+        if self.timed_input is not None:
+            ready, loaded = self.timed_input.pop_timing()
+            if ready is not None:
+                # A batch prefetched while the previous step ran cost this step nothing
+                data_ms, images = 1000 * max(ready - self._batch_begin, 0.0), loaded
+                compute_ms = max(step_ms - data_ms, 0.0)
+        input_bound = data_ms is not None and data_ms >= self.input_bound_threshold * step_ms
+        images_per_sec = images / (step_ms / 1000) if images else None
+
+        row = [self._epoch, batch, round(step_ms, 2), round(compute_ms, 2),
+               None if data_ms is None else round(data_ms, 2),
+               None if images_per_sec is None else round(images_per_sec, 1),
+               round(current_rss_mb(), 1), int(input_bound)]
+        self.rows.append(row)
+        self._writer.writerow(row)
+
+        self.global_step += 1
+        if self._tracing and self.global_step > self.trace_steps[1]:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._file.flush()
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+        self._file.close()
+        # Written after every fit() call; the last one covers the whole run
+        summary = self.summary()
+        with open(os.path.join(self.logs_dir, SUMMARY_FILE), 'w') as f:
+            json.dump(summary, f, indent=2)
+        self._print_summary(summary)
+
+    def summary(self):
+        # The first step of a run includes tracing/compilation; leave it out
+        rows = self.rows[1:] or self.rows
+        if not rows:
+            return {}
+        step_ms = [row[2] for row in rows]
+        data_ms = [row[4] for row in rows if row[4] is not None]
+        throughput = [row[5] for row in rows if row[5] is not None]
+        input_bound = sum(row[7] for row in rows)
+        return {
+            'steps': len(rows),
+            'mean_step_ms': statistics.mean(step_ms),
+            'p95_step_ms': sorted(step_ms)[int(0.95 * (len(step_ms) - 1))],
+            'mean_compute_ms': statistics.mean(row[3] for row in rows),
+            'mean_data_ms': statistics.mean(data_ms) if data_ms else None,
+            'median_images_per_sec': statistics.median(throughput) if throughput else None,
+            'input_bound_steps': input_bound,
+            'input_bound_fraction': input_bound / len(rows),
+            'peak_rss_mb': max(row[6] for row in rows),
+        }
+
+    def _print_summary(self, summary):
+        if not summary:
+            return
+        print(f"\n⏱️  Throughput summary ({summary['steps']} steps, {os.path.join(self.logs_dir, THROUGHPUT_FILE)})")
+        print(f"   Step time: {summary['mean_step_ms']:.1f} ms mean, {summary['p95_step_ms']:.1f} ms p95")
+        print(f"   Compute: {summary['mean_compute_ms']:.1f} ms mean")
+        if summary['mean_data_ms'] is not None:
+            print(f"   Input wait: {summary['mean_data_ms']:.1f} ms mean")
+        else:
+            print("   Input wait: not measured for tf.data inputs; "
+                  "capture a trace with --profile-steps to check the input pipeline")
+        if summary['median_images_per_sec'] is not None:
+            print(f"   Throughput: {summary['median_images_per_sec']:.1f} images/s (median)")
+        print(f"   Input-bound steps: {summary['input_bound_steps']} ({summary['input_bound_fraction']:.0%})")
+        print(f"   Peak RSS: {summary['peak_rss_mb']:.0f} MB")
+        if summary['input_bound_fraction'] > 0.2:
+            print("   ⚠️  Training is input-bound; try --tf-data, --tensor-cache or --shards")
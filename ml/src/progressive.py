@@ -0,0 +1,130 @@
+"""
+Progressive-Resolution Training for ReluRay
+Early epochs train on downscaled images (128px and up), later epochs at the
+full 224px. Images come from the uint8 tensor cache and are resized on the
+fly, so every stage reads the same cache. The VGG16 backbone is convolutional
+and the head sits behind GlobalAveragePooling2D, so one model with a
+(None, None, 3) input trains at every size.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+from ml.src.input_pipeline import shuffle_all
+from ml.src.tensor_cache import load_tensor_cache, read_rows
+
+FULL_SIZE = 224
+DEFAULT_SIZES = (128, 160, 192, FULL_SIZE)
+
+
+def make_schedule(epochs, sizes=DEFAULT_SIZES):
+    """
+    [(start_epoch, size), ...]: the smaller sizes split the first half of
+    training evenly and the last (full) size runs the second half.
+    """
+    half = epochs // 2
+    steps = len(sizes) - 1
+    schedule = [(round(i * half / steps), size) for i, size in enumerate(sizes[:-1])]
+    schedule.append((half, sizes[-1]))
+    # Drop stages squeezed out by a short run
+    return [stage for i, stage in enumerate(schedule)
+            if i + 1 == len(schedule) or stage[0] < schedule[i + 1][0]]
+
+
+def parse_schedule(text):
+    """'0:128,5:160,10:224' -> [(0, 128), (5, 160), (10, 224)]"""
+    schedule = []
+    for stage in text.split(','):
+        start, size = stage.split(':')
+        schedule.append((int(start), int(size)))
+    if not schedule or schedule[0][0] != 0 or schedule != sorted(schedule):
+        raise ValueError(f"Schedule must start at epoch 0 and be in epoch order: {text}")
+    return schedule
+
+
+def size_for_epoch(schedule, epoch):
+    size = schedule[0][1]
+    for start, stage_size in schedule:
+        if epoch >= start:
+            size = stage_size
+    return size
+
+
+def resizable_cache_dataset(cache_dir, split, batch_size=64, training=False, image_size=None, seed=42,
+                            augment=None):
+    """
+    Batched (image, label) dataset over a tensor cache split.
+    image_size: None keeps the cached resolution; an int or scalar tf.Variable
+        resizes (antialiased) to a square of that size. A variable is read
+        when each batch is produced, so assigning it between epochs changes
+        the resolution of the next epoch.
+    augment: optional callable applied to each resized (images, labels) batch
+    Carries `.classes` and `.filepaths` like TensorCacheSequence.
+    """
+    images, classes, paths = load_tensor_cache(cache_dir, split)
+    labels = classes.astype(np.float32)
+    height, width = images.shape[1:3]
+
+    def load_batch(rows):
+        batch, batch_labels = tf.numpy_function(lambda rows: read_rows(rows, images, labels), [rows],
+                                                (tf.uint8, tf.float32))
+        batch.set_shape([None, height, width, 3])
+        batch_labels.set_shape([None])
+        batch = tf.cast(batch, tf.float32)
+        if image_size is not None:
+            size = tf.cast(image_size, tf.int32)
+            batch = tf.image.resize(batch, tf.stack([size, size]), antialias=True)
+        return batch / 255.0, batch_labels
+
+    dataset = tf.data.Dataset.range(len(labels))
+    if training:
+        dataset = shuffle_all(dataset, len(labels), seed)
+    dataset = dataset.batch(batch_size).map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    if augment is not None:
+        dataset = dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+
+    options = tf.data.Options()
+    options.deterministic = True
+    dataset = dataset.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+    dataset.classes = classes
+    dataset.filepaths = paths.tolist()
+    dataset.samples = len(labels)
+    return dataset
+
+
+class ProgressiveResizing(Callback):
+    """
+    Sets the training resolution at the start of each epoch from a
+    [(start_epoch, size), ...] schedule and records time spent at each size.
+    Keras re-creates the dataset iterator every epoch, after on_epoch_begin,
+    so no batch of the new epoch is produced at the old size.
+    """
+
+    def __init__(self, schedule, size_variable):
+        super().__init__()
+        self.schedule = schedule
+        self.size_variable = size_variable
+        self.epoch_times = []  # (epoch, size, seconds)
+        self._start = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        size = size_for_epoch(self.schedule, epoch)
+        if not self.epoch_times or int(self.size_variable.numpy()) != size:
+            print(f"\n📐 Epoch {epoch + 1}: training at {size}x{size}")
+        self.size_variable.assign(size)
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_times.append((epoch, int(self.size_variable.numpy()), time.perf_counter() - self._start))
+
+    def on_train_end(self, logs=None):
+        if not self.epoch_times:
+            return
+        print("\n📐 Time per resolution:")
+        for size in sorted({size for _, size, _ in self.epoch_times}):
+            seconds = [s for _, stage_size, s in self.epoch_times if stage_size == size]
+            print(f"   {size}x{size}: {len(seconds)} epochs, {sum(seconds) / len(seconds):.1f}s/epoch")
@@ -0,0 +1,62 @@
+"""
+Post-training int8 Quantization for ReluRay
+Converts a trained Keras model to a full-integer TFLite model (int8 weights
+and activations), calibrating activation ranges on a class-stratified subset
+of the validation split. Input and output stay float32, so the model takes
+the same [0, 1] images as the Keras model.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from ml.src.tensor_cache import load_tensor_cache, read_rows
+
+
+def calibration_subset(cache_dir, split='val', size=200, seed=42):
+    """Up to `size` cached images of `split`, sampled per class in proportion to the split"""
+    images, labels, _ = load_tensor_cache(cache_dir, split)
+    rng = np.random.default_rng(seed)
+    rows = []
+    for label in np.unique(labels):
+        candidates = np.flatnonzero(labels == label)
+        count = min(len(candidates), max(1, int(round(size * len(candidates) / len(labels)))))
+        rows.append(rng.choice(candidates, count, replace=False))
+    return read_rows(np.concatenate(rows), images).astype(np.float32) / 255.0
+
+
+def quantize_int8(model, calibration_images):
+    """Full-integer TFLite flatbuffer for `model`, calibrated on `calibration_images`"""
+    def representative_dataset():
+        for image in calibration_images:
+            yield [image[np.newaxis]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keras 3 models convert through a SavedModel export
+        saved_model_dir = os.path.join(tmp, 'saved_model')
+        model.export(saved_model_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        return converter.convert()
+
+
+class TFLiteModel:
+    """predict_on_batch over a TFLite interpreter, one image at a time"""
+
+    def __init__(self, path, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+
+    def predict_on_batch(self, batch):
+        predictions = []
+        for image in np.asarray(batch, dtype=np.float32):
+            self.interpreter.set_tensor(self._input, image[np.newaxis])
+            self.interpreter.invoke()
+            predictions.append(self.interpreter.get_tensor(self._output).copy())
+        return np.concatenate(predictions)
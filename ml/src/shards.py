@@ -0,0 +1,128 @@
+"""
+Sharded TFRecord Dataset Format for ReluRay
+Packs each split into fixed-size TFRecord shards (encoded image bytes, label,
+content hash) and streams them back with interleaving and shuffling, so an
+epoch reads a few large files sequentially instead of opening 36K JPEGs.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import tensorflow as tf
+
+SHARD_MANIFEST = 'manifest.json'
+DEFAULT_SHARD_SIZE = 2048  # Records per shard (~40MB of 224x224 JPEGs)
+
+
+def _bytes_feature(value):
+    return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value]))
+
+
+def _int64_feature(value):
+    return tf.train.Feature(int64_list=tf.train.Int64List(value=[value]))
+
+
+def write_split_shards(index, split, output_dir, class_names, shard_size=DEFAULT_SHARD_SIZE, seed=42):
+    """
+    Write one split of a DatasetIndex as <split>-00000-of-000NN.tfrecord shards.
+    Records are shuffled once at pack time so every shard mixes both classes.
+    Returns the list of shard descriptions for the manifest.
+    """
+    split_index = index.select(split=split)
+    labels = split_index.labels(class_names)
+    order = np.random.default_rng(seed).permutation(len(split_index))
+
+    num_shards = max(1, -(-len(order) // shard_size))
+    shards = []
+    for shard_id in range(num_shards):
+        rows = order[shard_id * shard_size:(shard_id + 1) * shard_size]
+        filename = f"{split}-{shard_id:05d}-of-{num_shards:05d}.tfrecord"
+        counts = [0] * len(class_names)
+        with tf.io.TFRecordWriter(os.path.join(output_dir, filename)) as writer:
+            for row in rows:
+                with open(split_index.paths[row], 'rb') as f:
+                    encoded = f.read()
+                label = int(labels[row])
+                counts[label] += 1
+                example = tf.train.Example(features=tf.train.Features(feature={
+                    'image/encoded': _bytes_feature(encoded),
+                    'image/label': _int64_feature(label),
+                    'image/sha256': _bytes_feature(hashlib.sha256(encoded).hexdigest().encode()),
+                }))
+                writer.write(example.SerializeToString())
+        shards.append({'file': filename, 'records': len(rows), 'class_counts': counts})
+        print(f"   💾 {filename}: {len(rows)} records")
+    return shards
+
+
+def pack_dataset(index, output_dir, splits=('train', 'val', 'test'), shard_size=DEFAULT_SHARD_SIZE, seed=42):
+    """Pack every split of a DatasetIndex and write the shard manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    class_names = index.class_names()
+    manifest = {'class_names': class_names, 'shard_size': shard_size, 'splits': {}}
+    for split in splits:
+        if not np.any(index.splits == split):
+            continue
+        print(f"\n📦 Packing {split}...")
+        manifest['splits'][split] = write_split_shards(index, split, output_dir, class_names, shard_size, seed)
+    with open(os.path.join(output_dir, SHARD_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(shard_dir):
+    with open(os.path.join(shard_dir, SHARD_MANIFEST), 'r') as f:
+        return json.load(f)
+
+
+def split_labels(shard_dir, split):
+    """Label array with the split's class counts (for class weights)"""
+    manifest = load_manifest(shard_dir)
+    totals = np.sum([shard['class_counts'] for shard in manifest['splits'][split]], axis=0)
+    return np.repeat(np.arange(len(totals)), totals)
+
+
+def _parse_example(serialized, target_size):
+    parsed = tf.io.parse_single_example(serialized, {
+        'image/encoded': tf.io.FixedLenFeature([], tf.string),
+        'image/label': tf.io.FixedLenFeature([], tf.int64),
+    })
+    image = tf.io.decode_image(parsed['image/encoded'], channels=3, expand_animations=False)
+    image = tf.image.resize(image, target_size)
+    image = tf.cast(image, tf.float32) / 255.0
+    return image, tf.cast(parsed['image/label'], tf.float32)
+
+
+def shard_dataset(shard_dir, split, batch_size=32, training=False, target_size=(224, 224),
+                  cycle_length=4, shuffle_buffer=4096, seed=42, augment=None):
+    """
+    Stream a split from its shards as batched (image, label) pairs.
+    Training reads shuffle the shard order each epoch, interleave records from
+    cycle_length shards and shuffle within a buffer; evaluation reads keep
+    the packed order. augment is an optional callable applied to each
+    (images, labels) batch, as in directory_dataset.
+    """
+    manifest = load_manifest(shard_dir)
+    files = [os.path.join(shard_dir, shard['file']) for shard in manifest['splits'][split]]
+    total = sum(shard['records'] for shard in manifest['splits'][split])
+
+    dataset = tf.data.Dataset.from_tensor_slices(files)
+    if training:
+        dataset = dataset.shuffle(len(files), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.interleave(
+        tf.data.TFRecordDataset,
+        cycle_length=min(cycle_length, len(files)) if training else 1,
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=True
+    )
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(lambda record: _parse_example(record, target_size),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.batch(batch_size)
+    if augment is not None:
+        dataset = dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+    # Record counts are known from the manifest, so Keras can size epochs
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-total // batch_size)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,234 @@
+"""
+Hyperparameter Sweeps for ReluRay
+Random search over the training hyperparameters, run as parallel trial
+processes inside a CPU budget. Trials report validation loss every epoch to
+a SQLite results database; a median pruner stops trials that fall behind
+their peers. All trials read the same memory-mapped tensor cache, so images
+are decoded once for the whole sweep.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import sqlite3
+import statistics
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+DEFAULT_SEARCH_SPACE = {
+    'dropout_rate': [0.3, 0.4, 0.5, 0.6],
+    'learning_rate': {'log_uniform': [1e-4, 3e-3]},
+    'batch_size': [32, 64, 128],
+    'fine_tune_layers': [0, 4, 8],
+    'fine_tune_lr': {'log_uniform': [1e-6, 1e-4]},
+}
+
+
+def sample_config(space, rng):
+    """
+    One configuration from a search space: lists are choices,
+    {'uniform': [a, b]} and {'log_uniform': [a, b]} are ranges, anything else
+    is a fixed value.
+    """
+    config = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            config[name] = rng.choice(spec)
+        elif isinstance(spec, dict) and 'uniform' in spec:
+            config[name] = rng.uniform(*spec['uniform'])
+        elif isinstance(spec, dict) and 'log_uniform' in spec:
+            low, high = spec['log_uniform']
+            config[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            config[name] = spec
+    return config
+
+
+class ResultsDB:
+    """SQLite record of every trial: config, status, per-epoch reports, final metrics and artifact"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('''CREATE TABLE IF NOT EXISTS trials (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                config TEXT NOT NULL,
+                status TEXT NOT NULL,
+                metrics TEXT,
+                artifact TEXT,
+                started REAL,
+                finished REAL)''')
+            db.execute('''CREATE TABLE IF NOT EXISTS reports (
+                trial_id INTEGER NOT NULL,
+                epoch INTEGER NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (trial_id, epoch))''')
+
+    def _connect(self):
+        # Trial processes write concurrently; wait on locks instead of failing
+        return sqlite3.connect(self.path, timeout=60)
+
+    def create_trial(self, config):
+        with self._connect() as db:
+            cursor = db.execute('INSERT INTO trials (config, status, started) VALUES (?, ?, ?)',
+                                (json.dumps(config), 'running', time.time()))
+            return cursor.lastrowid
+
+    def report(self, trial_id, epoch, value):
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO reports (trial_id, epoch, value) VALUES (?, ?, ?)',
+                       (trial_id, epoch, value))
+
+    def best_values_at(self, epoch, exclude=None):
+        """Each other trial's best reported value up to `epoch`"""
+        with self._connect() as db:
+            rows = db.execute('SELECT trial_id, MIN(value) FROM reports WHERE epoch <= ? AND trial_id != ? '
+                              'GROUP BY trial_id HAVING MAX(epoch) >= ?',
+                              (epoch, -1 if exclude is None else exclude, epoch)).fetchall()
+        return [value for _, value in rows]
+
+    def finish(self, trial_id, status, metrics=None, artifact=None):
+        with self._connect() as db:
+            db.execute('UPDATE trials SET status = ?, metrics = ?, artifact = ?, finished = ? WHERE id = ?',
+                       (status, json.dumps(metrics or {}), artifact, time.time(), trial_id))
+
+    def trials(self, status=None):
+        query = 'SELECT id, config, status, metrics, artifact FROM trials'
+        args = ()
+        if status:
+            query += ' WHERE status = ?'
+            args = (status,)
+        with self._connect() as db:
+            rows = db.execute(query, args).fetchall()
+        return [{'id': row[0], 'config': json.loads(row[1]), 'status': row[2],
+                 'metrics': json.loads(row[3]) if row[3] else {}, 'artifact': row[4]} for row in rows]
+
+
+class MedianPruner:
+    """Prune a trial whose best val_loss is worse than the median of its peers at the same epoch"""
+
+    def __init__(self, warmup_epochs=2, min_trials=3):
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def should_prune(self, db, trial_id, epoch, best_value):
+        if epoch < self.warmup_epochs:
+            return False
+        peers = db.best_values_at(epoch, exclude=trial_id)
+        return len(peers) >= self.min_trials and best_value > statistics.median(peers)
+
+
+def _pruning_callback(db, trial_id, pruner, epoch_offset=0, monitor='val_loss'):
+    from tensorflow.keras.callbacks import Callback
+
+    class PruningCallback(Callback):
+        """Reports `monitor` each epoch and stops training once the pruner says so"""
+
+        def __init__(self):
+            super().__init__()
+            self.epoch_offset = epoch_offset
+            self.best = math.inf
+            self.pruned = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            value = (logs or {}).get(monitor)
+            if value is None:
+                return
+            step = self.epoch_offset + epoch
+            self.best = min(self.best, value)
+            db.report(trial_id, step, value)
+            if pruner.should_prune(db, trial_id, step, self.best):
+                self.pruned = True
+                self.model.stop_training = True
+
+    return PruningCallback()
+
+
+def run_trial(trial_id, config, db_path, cache_dir, artifacts_dir, epochs, fine_tune_epochs,
+              threads, pruner):
+    """Trial process entry point: train one configuration and record the outcome"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(2)
+
+    from ml.src.model_training_improved import build_improved_model, calculate_class_weights, unfreeze_and_finetune
+    from ml.src.tensor_cache import TensorCacheSequence
+
+    db = ResultsDB(db_path)
+    try:
+        batch_size = int(config['batch_size'])
+        train = TensorCacheSequence(cache_dir, 'train', batch_size=batch_size, shuffle=True, seed=trial_id)
+        val = TensorCacheSequence(cache_dir, 'val', batch_size=batch_size)
+        class_weights = calculate_class_weights(train)
+
+        model = build_improved_model(dropout_rate=config['dropout_rate'], learning_rate=config['learning_rate'])
+        pruning = _pruning_callback(db, trial_id, pruner)
+        history = model.fit(train, epochs=epochs, validation_data=val, class_weight=class_weights,
+                            callbacks=[pruning], verbose=0)
+        val_losses = list(history.history['val_loss'])
+        val_accuracies = list(history.history['val_accuracy'])
+
+        if not pruning.pruned and config.get('fine_tune_layers') and fine_tune_epochs:
+            pruning.epoch_offset = len(val_losses)
+            history = unfreeze_and_finetune(model, train, val, epochs=fine_tune_epochs,
+                                            fine_tune_lr=config['fine_tune_lr'],
+                                            fine_tune_layers=int(config['fine_tune_layers']),
+                                            callbacks=[pruning], verbose=0)
+            val_losses += history.history['val_loss']
+            val_accuracies += history.history['val_accuracy']
+
+        metrics = {
+            'best_val_loss': float(min(val_losses)),
+            'best_val_accuracy': float(max(val_accuracies)),
+            'epochs': len(val_losses),
+        }
+        if pruning.pruned:
+            db.finish(trial_id, 'pruned', metrics)
+            return trial_id, 'pruned', metrics
+
+        artifact = os.path.join(artifacts_dir, f"trial_{trial_id}.keras")
+        model.save(artifact)
+        db.finish(trial_id, 'complete', metrics, artifact)
+        return trial_id, 'complete', metrics
+    except Exception as e:
+        db.finish(trial_id, 'failed', {'error': str(e)})
+        return trial_id, 'failed', {'error': str(e)}
+
+
+def run_sweep(db_path, cache_dir, artifacts_dir, space=None, n_trials=12, cpus=None,
+              threads_per_trial=4, epochs=10, fine_tune_epochs=5, pruner=None, seed=42):
+    """
+    Run n_trials sampled configurations, as many at once as the CPU budget
+    allows (cpus // threads_per_trial). Returns the ResultsDB.
+    """
+    space = space or DEFAULT_SEARCH_SPACE
+    cpus = cpus or os.cpu_count() or 1
+    parallel = max(1, cpus // threads_per_trial)
+    pruner = pruner or MedianPruner()
+    rng = random.Random(seed)
+    db = ResultsDB(db_path)
+    os.makedirs(artifacts_dir, exist_ok=True)
+
+    print(f"🧪 {n_trials} trials, {parallel} in parallel ({threads_per_trial} threads each, {cpus} CPUs)")
+    # Spawned workers: TensorFlow does not survive fork()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=context) as pool:
+        pending = set()
+        submitted = 0
+        while submitted < n_trials or pending:
+            while submitted < n_trials and len(pending) < parallel:
+                config = sample_config(space, rng)
+                trial_id = db.create_trial(config)
+                pending.add(pool.submit(run_trial, trial_id, config, db_path, cache_dir, artifacts_dir,
+                                        epochs, fine_tune_epochs, threads_per_trial, pruner))
+                submitted += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial_id, status, metrics = future.result()
+                summary = ', '.join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}"
+                                    for k, v in metrics.items())
+                print(f"   trial {trial_id}: {status} ({summary})")
+    return db
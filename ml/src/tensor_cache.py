@@ -0,0 +1,153 @@
+"""
+Memory-mapped Tensor Cache for ReluRay
+Materializes each split once as an N x 224 x 224 x 3 uint8 .npy array plus
+labels, so training and evaluation read pixels straight from the OS page
+cache (shared across processes) with no JPEG decode. uint8 keeps the cache
+4x smaller than float32; batches are scaled to [0, 1] on the fly.
+"""
+
+import os
+import json
+import numpy as np
+from PIL import Image
+from tensorflow.keras.utils import Sequence
+
+CACHE_META = 'tensor_cache.json'
+
+
+def _cache_paths(cache_dir, split):
+    return (os.path.join(cache_dir, f"{split}_images.npy"),
+            os.path.join(cache_dir, f"{split}_labels.npy"),
+            os.path.join(cache_dir, f"{split}_paths.npy"))
+
+
+def _signature(split_index):
+    """Cheap fingerprint of a split's source files (count + total bytes)"""
+    return {'count': int(len(split_index)), 'bytes': int(split_index.sizes.sum())}
+
+
+def build_tensor_cache(index, split, cache_dir, class_names=None, target_size=(224, 224)):
+    """Decode one split of a DatasetIndex into a uint8 memmap cache"""
+    os.makedirs(cache_dir, exist_ok=True)
+    class_names = class_names or index.class_names()
+    split_index = index.select(split=split)
+    images_path, labels_path, paths_path = _cache_paths(cache_dir, split)
+
+    tmp_images_path = images_path + '.tmp.npy'
+    images = np.lib.format.open_memmap(
+        tmp_images_path, mode='w+', dtype=np.uint8,
+        shape=(len(split_index), target_size[1], target_size[0], 3)
+    )
+    for i, path in enumerate(split_index.paths):
+        with Image.open(path) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            if img.size != tuple(target_size):
+                img = img.resize(target_size, Image.Resampling.LANCZOS)
+            images[i] = np.asarray(img, dtype=np.uint8)
+        if (i + 1) % 1000 == 0:
+            print(f"   ⏳ {split}: {i + 1}/{len(split_index)} images cached")
+    images.flush()
+    del images
+    os.replace(tmp_images_path, images_path)
+
+    np.save(labels_path, split_index.labels(class_names).astype(np.int32))
+    np.save(paths_path, split_index.paths)
+
+    meta_path = os.path.join(cache_dir, CACHE_META)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    meta['class_names'] = class_names
+    meta.setdefault('splits', {})[split] = _signature(split_index)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    print(f"   ✅ {split}: {len(split_index)} images cached to {images_path}")
+
+
+def ensure_tensor_cache(index, cache_dir, splits=('train', 'val', 'test'), target_size=(224, 224)):
+    """Build cache files for any split that is missing or out of date"""
+    meta_path = os.path.join(cache_dir, CACHE_META)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    class_names = index.class_names()
+    for split in splits:
+        split_index = index.select(split=split)
+        if len(split_index) == 0:
+            continue
+        cached = meta.get('splits', {}).get(split)
+        if cached == _signature(split_index) and meta.get('class_names') == class_names \
+                and os.path.exists(_cache_paths(cache_dir, split)[0]):
+            continue
+        print(f"\n📦 Building tensor cache for {split}...")
+        build_tensor_cache(index, split, cache_dir, class_names, target_size)
+
+
+def load_tensor_cache(cache_dir, split):
+    """(images uint8 memmap, labels, paths) for a cached split"""
+    images_path, labels_path, paths_path = _cache_paths(cache_dir, split)
+    images = np.load(images_path, mmap_mode='r')
+    return images, np.load(labels_path), np.load(paths_path)
+
+
+def read_rows(rows, *arrays):
+    """
+    Gather `rows` from cache arrays (images plus any per-row columns), in
+    sorted row order: sorted reads keep memmap access mostly sequential.
+    Returns one array per input, or the array itself for a single input.
+    """
+    rows = np.sort(rows)
+    gathered = tuple(array[rows] for array in arrays)
+    return gathered[0] if len(gathered) == 1 else gathered
+
+
+class TensorCacheSequence(Sequence):
+    """
+    Keras Sequence over a cached split. Exposes `.classes` and `.filepaths`
+    like a DirectoryIterator, so class weights and evaluate_model work as-is.
+    `targets` (one row per image, in cache order) replaces the labels as the
+    batch targets, e.g. to add a teacher's outputs for distillation.
+    `augment` is an optional callable applied to each (images, targets)
+    batch, e.g. augment_batches() for training.
+    """
+
+    def __init__(self, cache_dir, split, batch_size=32, shuffle=False, seed=42, targets=None, augment=None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.images, self.classes, paths = load_tensor_cache(cache_dir, split)
+        self.targets = self.classes if targets is None else np.asarray(targets)
+        self.filepaths = paths.tolist()
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augment = augment
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(len(self.classes))
+        if shuffle:
+            self._rng.shuffle(self._order)
+
+    def __len__(self):
+        return -(-len(self._order) // self.batch_size)
+
+    def __getitem__(self, idx):
+        rows = self._order[idx * self.batch_size:(idx + 1) * self.batch_size]
+        batch, targets = read_rows(rows, self.images, self.targets)
+        batch = batch.astype(np.float32) / 255.0
+        targets = targets.astype(np.float32)
+        if self.augment is not None:
+            batch, targets = (np.asarray(part) for part in self.augment(batch, targets))
+        return batch, targets
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
+
+    def get_state(self):
+        """Current epoch order and shuffle RNG, for resumable checkpoints"""
+        return {'order': self._order.copy(), 'rng': self._rng.bit_generator.state}
+
+    def set_state(self, state):
+        self._order = np.asarray(state['order'])
+        self._rng.bit_generator.state = state['rng']
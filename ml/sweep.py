@@ -0,0 +1,84 @@
+"""
+Hyperparameter Sweep Runner for ReluRay
+Samples dropout, learning rates, batch size and fine-tune depth, trains
+trials in parallel from the shared tensor cache, prunes weak trials early
+and records everything in a SQLite results database.
+
+Usage:
+    python3 ml/sweep.py --trials 16 --cpus 16 --threads-per-trial 4 [--space space.json]
+"""
+
+import sys
+import os
+import json
+import argparse
+
+# Add parent directory to path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.sweep import DEFAULT_SEARCH_SPACE, MedianPruner, run_sweep
+from ml.src.tensor_cache import ensure_tensor_cache
+
+base_dir = parent_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a parallel hyperparameter sweep')
+    parser.add_argument('--trials', type=int, default=12, help='Number of trials to run')
+    parser.add_argument('--cpus', type=int, default=None, help='CPU budget for the sweep (default: all cores)')
+    parser.add_argument('--threads-per-trial', type=int, default=4, help='TensorFlow threads per trial')
+    parser.add_argument('--space', default=None, help='JSON search space (default: built-in space)')
+    parser.add_argument('--epochs', type=int, default=10, help='Head-training epochs per trial')
+    parser.add_argument('--fine-tune-epochs', type=int, default=5, help='Fine-tuning epochs per trial')
+    parser.add_argument('--warmup-epochs', type=int, default=2, help='Epochs before a trial can be pruned')
+    parser.add_argument('--data-dir', default=os.path.join(base_dir, 'data'))
+    parser.add_argument('--tensor-cache', default=os.path.join(base_dir, 'data', 'tensor_cache'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'ml', 'sweeps'),
+                        help='Directory for the results database and trial models')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    space = DEFAULT_SEARCH_SPACE
+    if args.space:
+        with open(args.space, 'r') as f:
+            space = json.load(f)
+
+    print("🔬 ReluRay Hyperparameter Sweep")
+    print("=" * 60)
+    print(f"🔎 Search space: {json.dumps(space)}")
+
+    # Decode the dataset once; every trial memory-maps the same cache
+    index = load_or_build_index(args.data_dir)
+    ensure_tensor_cache(index, args.tensor_cache, splits=('train', 'val'))
+
+    db_path = os.path.join(args.output, 'sweep.db')
+    db = run_sweep(
+        db_path,
+        args.tensor_cache,
+        os.path.join(args.output, 'models'),
+        space=space,
+        n_trials=args.trials,
+        cpus=args.cpus,
+        threads_per_trial=args.threads_per_trial,
+        epochs=args.epochs,
+        fine_tune_epochs=args.fine_tune_epochs,
+        pruner=MedianPruner(warmup_epochs=args.warmup_epochs),
+        seed=args.seed
+    )
+
+    completed = sorted(db.trials(status='complete'), key=lambda t: t['metrics']['best_val_loss'])
+    print("\n" + "=" * 60)
+    print(f"📊 Results database: {db_path}")
+    print(f"   {len(completed)} complete, {len(db.trials(status='pruned'))} pruned, "
+          f"{len(db.trials(status='failed'))} failed")
+    for trial in completed[:5]:
+        metrics = trial['metrics']
+        print(f"   #{trial['id']}: val_loss={metrics['best_val_loss']:.4f} "
+              f"val_acc={metrics['best_val_accuracy']:.4f} {json.dumps(trial['config'])}")
+        print(f"       {trial['artifact']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ Trains model with 36K images using enhanced architecture and best practices
 
 import sys
 import os
+import argparse
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,10 +15,89 @@ from ml.src.model_training_improved import (
     build_improved_model,
     create_data_generators,
     calculate_class_weights,
-    train_improved_model
+    train_improved_model,
+    train_head_on_features
 )
 from ml.src.model_evaluation import plot_metrics, evaluate_model
+from ml.src.dataset_index import load_or_build_index
+from ml.src.shards import shard_dataset, split_labels
+from ml.src.tensor_cache import TensorCacheSequence, ensure_tensor_cache
+from ml.src.input_pipeline import create_datasets, directory_dataset
+from ml.src.augmentation import augment_batches
+from ml.src.mixed_precision import StepTimeCallback, enable_mixed_precision, export_float32, record_precision_run
+from ml.src.progressive import ProgressiveResizing, make_schedule, parse_schedule, resizable_cache_dataset
+from ml.src.distributed import chief_path, distributed_directory_dataset, is_chief, make_strategy
 import numpy as np
+import tensorflow as tf
+
+parser = argparse.ArgumentParser(description='Train the improved ReluRay model')
+parser.add_argument('--shards', default=None,
+                    help='Read train/val from TFRecord shards packed by ml/pack_shards.py '
+                         '(training batches get the same batched augmentation as --tf-data)')
+parser.add_argument('--tensor-cache', default=None,
+                    help='Read all splits from a memory-mapped uint8 cache in this directory, '
+                         'building it on first use (training batches get batched augmentation)')
+parser.add_argument('--tf-data', action='store_true',
+                    help='Use the tf.data pipeline (parallel decode, prefetch, batched augmentation) '
+                         'instead of ImageDataGenerator')
+parser.add_argument('--cache', default=None,
+                    help="With --tf-data, cache decoded images ('' for memory, or a file path)")
+parser.add_argument('--cached-features', default=None,
+                    help='Train only the head on frozen-backbone features cached in this directory')
+parser.add_argument('--feature-variants', type=int, default=0,
+                    help='With --cached-features, also cache N augmented copies of each training image')
+parser.add_argument('--mixed-precision', action='store_true',
+                    help='Train with the mixed_bfloat16 policy on CPUs with native bfloat16 (falls back to float32)')
+parser.add_argument('--progressive', nargs='?', const='auto', default=None, metavar='SCHEDULE',
+                    help="With --tensor-cache, train at increasing resolutions: 'auto' steps 128->224 over "
+                         "the first half of training, or give EPOCH:SIZE stages, e.g. 0:128,5:160,10:224")
+parser.add_argument('--distributed', action='store_true',
+                    help='Multi-worker data-parallel training over the cluster in TF_CONFIG, using the '
+                         'tf.data pipeline (see ml/launch_multiworker.py)')
+parser.add_argument('--checkpoint-dir', default=None,
+                    help='Save resumable step checkpoints here (off unless this or --resume is given; '
+                         '--resume defaults it to ml/checkpoints)')
+parser.add_argument('--checkpoint-every', type=int, default=500,
+                    help='Save a resumable checkpoint every N training steps (default: 500)')
+parser.add_argument('--keep-checkpoints', type=int, default=3,
+                    help='Resumable checkpoints to keep on disk (default: 3)')
+parser.add_argument('--resume', action='store_true',
+                    help='Continue from the newest resumable checkpoint')
+parser.add_argument('--profile', action='store_true',
+                    help='Record per-step data-wait/compute time, images/s and RSS to logs/throughput.csv '
+                         '(data-wait is not measured with --distributed)')
+parser.add_argument('--profile-steps', default=None, metavar='FIRST:LAST',
+                    help='Capture a TensorFlow profiler trace of these global steps into logs/profile')
+args = parser.parse_args()
+if args.shards and args.tensor_cache:
+    parser.error('--shards and --tensor-cache are mutually exclusive')
+if args.tf_data and args.tensor_cache:
+    parser.error('--tf-data and --tensor-cache are mutually exclusive')
+if args.cached_features and (args.shards or args.tensor_cache or args.tf_data):
+    parser.error('--cached-features reads images through the feature store and cannot be combined '
+                 'with --shards, --tensor-cache or --tf-data')
+if args.distributed and (args.shards or args.tensor_cache or args.cached_features):
+    parser.error('--distributed cannot be combined with --shards, --tensor-cache or --cached-features')
+if args.progressive and not args.tensor_cache:
+    parser.error('--progressive resizes from the tensor cache and needs --tensor-cache')
+schedule = None
+if args.progressive:
+    try:
+        schedule = make_schedule(30) if args.progressive == 'auto' else parse_schedule(args.progressive)
+    except ValueError as e:
+        parser.error(f'--progressive: {e}')
+trace_steps = None
+if args.profile_steps:
+    try:
+        trace_steps = tuple(int(step) for step in args.profile_steps.split(':'))
+    except ValueError:
+        trace_steps = ()
+    if len(trace_steps) != 2 or not 0 <= trace_steps[0] <= trace_steps[1]:
+        parser.error('--profile-steps expects FIRST:LAST, e.g. 10:20')
+
+# Collective ops need the strategy to exist before anything else touches TensorFlow
+strategy = make_strategy() if args.distributed else tf.distribute.get_strategy()
+global_batch_size = 64 * strategy.num_replicas_in_sync
 
 # Set up paths
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +108,16 @@ test_data_dir = os.path.join(base_dir, 'data', 'test')
 # Output paths
 model_save_path = os.path.join(base_dir, 'best_model_improved.keras')
 logs_dir = os.path.join(base_dir, 'ml', 'logs')
+# Step checkpoints are opt-in: they cost disk space and a save every few hundred steps
+checkpoint_dir = resume_dir = args.checkpoint_dir or (
+    os.path.join(base_dir, 'ml', 'checkpoints') if args.resume else None
+)
+if args.distributed:
+    # Every worker saves (it's a collective op) but only the chief's files are kept
+    model_save_path = chief_path(model_save_path)
+    logs_dir = chief_path(logs_dir)
+    if checkpoint_dir:
+        checkpoint_dir = chief_path(checkpoint_dir)
 
 print("=" * 70)
 print("🔬 ReluRay Improved Model Training")
@@ -39,15 +129,16 @@ print(f"   Test: {test_data_dir}")
 print(f"\n💾 Model will be saved to: {model_save_path}")
 print(f"📊 Logs will be saved to: {logs_dir}")
 
-# Check data availability
+# Check data availability (from the dataset index, rebuilt only when the data changed)
+dataset_index = load_or_build_index(os.path.join(base_dir, 'data'))
+counts = dataset_index.counts()
 for split_name, split_dir in [('Train', train_data_dir), 
                               ('Val', val_data_dir), 
                               ('Test', test_data_dir)]:
     if os.path.exists(split_dir):
-        normal_count = len([f for f in os.listdir(os.path.join(split_dir, 'NORMAL')) 
-                           if f.endswith('.jpeg')]) if os.path.exists(os.path.join(split_dir, 'NORMAL')) else 0
-        pneumonia_count = len([f for f in os.listdir(os.path.join(split_dir, 'PNEUMONIA')) 
-                              if f.endswith('.jpeg')]) if os.path.exists(os.path.join(split_dir, 'PNEUMONIA')) else 0
+        split = os.path.basename(split_dir)
+        normal_count = counts.get((split, 'NORMAL'), 0)
+        pneumonia_count = counts.get((split, 'PNEUMONIA'), 0)
         print(f"   {split_name}: {normal_count + pneumonia_count} images ({normal_count} Normal, {pneumonia_count} Pneumonia)")
     else:
         print(f"   ⚠️  {split_name} directory not found!")
@@ -56,47 +147,156 @@ print("\n" + "=" * 70)
 
 # Build improved model
 print("\n🏗️  Building improved model architecture...")
-model = build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5)
+# The dtype policy must be set before any layers are built
+policy = enable_mixed_precision() if args.mixed_precision else 'float32'
+# Progressive resizing needs a size-agnostic input; the pooled head makes that possible
+input_shape = (None, None, 3) if schedule else (224, 224, 3)
+with strategy.scope():
+    model = build_improved_model(input_shape=input_shape, dropout_rate=0.5)
 print("✅ Model built successfully!")
 print(f"\n📊 Model summary:")
 model.summary()
 
-# Create data generators with augmentation
-print("\n📦 Creating data generators with augmentation...")
-train_gen, val_gen, test_gen = create_data_generators(
-    train_data_dir,
-    val_data_dir,
-    test_data_dir,
-    batch_size=64,  # Increased batch size for larger dataset
-    use_augmentation=True
-)
+if args.tensor_cache:
+    print(f"\n📦 Reading all splits from tensor cache in {args.tensor_cache}...")
+    ensure_tensor_cache(dataset_index, args.tensor_cache)
+    if schedule:
+        print(f"📐 Progressive resizing: {', '.join(f'{size}px from epoch {start + 1}' for start, size in schedule)}")
+        image_size = tf.Variable(schedule[0][1], trainable=False, dtype=tf.int32)
+        train_gen = resizable_cache_dataset(args.tensor_cache, 'train', batch_size=64, training=True,
+                                            image_size=image_size, augment=augment_batches())
+        # Validation stays at full size so val_loss is comparable across stages
+        val_gen = resizable_cache_dataset(args.tensor_cache, 'val', batch_size=64)
+    else:
+        train_gen = TensorCacheSequence(args.tensor_cache, 'train', batch_size=64, shuffle=True,
+                                        augment=augment_batches())
+        val_gen = TensorCacheSequence(args.tensor_cache, 'val', batch_size=64)
+    test_gen = TensorCacheSequence(args.tensor_cache, 'test', batch_size=64)
+elif args.shards:
+    print(f"\n📦 Streaming train/val from shards in {args.shards}...")
+    train_gen = shard_dataset(args.shards, 'train', batch_size=64, training=True, augment=augment_batches())
+    val_gen = shard_dataset(args.shards, 'val', batch_size=64)
+    # evaluate_model needs the file list and labels, which shards don't carry
+    test_gen = directory_dataset(test_data_dir, batch_size=64, index=dataset_index.select(split='test'))
+elif args.distributed:
+    print(f"\n📦 Sharding tf.data pipelines across {strategy.num_replicas_in_sync} replicas "
+          f"(global batch {global_batch_size})...")
+    train_gen, train_steps, train_classes = distributed_directory_dataset(
+        strategy, train_data_dir, global_batch_size, training=True, augment=augment_batches(),
+        index=dataset_index.select(split='train')
+    )
+    val_gen, val_steps, _ = distributed_directory_dataset(strategy, val_data_dir, global_batch_size,
+                                                          index=dataset_index.select(split='val'))
+    test_gen = directory_dataset(test_data_dir, batch_size=64, index=dataset_index.select(split='test'))
+elif args.tf_data:
+    print("\n📦 Creating tf.data pipelines with batched augmentation...")
+    train_gen, val_gen, test_gen = create_datasets(
+        train_data_dir,
+        val_data_dir,
+        test_data_dir,
+        batch_size=64,
+        cache=args.cache,
+        augment=augment_batches(),
+        index=dataset_index
+    )
+else:
+    # Create data generators with augmentation
+    print("\n📦 Creating data generators with augmentation...")
+    train_gen, val_gen, test_gen = create_data_generators(
+        train_data_dir,
+        val_data_dir,
+        test_data_dir,
+        batch_size=64,  # Increased batch size for larger dataset
+        use_augmentation=True
+    )
 
-# Calculate class weights for imbalanced data
-print("\n⚖️  Calculating class weights...")
-class_weights = calculate_class_weights(train_gen)
-
-# Train model
-print("\n🚀 Starting training with improved setup...")
-history = train_improved_model(
-    model,
-    train_gen,
-    val_gen,
-    epochs=30,  # More epochs with early stopping
-    batch_size=64,
-    class_weights=class_weights,
-    model_save_path=model_save_path,
-    logs_dir=logs_dir
-)
+step_timer = StepTimeCallback()
+extra_callbacks = [step_timer]
+if schedule:
+    extra_callbacks.append(ProgressiveResizing(schedule, image_size))
+
+if args.cached_features:
+    # Labels straight from the index, in the generators' class order
+    class_names = dataset_index.class_names()
+    train_index = dataset_index.select(split='train')
+    val_index = dataset_index.select(split='val')
+
+    print("\n⚖️  Calculating class weights...")
+    class_weights = calculate_class_weights(train_index.labels(class_names))
+
+    print("\n🚀 Training head on cached backbone features...")
+    history = train_head_on_features(
+        model,
+        train_index.paths.tolist(),
+        train_index.labels(class_names),
+        val_index.paths.tolist(),
+        val_index.labels(class_names),
+        feature_store_dir=args.cached_features,
+        epochs=30,
+        batch_size=64,
+        class_weights=class_weights,
+        augment_variants=args.feature_variants,
+        model_save_path=model_save_path,
+        logs_dir=logs_dir,
+        extra_callbacks=[step_timer]
+    )
+else:
+    # Calculate class weights for imbalanced data
+    print("\n⚖️  Calculating class weights...")
+    if args.shards:
+        class_weights = calculate_class_weights(split_labels(args.shards, 'train'))
+    else:
+        class_weights = calculate_class_weights(train_classes if args.distributed else train_gen)
+
+    # Train model
+    print("\n🚀 Starting training with improved setup...")
+    history = train_improved_model(
+        model,
+        train_gen,
+        val_gen,
+        epochs=30,  # More epochs with early stopping
+        batch_size=global_batch_size,
+        class_weights=class_weights,
+        model_save_path=model_save_path,
+        logs_dir=logs_dir,
+        extra_callbacks=extra_callbacks,
+        steps_per_epoch=train_steps if args.distributed else None,
+        validation_steps=val_steps if args.distributed else None,
+        verbose=1 if is_chief() else 0,
+        checkpoint_dir=checkpoint_dir,
+        checkpoint_every=args.checkpoint_every,
+        keep_checkpoints=args.keep_checkpoints,
+        resume=args.resume,
+        resume_dir=resume_dir,
+        profile=args.profile,
+        trace_steps=trace_steps
+    )
+
+# Step times are only comparable between runs that differ in nothing but the policy
+pipeline = next((name for name, enabled in [('cached-features', args.cached_features),
+                                             ('tensor-cache', args.tensor_cache), ('shards', args.shards),
+                                             ('distributed', args.distributed), ('tf-data', args.tf_data)]
+                 if enabled), 'generators')
+record_precision_run(logs_dir, policy, step_timer, history, {
+    'pipeline': pipeline,
+    'cache': args.cache if args.tf_data else None,
+    'feature_variants': args.feature_variants if args.cached_features else None,
+    'global_batch_size': global_batch_size,
+    'replicas': strategy.num_replicas_in_sync,
+    'image_size': 224,
+    'progressive': schedule,
+})
 
-# Plot training metrics
-print("\n📈 Plotting training metrics...")
-plot_metrics(history)
+# Plot training metrics (chief only)
+if is_chief():
+    print("\n📈 Plotting training metrics...")
+    plot_metrics(history)
 
 # Evaluate on test set
 print("\n🧪 Evaluating on test set...")
 # Note: evaluate_model expects a generator, which we're providing
 try:
-    evaluate_model(model, test_gen)
+    evaluate_model(model, test_gen, feature_store_dir=args.cached_features)
 except Exception as e:
     print(f"⚠️  Evaluation error: {e}")
     print("   Running basic evaluation...")
@@ -108,6 +308,10 @@ except Exception as e:
         print(f"   Test Recall: {results[3]:.4f}")
 
 # Final model save
+if policy != 'float32' or schedule:
+    # Serve a float32, fixed 224x224 model so inference doesn't need bfloat16 hardware
+    # and reports the same input shape as before
+    model = export_float32(model, lambda: build_improved_model(input_shape=(224, 224, 3), dropout_rate=0.5))
 print(f"\n💾 Saving final model to: {model_save_path}")
 model.save(model_save_path)
 print("✅ Training complete!")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+DICOM Decode Benchmark for ReluRay
+Compares direct DICOM decoding (with reduced-resolution decode where the
+transfer syntax allows) against the convert-to-JPEG-then-decode route.
+
+Usage:
+    python3 scripts/benchmark_dicom.py [dicom_dir]
+
+Without a directory, synthetic 2048x2048 DICOMs are generated in both
+uncompressed 16-bit and JPEG baseline transfer syntaxes.
+"""
+
+import io
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.dicom_io import DICOM_EXTENSIONS, decode_dicom, dicom_to_array
+
+TARGET_SIZE = (224, 224)
+SYNTHETIC_COUNT = 20
+SYNTHETIC_SIZE = 2048
+
+
+def write_synthetic_dicoms(output_dir, count, compressed):
+    """Write synthetic CXR-like DICOM files; JPEG baseline when compressed"""
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.encaps import encapsulate
+    from pydicom.uid import ExplicitVRLittleEndian, JPEGBaseline8Bit, SecondaryCaptureImageStorage, generate_uid
+
+    rng = np.random.default_rng(42)
+    yy, xx = np.mgrid[0:SYNTHETIC_SIZE, 0:SYNTHETIC_SIZE]
+    base = np.exp(-(((xx - SYNTHETIC_SIZE / 2) / 700.0) ** 2 + ((yy - SYNTHETIC_SIZE / 2) / 900.0) ** 2))
+
+    paths = []
+    for i in range(count):
+        pixels = base + 0.05 * rng.random(base.shape)
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = JPEGBaseline8Bit if compressed else ExplicitVRLittleEndian
+
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.is_little_endian = True
+        ds.is_implicit_VR = False
+        ds.SOPClassUID = meta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.Modality = 'DX'
+        ds.Rows = ds.Columns = SYNTHETIC_SIZE
+        ds.SamplesPerPixel = 1
+        ds.PixelRepresentation = 0
+        ds.PhotometricInterpretation = 'MONOCHROME1' if i % 2 else 'MONOCHROME2'
+
+        if compressed:
+            buffer = io.BytesIO()
+            Image.fromarray((pixels / pixels.max() * 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+            ds.BitsAllocated = ds.BitsStored = 8
+            ds.HighBit = 7
+            ds.PixelData = encapsulate([buffer.getvalue()])
+            ds['PixelData'].is_undefined_length = True
+        else:
+            ds.BitsAllocated = 16
+            ds.BitsStored = 12
+            ds.HighBit = 11
+            ds.RescaleSlope = 1
+            ds.RescaleIntercept = -1024
+            ds.WindowCenter = 1000
+            ds.WindowWidth = 3000
+            ds.PixelData = (pixels / pixels.max() * 4095).astype(np.uint16).tobytes()
+
+        path = Path(output_dir) / f"synthetic_{'jpeg' if compressed else 'raw'}_{i:03d}.dcm"
+        ds.save_as(path, write_like_original=False)
+        paths.append(path)
+    return paths
+
+
+def direct_route(path):
+    return decode_dicom(str(path), TARGET_SIZE)
+
+
+def convert_then_decode_route(path):
+    """What the offline pipeline does today: full decode -> JPEG -> decode -> resize"""
+    buffer = io.BytesIO()
+    Image.fromarray(dicom_to_array(str(path))).save(buffer, 'JPEG', quality=95)
+    buffer.seek(0)
+    image = Image.open(buffer).convert('RGB')
+    return image.resize(TARGET_SIZE, Image.Resampling.LANCZOS)
+
+
+def measure(route, paths):
+    start = time.perf_counter()
+    for path in paths:
+        route(path)
+    elapsed = time.perf_counter() - start
+    return len(paths) / elapsed
+
+
+def report(label, paths):
+    direct = measure(direct_route, paths)
+    converted = measure(convert_then_decode_route, paths)
+    print(f"\n📊 {label} ({len(paths)} files)")
+    print(f"   Direct DICOM decode:    {direct:8.1f} images/s")
+    print(f"   Convert-then-decode:    {converted:8.1f} images/s")
+    print(f"   Speedup:                {direct / converted:8.2f}x")
+
+
+def main():
+    print("🔬 DICOM Decode Benchmark")
+    print("=" * 60)
+
+    if len(sys.argv) > 1:
+        dicom_dir = Path(sys.argv[1])
+        paths = sorted(p for p in dicom_dir.rglob('*') if p.suffix in DICOM_EXTENSIONS)
+        if not paths:
+            print(f"❌ No DICOM files found in {dicom_dir}")
+            return
+        report(str(dicom_dir), paths)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report('Uncompressed 16-bit', write_synthetic_dicoms(tmp, SYNTHETIC_COUNT, compressed=False))
+        report('JPEG baseline', write_synthetic_dicoms(tmp, SYNTHETIC_COUNT, compressed=True))
+
+
+if __name__ == '__main__':
+    main()
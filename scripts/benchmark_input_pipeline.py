@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Input Pipeline Benchmark for ReluRay
+Measures images per second delivered by ImageDataGenerator.flow_from_directory
+and by the tf.data pipeline over the same split, without a model attached,
+both plain and with the shared augmentation policy. Then times model.fit
+steps of the improved model fed by each augmented input, which is what
+training actually sees: input and compute overlap there.
+
+Usage:
+    python3 scripts/benchmark_input_pipeline.py [split_dir] [--batches N] [--batch-size N] [--train-steps N]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from ml.src.augmentation import augment_batches
+from ml.src.data_preprocessing import AUGMENTATION_CONFIG
+from ml.src.input_pipeline import directory_dataset
+from ml.src.mixed_precision import StepTimeCallback
+from ml.src.model_training_improved import build_improved_model
+
+TARGET_SIZE = (224, 224)
+WARMUP_BATCHES = 2
+
+
+def measure(batches, count):
+    """Images per second over `count` batches, after a short warm-up"""
+    iterator = iter(batches)
+    for _ in range(WARMUP_BATCHES):
+        next(iterator)
+    images = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        batch, _ = next(iterator)
+        images += len(batch)
+    return images / (time.perf_counter() - start)
+
+
+def keras_generator(split_dir, batch_size, augment=False):
+    config = AUGMENTATION_CONFIG if augment else {}
+    return ImageDataGenerator(rescale=1.0 / 255, **config).flow_from_directory(
+        split_dir, target_size=TARGET_SIZE, batch_size=batch_size,
+        class_mode='binary', shuffle=True, seed=42
+    )
+
+
+def tf_data_pipeline(split_dir, batch_size, augment=False):
+    # repeat() like the endless DirectoryIterator, so small splits don't run out
+    return directory_dataset(split_dir, batch_size, training=True,
+                             augment=augment_batches() if augment else None).repeat()
+
+
+def measure_training(model, batches, steps):
+    """Mean ms per model.fit step over `steps` steps (the first, tracing step is excluded)"""
+    step_timer = StepTimeCallback()
+    model.fit(batches, epochs=1, steps_per_epoch=steps + 1, callbacks=[step_timer], verbose=0)
+    return step_timer.mean_step_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ImageDataGenerator vs tf.data')
+    parser.add_argument('split_dir', nargs='?', default=str(BASE_DIR / 'data' / 'train'))
+    parser.add_argument('--batches', type=int, default=50, help='Measured batches per pipeline')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--train-steps', type=int, default=20,
+                        help='Timed model.fit steps per input (0 skips the training benchmark)')
+    args = parser.parse_args()
+
+    print("🔬 Input Pipeline Benchmark")
+    print("=" * 60)
+    print(f"📁 {args.split_dir} ({args.batches} batches of {args.batch_size})")
+
+    for augment in (False, True):
+        generator = measure(keras_generator(args.split_dir, args.batch_size, augment), args.batches)
+        tf_data = measure(tf_data_pipeline(args.split_dir, args.batch_size, augment), args.batches)
+
+        print(f"\n📊 Images per second ({'with' if augment else 'without'} augmentation)")
+        print(f"   ImageDataGenerator:     {generator:8.1f} images/s ({1000 * args.batch_size / generator:6.1f} ms/batch)")
+        print(f"   tf.data (AUTOTUNE):     {tf_data:8.1f} images/s ({1000 * args.batch_size / tf_data:6.1f} ms/batch)")
+        print(f"   Speedup:                {tf_data / generator:8.2f}x")
+
+    if args.train_steps:
+        print(f"\n🏋️  Timing {args.train_steps} model.fit steps per input (improved model, with augmentation)...")
+        model = build_improved_model(input_shape=TARGET_SIZE + (3,), dropout_rate=0.5)
+        generator = measure_training(model, keras_generator(args.split_dir, args.batch_size, True), args.train_steps)
+        tf_data = measure_training(model, tf_data_pipeline(args.split_dir, args.batch_size, True), args.train_steps)
+
+        print("\n📊 Training step time")
+        print(f"   ImageDataGenerator:     {generator:8.1f} ms/step ({1000 * args.batch_size / generator:6.1f} images/s)")
+        print(f"   tf.data (AUTOTUNE):     {tf_data:8.1f} ms/step ({1000 * args.batch_size / tf_data:6.1f} images/s)")
+        print(f"   Speedup:                {generator / tf_data:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Multi-worker Scaling Benchmark for ReluRay
+Trains the improved model on synthetic batches with 1, 2, 4, ... local
+workers under MultiWorkerMirroredStrategy and reports throughput, speedup
+and scaling efficiency against a single worker.
+
+Usage:
+    python3 scripts/benchmark_multiworker.py [--workers 1,2,4] [--steps 20] [--batch-size 16]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from ml.launch_multiworker import launch
+
+WARMUP_STEPS = 3
+
+
+def run_worker(args):
+    """One cluster member: time `steps` synthetic training steps; the chief writes the result"""
+    import tensorflow as tf
+    from ml.src.distributed import is_chief, make_strategy, worker_info
+    from ml.src.model_training_improved import build_improved_model
+
+    strategy = make_strategy()
+    with strategy.scope():
+        model = build_improved_model(input_shape=(224, 224, 3))
+
+    global_batch_size = args.batch_size * strategy.num_replicas_in_sync
+
+    def dataset_fn(input_context):
+        batch_size = input_context.get_per_replica_batch_size(global_batch_size)
+        images = tf.random.uniform([batch_size, 224, 224, 3], seed=input_context.input_pipeline_id)
+        labels = tf.cast(tf.range(batch_size) % 2, tf.float32)
+        return tf.data.Dataset.from_tensors((images, labels)).repeat()
+
+    dataset = strategy.distribute_datasets_from_function(dataset_fn)
+    model.fit(dataset, steps_per_epoch=WARMUP_STEPS, epochs=1, verbose=0)
+    start = time.perf_counter()
+    model.fit(dataset, steps_per_epoch=args.steps, epochs=1, verbose=0)
+    elapsed = time.perf_counter() - start
+
+    if is_chief():
+        with open(args.result, 'w') as f:
+            json.dump({'workers': worker_info()[2], 'images_per_second': args.steps * global_batch_size / elapsed}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput vs worker count for multi-worker training')
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts')
+    parser.add_argument('--steps', type=int, default=20, help='Timed steps per run')
+    parser.add_argument('--batch-size', type=int, default=16, help='Per-worker batch size')
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.result:
+        run_worker(args)
+        return
+
+    print("🔬 Multi-worker Scaling Benchmark")
+    print("=" * 60)
+    print(f"⚙️  {os.cpu_count()} cores, {args.steps} steps, batch {args.batch_size} per worker")
+
+    results = []
+    for num_workers in [int(n) for n in args.workers.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            result_path = os.path.join(tmp, 'result.json')
+            worker_args = ['--steps', str(args.steps), '--batch-size', str(args.batch_size),
+                           '--result', result_path]
+            if launch(__file__, num_workers, worker_args) != 0 or not os.path.exists(result_path):
+                print(f"❌ Run with {num_workers} workers failed")
+                continue
+            with open(result_path) as f:
+                results.append(json.load(f))
+        print(f"   {num_workers} workers: {results[-1]['images_per_second']:.1f} images/s")
+
+    if not results:
+        return
+    baseline = results[0]
+    print(f"\n📊 Scaling report (relative to {baseline['workers']} worker(s))")
+    print(f"   {'Workers':>7}  {'Images/s':>10}  {'Speedup':>8}  {'Efficiency':>10}")
+    for result in results:
+        speedup = result['images_per_second'] / baseline['images_per_second']
+        efficiency = speedup * baseline['workers'] / result['workers']
+        print(f"   {result['workers']:>7}  {result['images_per_second']:>10.1f}  {speedup:>7.2f}x  {efficiency:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
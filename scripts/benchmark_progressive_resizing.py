@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Progressive Resizing Benchmark for ReluRay
+Trains the improved model twice from the tensor cache for the same number of
+epochs, once at a fixed 224x224 and once on a progressive-resolution
+schedule, then reports total wall-clock time, the saving, and final
+validation and test accuracy (both evaluated at 224x224).
+
+Usage:
+    python3 scripts/benchmark_progressive_resizing.py [--epochs 10] [--schedule 0:128,3:160,5:224]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import tensorflow as tf
+
+from ml.src.dataset_index import load_or_build_index
+from ml.src.model_training_improved import build_improved_model, calculate_class_weights
+from ml.src.progressive import (
+    FULL_SIZE, ProgressiveResizing, make_schedule, parse_schedule, resizable_cache_dataset
+)
+from ml.src.tensor_cache import ensure_tensor_cache
+
+
+def run(cache_dir, epochs, batch_size, schedule=None, seed=42):
+    """Train one model; returns wall-clock seconds and final val/test accuracy"""
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(seed)
+
+    callbacks = []
+    image_size = None
+    if schedule:
+        image_size = tf.Variable(schedule[0][1], trainable=False, dtype=tf.int32)
+        callbacks.append(ProgressiveResizing(schedule, image_size))
+    train = resizable_cache_dataset(cache_dir, 'train', batch_size, training=True,
+                                    image_size=image_size, seed=seed)
+    val = resizable_cache_dataset(cache_dir, 'val', batch_size)
+    test = resizable_cache_dataset(cache_dir, 'test', batch_size)
+
+    input_shape = (None, None, 3) if schedule else (FULL_SIZE, FULL_SIZE, 3)
+    model = build_improved_model(input_shape=input_shape)
+    start = time.perf_counter()
+    history = model.fit(train, epochs=epochs, validation_data=val, callbacks=callbacks,
+                        class_weight=calculate_class_weights(train), verbose=2)
+    elapsed = time.perf_counter() - start
+
+    test_results = model.evaluate(test, verbose=0, return_dict=True)
+    return {
+        'seconds': elapsed,
+        'val_accuracy': history.history['val_accuracy'][-1],
+        'test_accuracy': test_results['accuracy'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fixed 224px vs progressive-resolution training')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--schedule', default=None,
+                        help='EPOCH:SIZE stages (default: 128->224 over the first half of training)')
+    parser.add_argument('--data-dir', default=str(BASE_DIR / 'data'))
+    parser.add_argument('--tensor-cache', default=str(BASE_DIR / 'data' / 'tensor_cache'))
+    args = parser.parse_args()
+
+    schedule = parse_schedule(args.schedule) if args.schedule else make_schedule(args.epochs)
+
+    print("🔬 Progressive Resizing Benchmark")
+    print("=" * 60)
+    print(f"⚙️  {args.epochs} epochs, batch {args.batch_size}, schedule "
+          f"{', '.join(f'{size}px@{start}' for start, size in schedule)}")
+
+    ensure_tensor_cache(load_or_build_index(args.data_dir), args.tensor_cache)
+
+    print(f"\n🏃 Fixed {FULL_SIZE}x{FULL_SIZE}...")
+    fixed = run(args.tensor_cache, args.epochs, args.batch_size)
+    print("\n🏃 Progressive...")
+    progressive = run(args.tensor_cache, args.epochs, args.batch_size, schedule)
+
+    saving = 1 - progressive['seconds'] / fixed['seconds']
+    print("\n📊 Results (accuracy evaluated at full resolution)")
+    print(f"   {'':<13}{'Wall-clock':>12}  {'Val acc':>8}  {'Test acc':>8}")
+    for name, result in (('Fixed 224', fixed), ('Progressive', progressive)):
+        print(f"   {name:<13}{result['seconds']:>11.1f}s  {result['val_accuracy']:>8.4f}  "
+              f"{result['test_accuracy']:>8.4f}")
+    print(f"   Wall-clock saving: {fixed['seconds'] - progressive['seconds']:.1f}s ({saving:.0%})")
+    print(f"   Test accuracy change: {progressive['test_accuracy'] - fixed['test_accuracy']:+.4f}")
+
+
+if __name__ == '__main__':
+    main()
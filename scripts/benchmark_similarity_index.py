@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Similarity Index Benchmark for ReluRay
+Measures build time, query latency and recall of exact vs approximate
+search on synthetic 512-d embeddings (default sizes: 100K and 1M vectors).
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.similarity_index import SimilarityIndex, normalize
+
+DIM = 512
+QUERIES = 100
+K = 10
+ADD_BATCH = 100_000
+
+
+def synthetic_embeddings(count, dim, rng, n_topics=256):
+    """Clustered non-negative vectors, roughly like pooled ReLU activations"""
+    topics = rng.random((n_topics, dim), dtype=np.float32)
+    for start in range(0, count, ADD_BATCH):
+        size = min(ADD_BATCH, count - start)
+        labels = rng.integers(0, n_topics, size)
+        yield topics[labels] + 0.3 * rng.random((size, dim), dtype=np.float32)
+
+
+def time_queries(index, queries, **kwargs):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, k=K, **kwargs))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies), results
+
+
+def benchmark(count, rng):
+    print(f"\n📊 {count:,} vectors x {DIM} dims")
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarityIndex(directory, dim=DIM)
+
+        start = time.perf_counter()
+        for offset, batch in enumerate(synthetic_embeddings(count, DIM, rng)):
+            index.add([f"case-{offset}-{i}" for i in range(len(batch))], batch)
+        print(f"   Add:   {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index.train()
+        print(f"   Train: {time.perf_counter() - start:.1f}s")
+
+        queries = normalize(next(synthetic_embeddings(QUERIES, DIM, rng)))
+        exact_ms, exact_results = time_queries(index, queries, exact=True)
+        approx_ms, approx_results = time_queries(index, queries, exact=False)
+
+        recall = np.mean([
+            len({case for case, _ in a} & {case for case, _ in e}) / K
+            for a, e in zip(approx_results, exact_results)
+        ])
+        for name, latencies in [('Exact', exact_ms), ('IVF', approx_ms)]:
+            print(f"   {name:6} p50 {np.percentile(latencies, 50):7.2f} ms   "
+                  f"p95 {np.percentile(latencies, 95):7.2f} ms")
+        print(f"   IVF recall@{K}: {recall:.3f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    print("🔬 Similarity Index Benchmark")
+    print("=" * 60)
+    rng = np.random.default_rng(42)
+    for count in sizes:
+        benchmark(count, rng)
+
+
+if __name__ == '__main__':
+    main()
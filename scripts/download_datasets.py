@@ -103,8 +103,8 @@ def setup_kaggle_credentials():
     print("\n📖 See scripts/SETUP_KAGGLE.md for detailed instructions.")
 
 
-def download_kaggle_dataset(dataset_id, output_dir):
-    """Download a dataset from Kaggle."""
+def download_kaggle_dataset(dataset_id, output_dir, keep_archive=False):
+    """Download a dataset from Kaggle (optionally keeping it as a zip for streaming)."""
     try:
         from kaggle.api.kaggle_api_extended import KaggleApi
         api = KaggleApi()
@@ -117,17 +117,19 @@ def download_kaggle_dataset(dataset_id, output_dir):
         api.dataset_download_files(
             dataset_id,
             path=str(output_dir),
-            unzip=True
+            unzip=not keep_archive
         )
         
         print(f"✅ Successfully downloaded {dataset_id}!")
+        if keep_archive:
+            print(f"   Archive kept at: {Path(output_dir) / (dataset_id.split('/')[-1] + '.zip')}")
         return True
     except Exception as e:
         print(f"❌ Error downloading {dataset_id}: {e}")
         return False
 
 
-def download_covid19_radiography():
+def download_covid19_radiography(keep_archive=False):
     """Download COVID-19 Radiography Database."""
     dataset = DATASETS['covid19_radiography']
     output_dir = RAW_DATA_DIR / 'covid19-radiography'
@@ -149,18 +151,27 @@ def download_covid19_radiography():
     
     success = download_kaggle_dataset(
         dataset['kaggle_dataset'],
-        output_dir
+        output_dir,
+        keep_archive=keep_archive
     )
     
     if success:
         print(f"\n✅ Dataset downloaded to: {output_dir}")
-        print(f"📁 Check the directory structure and proceed with preprocessing.")
+        if keep_archive:
+            archive = output_dir / (dataset['kaggle_dataset'].split('/')[-1] + '.zip')
+            print("📁 Preprocess straight from the archive:")
+            print(f"   python3 scripts/preprocess_covid19.py --archive {archive}")
+        else:
+            print("📁 Check the directory structure and proceed with preprocessing.")
         return True
     return False
 
 
 def main():
     """Main function to download datasets."""
+    # --stream keeps the zip instead of extracting it (halves peak disk usage)
+    keep_archive = '--stream' in sys.argv[1:]
+    
     print("🔬 ReluRay Dataset Downloader")
     print("=" * 60)
     
@@ -177,7 +188,7 @@ def main():
     
     # Start with smallest dataset: COVID-19 Radiography
     print("\n🎯 Starting with smallest dataset: COVID-19 Radiography Database")
-    download_covid19_radiography()
+    download_covid19_radiography(keep_archive=keep_archive)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Chunked ingestion for large chest X-ray datasets (NIH, RSNA, VinDr-CXR, ...)
+Streams records from a per-dataset adapter straight into the worker pool:
+no global file list, no shuffle, and splits assigned by hashing each
+patient / image ID, so memory stays constant however large the dataset is.
+"""
+
+import os
+import sys
+import csv
+import time
+import hashlib
+import argparse
+from collections import Counter, namedtuple
+from itertools import groupby, islice
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from scripts.download_datasets import DATASETS
+from scripts.preprocess_covid19 import (
+    CLASS_MAPPING, OUTPUT_DIR, SPLIT_RATIOS, find_dataset_structure, print_statistics, run_tasks
+)
+from ml.src.dataset_index import scan_images
+
+RAW_ROOT = BASE_DIR / 'data' / 'raw'
+
+# One image to ingest; split_key groups images that must share a split (e.g. one patient)
+Record = namedtuple('Record', ['source', 'class_name', 'split_key'])
+
+
+def raw_dir_for(dataset):
+    """data/raw/<dataset-name>, matching download_datasets.py"""
+    return RAW_ROOT / dataset.replace('_', '-')
+
+
+def assign_split(key, salt=''):
+    """
+    Deterministic split from a hash of the record's split key: the same
+    patient always lands in the same split, whatever order records arrive in.
+    """
+    digest = hashlib.sha1(f"{salt}:{key}".encode()).digest()
+    fraction = int.from_bytes(digest[:8], 'big') / 2 ** 64
+    cumulative = 0.0
+    for split, ratio in SPLIT_RATIOS.items():
+        cumulative += ratio
+        if fraction < cumulative:
+            return split
+    return split
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _find_file(raw_dir, *names):
+    """First existing file among the given names, searched at raw_dir and one level down"""
+    for name in names:
+        for candidate in [raw_dir / name, *(d / name for d in sorted(raw_dir.iterdir()) if d.is_dir())]:
+            if candidate.exists():
+                return candidate
+    raise FileNotFoundError(f"None of {names} found under {raw_dir}")
+
+
+def iter_covid19_radiography(raw_dir):
+    """Class-per-folder PNGs; there is no patient ID, so each image is its own split key"""
+    for folder in find_dataset_structure(raw_dir):
+        class_name = CLASS_MAPPING.get(folder.name)
+        if class_name is None:
+            continue
+        for path, _ in scan_images(folder):
+            yield Record(Path(path), class_name, Path(path).stem)
+
+
+def iter_nih_chest_xray(raw_dir):
+    """
+    Data_Entry_2017.csv rows: 'Pneumonia' findings -> PNEUMONIA, 'No Finding'
+    -> NORMAL, other findings skipped. Split by Patient ID.
+    """
+    # Images ship as images_001/images ... images_012/images in CSV order,
+    # so the directory that held the previous image is probed first
+    image_dirs = sorted(d for d in raw_dir.glob('images*/images') if d.is_dir()) or [raw_dir / 'images']
+    current = 0
+    for row in _read_csv(_find_file(raw_dir, 'Data_Entry_2017.csv', 'Data_Entry_2017_v2020.csv')):
+        labels = row['Finding Labels'].split('|')
+        if 'Pneumonia' in labels:
+            class_name = 'PNEUMONIA'
+        elif labels == ['No Finding']:
+            class_name = 'NORMAL'
+        else:
+            continue
+        name = row['Image Index']
+        for offset in range(len(image_dirs)):
+            candidate = image_dirs[(current + offset) % len(image_dirs)] / name
+            if candidate.exists():
+                current = (current + offset) % len(image_dirs)
+                yield Record(candidate, class_name, row['Patient ID'])
+                break
+
+
+def iter_rsna_pneumonia(raw_dir):
+    """
+    stage_2_train_labels.csv has one row per box (consecutive per patient):
+    Target 1 -> PNEUMONIA, 0 -> NORMAL. One DICOM per patient.
+    """
+    images_dir = raw_dir / 'stage_2_train_images'
+    rows = _read_csv(_find_file(raw_dir, 'stage_2_train_labels.csv'))
+    for patient_id, patient_rows in groupby(rows, key=lambda row: row['patientId']):
+        target = max(int(row['Target']) for row in patient_rows)
+        yield Record(images_dir / f"{patient_id}.dcm", 'PNEUMONIA' if target else 'NORMAL', patient_id)
+
+
+def iter_vindr_cxr(raw_dir):
+    """
+    image_labels_train.csv has one row per radiologist, consecutive per image:
+    any 'Pneumonia' vote -> PNEUMONIA, unanimous 'No finding' -> NORMAL,
+    anything else skipped. VinDr publishes no patient IDs, so split by image.
+    """
+    images_dir = raw_dir / 'train'
+    rows = _read_csv(_find_file(raw_dir, 'image_labels_train.csv'))
+    for image_id, image_rows in groupby(rows, key=lambda row: row['image_id']):
+        image_rows = list(image_rows)
+        if any(float(row.get('Pneumonia') or 0) for row in image_rows):
+            class_name = 'PNEUMONIA'
+        elif all(float(row.get('No finding') or 0) for row in image_rows):
+            class_name = 'NORMAL'
+        else:
+            continue
+        yield Record(images_dir / f"{image_id}.dicom", class_name, image_id)
+
+
+# One adapter per entry in DATASETS
+ADAPTERS = {
+    'covid19_radiography': iter_covid19_radiography,
+    'nih_chest_xray': iter_nih_chest_xray,
+    'rsna_pneumonia': iter_rsna_pneumonia,
+    'vindr_cxr': iter_vindr_cxr,
+}
+
+
+def iter_tasks(dataset, records, output_dir=OUTPUT_DIR, overwrite=False, counts=None):
+    """
+    Lazily map records to (source, output) pairs. Outputs are named
+    <dataset>_<stem>.jpeg so several datasets can share one data/ tree;
+    existing outputs are skipped unless overwrite is set.
+    counts, if given, is updated with {(split, class): images}.
+    """
+    created = set()
+    for record in records:
+        split = assign_split(record.split_key, salt=dataset)
+        class_dir = Path(output_dir) / split / record.class_name
+        if class_dir not in created:
+            class_dir.mkdir(parents=True, exist_ok=True)
+            created.add(class_dir)
+        if counts is not None:
+            counts[(split, record.class_name)] += 1
+        output_path = class_dir / f"{dataset}_{record.source.stem}.jpeg"
+        if not overwrite and output_path.exists():
+            continue
+        yield record.source, output_path
+
+
+def ingest(dataset, raw_dir=None, output_dir=OUTPUT_DIR, workers=1, limit=None, overwrite=False):
+    """Stream one dataset into output_dir. Returns ({(split, class): images}, images written)."""
+    raw_dir = Path(raw_dir) if raw_dir else raw_dir_for(dataset)
+    records = ADAPTERS[dataset](raw_dir)
+    if limit:
+        records = islice(records, limit)
+    counts = Counter()
+    written = run_tasks(iter_tasks(dataset, records, output_dir, overwrite, counts), workers=workers)
+    return counts, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a large dataset into the ReluRay data/ tree')
+    parser.add_argument('--dataset', required=True, choices=sorted(ADAPTERS),
+                        help='Dataset key from download_datasets.DATASETS')
+    parser.add_argument('--raw-dir', default=None,
+                        help='Downloaded dataset directory (default: data/raw/<dataset>)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for decoding/resizing (0 = all cores, default: 1)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Only ingest the first N records (smoke tests)')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Reprocess images whose output already exists')
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    raw_dir = Path(args.raw_dir) if args.raw_dir else raw_dir_for(args.dataset)
+
+    print(f"📥 Ingesting {DATASETS[args.dataset]['name']} (~{DATASETS[args.dataset]['size_gb']}GB)")
+    print("=" * 60)
+    print(f"📁 Source: {raw_dir}")
+    print(f"⚙️  Workers: {workers}")
+    if not raw_dir.exists():
+        print(f"❌ Raw data directory not found: {raw_dir}")
+        print("   Please download the dataset first using:")
+        print("   python3 scripts/download_datasets.py")
+        return
+
+    start = time.perf_counter()
+    counts, written = ingest(args.dataset, raw_dir, OUTPUT_DIR, workers, args.limit, args.overwrite)
+    elapsed = time.perf_counter() - start
+
+    total = sum(counts.values())
+    print(f"\n✅ {total} records, {written} images written in {elapsed:.1f}s "
+          f"({written / max(elapsed, 1e-9):.1f} img/s)")
+    for (split, class_name), count in sorted(counts.items()):
+        print(f"   {split}/{class_name}: {count} images")
+
+    print_statistics()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,29 @@ Preprocessing script for COVID-19 Radiography Database
 Integrates the dataset with existing ReluRay data structure.
 """
 
+import io
 import os
+import sys
+import json
+import zipfile
+import time
+import hashlib
 import shutil
-from pathlib import Path
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections import namedtuple
+from itertools import islice
+from pathlib import Path, PurePosixPath
 from PIL import Image
 import numpy as np
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.dicom_io import DICOM_EXTENSIONS, decode_dicom
+from ml.src.dataset_index import IMAGE_EXTENSIONS, INDEX_FILENAME, DatasetIndex, scan_images
+from ml.src.dedupe import load_exclusions
+
 RAW_DATA_DIR = BASE_DIR / 'data' / 'raw' / 'covid19-radiography'
 OUTPUT_DIR = BASE_DIR / 'data'
 
@@ -30,6 +46,13 @@ SPLIT_RATIOS = {
     'test': 0.15
 }
 
+MANIFEST_PATH = OUTPUT_DIR / 'preprocess_manifest.jsonl'
+# Preprocessing settings recorded per output; changing them invalidates the manifest
+OUTPUT_PARAMS = '224x224-lanczos-jpeg95'
+
+CHUNK_SIZE = 32  # Images per worker task
+IN_FLIGHT_PER_WORKER = 2  # Chunks queued per worker, keeps memory flat
+
 
 def find_dataset_structure(raw_dir):
     """Find the structure of the downloaded dataset."""
@@ -55,10 +78,48 @@ def find_dataset_structure(raw_dir):
     return folders
 
 
-def preprocess_image(image_path, target_size=(224, 224)):
-    """Preprocess a single image."""
+class ArchiveMember(namedtuple('ArchiveMember', ['archive', 'name'])):
+    """An image inside a zip archive, read in place without extracting it."""
+    __slots__ = ()
+    
+    @property
+    def stem(self):
+        return PurePosixPath(self.name).stem
+    
+    @property
+    def suffix(self):
+        return PurePosixPath(self.name).suffix
+    
+    def read_bytes(self):
+        return _open_archive(self.archive).read(self.name)
+    
+    def __str__(self):
+        return f"{self.archive}!{self.name}"
+
+
+_open_archives = {}
+
+
+def _open_archive(archive_path):
+    """One ZipFile handle per archive per process (workers open their own)."""
+    archive = _open_archives.get(archive_path)
+    if archive is None:
+        archive = _open_archives[archive_path] = zipfile.ZipFile(archive_path)
+    return archive
+
+
+def preprocess_image(image_path, target_size=(224, 224), data=None):
+    """Preprocess a single image (a path, or an archive member with its bytes)."""
     try:
-        img = Image.open(image_path)
+        if isinstance(image_path, ArchiveMember):
+            data = data if data is not None else image_path.read_bytes()
+        suffix = image_path.suffix if isinstance(image_path, ArchiveMember) else Path(image_path).suffix
+        
+        # DICOM: windowing / rescale / MONOCHROME1 handling, reduced-resolution decode
+        if suffix in DICOM_EXTENSIONS:
+            return decode_dicom(data if data is not None else str(image_path), target_size)
+        
+        img = Image.open(io.BytesIO(data) if data is not None else image_path)
         
         # Convert to RGB if needed
         if img.mode != 'RGB':
@@ -74,15 +135,8 @@ def preprocess_image(image_path, target_size=(224, 224)):
 
 
 def get_image_files(class_dir):
-    """Get all image files from a class directory."""
-    image_extensions = {'.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG'}
-    image_files = []
-    
-    for ext in image_extensions:
-        image_files.extend(list(class_dir.glob(f'*{ext}')))
-        image_files.extend(list(class_dir.glob(f'**/*{ext}')))  # Recursive
-    
-    return image_files
+    """Get all image files from a class directory (single walk, no duplicates)."""
+    return [Path(path) for path, _ in scan_images(class_dir)]
 
 
 def split_dataset(image_files, train_ratio, val_ratio, test_ratio):
@@ -101,8 +155,216 @@ def split_dataset(image_files, train_ratio, val_ratio, test_ratio):
     }
 
 
-def process_class(class_folder, output_class_name, raw_dir):
-    """Process all images in a class folder."""
+def file_sha256(path):
+    """Content hash of a source file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_processed_image(source_path, output_path):
+    """Preprocess one image and write it as JPEG. Returns the source hash, or None on failure."""
+    # Archive members are decompressed once and hashed from memory
+    data = source_path.read_bytes() if isinstance(source_path, ArchiveMember) else None
+    processed_img = preprocess_image(source_path, data=data)
+    if processed_img is None:
+        return None
+    # Write to a temp file first so an interrupted run never leaves a truncated JPEG
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    processed_img.save(tmp_path, 'JPEG', quality=95)
+    os.replace(tmp_path, output_path)
+    return hashlib.sha256(data).hexdigest() if data is not None else file_sha256(source_path)
+
+
+def process_chunk(tasks):
+    """Worker entry point: process a list of (source, output) pairs."""
+    return [(source, output, save_processed_image(source, output)) for source, output in tasks]
+
+
+class Manifest:
+    """
+    Append-only JSON-lines record of processed images, one entry per source:
+    source, size, mtime_ns, sha256, output, split and params. Entries are
+    appended as images finish, so an interrupted run resumes where it stopped;
+    later lines for the same source override earlier ones.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from an interrupted run
+                    if entry.get('removed'):
+                        self.entries.pop(entry['source'], None)
+                    else:
+                        self.entries[entry['source']] = entry
+        self._file = None
+
+    def _append(self, entry):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def get(self, source):
+        return self.entries.get(str(source))
+
+    def record(self, source, output, split, sha256, stat=None):
+        stat = stat or os.stat(source)
+        entry = {
+            'source': str(source),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'output': str(output),
+            'split': split,
+            'params': OUTPUT_PARAMS,
+        }
+        self.entries[entry['source']] = entry
+        self._append(entry)
+
+    def remove(self, source):
+        self.entries.pop(str(source), None)
+        self._append({'source': str(source), 'removed': True})
+
+    def is_current(self, source, stat):
+        """True if the source is unchanged since it was processed and its output exists."""
+        entry = self.get(source)
+        if entry is None or entry.get('params') != OUTPUT_PARAMS or not os.path.exists(entry['output']):
+            return False
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return True
+        # Touched but not modified: confirm by content and refresh the metadata
+        if entry['size'] == stat.st_size and file_sha256(source) == entry['sha256']:
+            self.record(source, entry['output'], entry['split'], entry['sha256'], stat)
+            return True
+        return False
+
+    def compact(self):
+        """Rewrite the journal with one line per live entry."""
+        self.close()
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def remove_orphans(manifest, seen_sources):
+    """Delete outputs whose source disappeared and drop them from the manifest."""
+    live_outputs = {manifest.entries[s]['output'] for s in seen_sources if s in manifest.entries}
+    removed = 0
+    for source, entry in list(manifest.entries.items()):
+        if source in seen_sources:
+            continue
+        if entry['output'] not in live_outputs and os.path.exists(entry['output']):
+            os.remove(entry['output'])
+            removed += 1
+        manifest.remove(source)
+    return removed
+
+
+class Progress:
+    """Prints processed count and throughput at most once per second."""
+
+    def __init__(self, total=None):
+        self.total = total
+        self.done = 0
+        self.start = time.perf_counter()
+        self._last_print = 0.0
+
+    @property
+    def rate(self):
+        return self.done / max(time.perf_counter() - self.start, 1e-9)
+
+    def update(self, count):
+        self.done += count
+        now = time.perf_counter()
+        complete = self.total is not None and self.done >= self.total
+        if now - self._last_print >= 1.0 or complete:
+            self._last_print = now
+            total = f"/{self.total}" if self.total is not None else ''
+            print(f"\r   ⏳ {self.done}{total} images ({self.rate:.1f} img/s)", end='', flush=True)
+            if complete:
+                print()
+
+    def close(self):
+        if self.total is None and self.done:
+            print()
+
+
+def run_tasks(tasks, workers=1, on_done=None):
+    """
+    Process (source, output) pairs serially or on a process pool.
+    `tasks` may be a list or a lazy iterator; the pool gets fixed-size chunks
+    with a bounded number in flight, so memory stays flat either way. Each
+    output depends only on its source, so results are identical for any
+    worker count. on_done(source, output, sha256) is called in the parent as
+    each image finishes. Returns the number of images written.
+    """
+    progress = Progress(len(tasks) if hasattr(tasks, '__len__') else None)
+    written = 0
+
+    def finish(results):
+        nonlocal written
+        for source, output, sha256 in results:
+            if sha256 is not None:
+                written += 1
+                if on_done is not None:
+                    on_done(source, output, sha256)
+        progress.update(len(results))
+
+    if workers <= 1:
+        for source, output in tasks:
+            finish([(source, output, save_processed_image(source, output))])
+        progress.close()
+        return written
+
+    task_iter = iter(tasks)
+    chunks = iter(lambda: list(islice(task_iter, CHUNK_SIZE)), [])
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(process_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future.result())
+        for future in pending:
+            finish(future.result())
+
+    progress.close()
+    return written
+
+
+def _is_excluded(output_path, output_dir, excluded):
+    """True if ml/dedupe_dataset.py removed this output as a duplicate."""
+    return bool(excluded) and Path(output_path).relative_to(output_dir).as_posix() in excluded
+
+
+def process_class(class_folder, output_class_name, raw_dir, workers=1, manifest=None, seen_sources=None,
+                  excluded=None):
+    """
+    Process new or changed images in a class folder, skipping outputs listed
+    in `excluded`. Returns the number of images written.
+    """
     print(f"\n📁 Processing class: {class_folder.name} → {output_class_name}")
     
     image_files = get_image_files(class_folder)
@@ -110,7 +372,7 @@ def process_class(class_folder, output_class_name, raw_dir):
     
     if len(image_files) == 0:
         print(f"   ⚠️  No images found in {class_folder}")
-        return
+        return 0
     
     # Split dataset
     splits = split_dataset(image_files, 
@@ -118,27 +380,131 @@ def process_class(class_folder, output_class_name, raw_dir):
                           SPLIT_RATIOS['val'],
                           SPLIT_RATIOS['test'])
     
-    # Process and copy images
+    # Collect (source, output) pairs; when names collide the last source wins,
+    # as in a serial run, so the result does not depend on worker scheduling
+    tasks = {}
+    split_of = {}
     for split_name, files in splits.items():
-        split_dir = OUTPUT_DIR / split_name / output_class_name
-        split_dir.mkdir(parents=True, exist_ok=True)
-        
         print(f"   📦 {split_name}: {len(files)} images")
         
         for img_file in files:
-            processed_img = preprocess_image(img_file)
-            if processed_img:
-                # Save as JPEG to match existing format
-                output_path = split_dir / f"{img_file.stem}.jpeg"
-                processed_img.save(output_path, 'JPEG', quality=95)
+            # Previously processed sources keep their split so outputs don't move between runs
+            entry = manifest.get(img_file) if manifest else None
+            if entry is not None and entry.get('params') == OUTPUT_PARAMS:
+                split_name_for_file = entry['split']
+            else:
+                split_name_for_file = split_name
+            split_dir = OUTPUT_DIR / split_name_for_file / output_class_name
+            split_dir.mkdir(parents=True, exist_ok=True)
+            
+            # Save as JPEG to match existing format
+            output_path = split_dir / f"{img_file.stem}.jpeg"
+            tasks.pop(output_path, None)
+            tasks[output_path] = img_file
+            split_of[img_file] = split_name_for_file
+    
+    pending = []
+    skipped = 0
+    for output_path, img_file in tasks.items():
+        if seen_sources is not None:
+            seen_sources.add(str(img_file))
+        if _is_excluded(output_path, OUTPUT_DIR, excluded):
+            skipped += 1
+            continue
+        if manifest is not None and manifest.is_current(img_file, os.stat(img_file)):
+            continue
+        pending.append((img_file, output_path))
+    
+    print(f"   🔁 {len(tasks) - len(pending) - skipped} unchanged, {skipped} excluded as duplicates, "
+          f"{len(pending)} to process")
+    
+    on_done = None
+    if manifest is not None:
+        def on_done(source, output, sha256):
+            previous = manifest.get(source)
+            # A changed split leaves the old output behind; remove it
+            if previous and previous['output'] != str(output) and os.path.exists(previous['output']):
+                os.remove(previous['output'])
+            manifest.record(source, output, split_of[source], sha256)
+    
+    written = run_tasks(pending, workers=workers, on_done=on_done)
     
-    print(f"   ✅ Completed processing {class_folder.name}")
+    print(f"   ✅ Completed processing {class_folder.name} ({written} images written)")
+    return written
+
+
+def archive_class_members(archive_path):
+    """Group image entries of a zip archive by their dataset class folder."""
+    classes = {}
+    with zipfile.ZipFile(archive_path) as archive:
+        names = sorted(info.filename for info in archive.infolist()
+                       if not info.is_dir() and PurePosixPath(info.filename).suffix.lower() in IMAGE_EXTENSIONS)
+    for name in names:
+        # e.g. COVID-19_Radiography_Dataset/COVID/images/COVID-1.png -> COVID
+        class_name = next((part for part in PurePosixPath(name).parts[:-1] if part in CLASS_MAPPING), None)
+        if class_name is not None:
+            classes.setdefault(class_name, []).append(ArchiveMember(str(archive_path), name))
+    return classes
+
+
+def process_archive(archive_path, output_dir=OUTPUT_DIR, workers=1):
+    """
+    Stream images straight out of a downloaded zip archive: each entry is
+    decompressed, preprocessed and written as the final JPEG, so the expanded
+    raw tree never touches disk. Images removed by ml/dedupe_dataset.py are
+    skipped. Returns {(split, class): images written}.
+    """
+    output_dir = Path(output_dir)
+    excluded = load_exclusions(output_dir)
+    written = {}
+    for class_name, members in sorted(archive_class_members(archive_path).items()):
+        output_class = CLASS_MAPPING[class_name]
+        print(f"\n📁 Processing archive class: {class_name} → {output_class} ({len(members)} images)")
+        
+        splits = split_dataset(members,
+                               SPLIT_RATIOS['train'],
+                               SPLIT_RATIOS['val'],
+                               SPLIT_RATIOS['test'])
+        for split_name, split_members in splits.items():
+            split_dir = output_dir / split_name / output_class
+            split_dir.mkdir(parents=True, exist_ok=True)
+            print(f"   📦 {split_name}: {len(split_members)} images")
+            
+            tasks = {}
+            for member in split_members:
+                output_path = split_dir / f"{member.stem}.jpeg"
+                tasks.pop(output_path, None)
+                tasks[output_path] = member
+            for output_path in [path for path in tasks if _is_excluded(path, output_dir, excluded)]:
+                del tasks[output_path]
+            key = (split_name, output_class)
+            written[key] = written.get(key, 0) + run_tasks(
+                [(member, output) for output, member in tasks.items()], workers=workers
+            )
+    return written
 
 
 def main():
     """Main preprocessing function."""
+    parser = argparse.ArgumentParser(description='Preprocess the COVID-19 Radiography Database')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for decoding/resizing (0 = all cores, default: 1)')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the manifest and reprocess every image')
+    parser.add_argument('--archive', default=None,
+                        help='Read images directly from the downloaded dataset zip instead of an extracted tree')
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    
     print("🔬 COVID-19 Radiography Database Preprocessing")
     print("=" * 60)
+    print(f"⚙️  Workers: {workers}")
+    
+    if args.archive:
+        print(f"🗜️  Streaming from archive: {args.archive}")
+        process_archive(args.archive, OUTPUT_DIR, workers=workers)
+        print_statistics()
+        return
     
     if not RAW_DATA_DIR.exists():
         print(f"❌ Raw data directory not found: {RAW_DATA_DIR}")
@@ -161,26 +527,49 @@ def main():
     for folder in class_folders:
         print(f"   - {folder.name}")
     
+    # Incremental runs skip sources recorded as unchanged in the manifest
+    manifest = Manifest(MANIFEST_PATH)
+    if args.full:
+        manifest.entries.clear()
+    print(f"\n🗂️  Manifest: {MANIFEST_PATH} ({len(manifest.entries)} entries)")
+    # Images ml/dedupe_dataset.py --remove deleted stay deleted
+    excluded = load_exclusions(OUTPUT_DIR)
+    if excluded:
+        print(f"🚫 {len(excluded)} outputs excluded as duplicates")
+    
     # Process each class
+    seen_sources = set()
     for class_folder in class_folders:
         output_class = CLASS_MAPPING.get(class_folder.name)
         if output_class:
-            process_class(class_folder, output_class, RAW_DATA_DIR)
+            process_class(class_folder, output_class, RAW_DATA_DIR, workers=workers,
+                          manifest=manifest, seen_sources=seen_sources, excluded=excluded)
         else:
             print(f"⚠️  Skipping unknown class: {class_folder.name}")
     
+    removed = remove_orphans(manifest, seen_sources)
+    if removed:
+        print(f"\n🧹 Removed {removed} orphaned outputs")
+    manifest.compact()
+    
+    print_statistics()
+
+
+def print_statistics():
+    """Print per-split counts and refresh the dataset index."""
     print("\n" + "=" * 60)
     print("✅ Preprocessing complete!")
     print(f"\n📊 Dataset statistics:")
     
+    # Refresh the dataset index so training and evaluation don't rescan directories
+    index = DatasetIndex.from_directory(OUTPUT_DIR)
+    index.save(OUTPUT_DIR / INDEX_FILENAME)
+    counts = index.counts()
     for split in ['train', 'val', 'test']:
-        split_dir = OUTPUT_DIR / split
-        if split_dir.exists():
-            for class_name in ['NORMAL', 'PNEUMONIA']:
-                class_dir = split_dir / class_name
-                if class_dir.exists():
-                    count = len(list(class_dir.glob('*.jpeg')))
-                    print(f"   {split}/{class_name}: {count} images")
+        for class_name in ['NORMAL', 'PNEUMONIA']:
+            if (split, class_name) in counts:
+                print(f"   {split}/{class_name}: {counts[(split, class_name)]} images")
+    print(f"\n🗂️  Dataset index written to {OUTPUT_DIR / INDEX_FILENAME}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Minimal multi-worker training run used by test_multiworker.py.
+Trains a tiny model for one epoch on <data_dir>, saving the model and a CSV
+log through chief_path, and records which images this worker's input
+pipeline produced (each image's gray level is its id).
+
+Usage:
+    python3 tests/multiworker_worker.py <data_dir> <output_dir>
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.src.distributed import chief_path, distributed_directory_dataset, make_strategy, worker_info
+
+strategy = make_strategy()
+
+import numpy as np
+from tensorflow.keras import Input, Sequential
+from tensorflow.keras.callbacks import CSVLogger
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
+
+data_dir, output_dir = sys.argv[1:3]
+_, task_index, _ = worker_info()
+
+train, steps, _ = distributed_directory_dataset(strategy, data_dir, 4 * strategy.num_replicas_in_sync)
+
+seen = []
+batches = iter(train)
+for _ in range(steps):
+    images, _ = next(batches)
+    for local in strategy.experimental_local_results(images):
+        seen.extend(int(round(value * 255)) for value in np.asarray(local).mean(axis=(1, 2, 3)))
+with open(os.path.join(output_dir, f"seen_{task_index}.json"), 'w') as f:
+    json.dump(seen, f)
+
+with strategy.scope():
+    model = Sequential([Input(shape=(224, 224, 3)), GlobalAveragePooling2D(), Dense(1, activation='sigmoid')])
+    model.compile(optimizer='sgd', loss='binary_crossentropy')
+
+logs_dir = chief_path(os.path.join(output_dir, 'logs'))
+os.makedirs(logs_dir, exist_ok=True)
+model.fit(train, epochs=1, steps_per_epoch=steps, verbose=0,
+          callbacks=[CSVLogger(os.path.join(logs_dir, 'training_log.csv'))])
+model.save(chief_path(os.path.join(output_dir, 'model.keras')))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for resuming an interrupted training run from a step checkpoint
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tensorflow as tf
+from tensorflow.keras import Input, Sequential
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.layers import Dense
+from tensorflow.keras.optimizers import SGD
+
+from ml.src.model_training_improved import train_improved_model
+
+EPOCHS = 3
+BATCH_SIZE = 8
+SAMPLES = 40  # 5 steps per epoch
+KILL_AT_STEP = 8  # mid-way through the second epoch, two steps after the last checkpoint
+
+
+class Killed(Exception):
+    pass
+
+
+class KillAfter(Callback):
+    def __init__(self, steps):
+        super().__init__()
+        self.steps = steps
+        self.done = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.done += 1
+        if self.done == self.steps:
+            raise Killed()
+
+
+def _model():
+    tf.keras.utils.set_random_seed(0)
+    model = Sequential([Input(shape=(4,)), Dense(1, activation='sigmoid')])
+    model.compile(optimizer=SGD(0.1), loss='binary_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def _datasets():
+    rng = np.random.default_rng(0)
+    images = rng.normal(size=(SAMPLES, 4)).astype('float32')
+    labels = (images.sum(axis=1) > 0).astype('float32')
+    train = tf.data.Dataset.from_tensor_slices((images, labels)).shuffle(SAMPLES, seed=0).batch(BATCH_SIZE)
+    val = tf.data.Dataset.from_tensor_slices((images[:16], labels[:16])).batch(BATCH_SIZE)
+    return train, val
+
+
+def _train(model, run_dir, resume=False, extra_callbacks=None):
+    train, val = _datasets()
+    train_improved_model(model, train, val, epochs=EPOCHS, batch_size=BATCH_SIZE,
+                         model_save_path=str(run_dir / 'best.keras'), logs_dir=str(run_dir / 'logs'),
+                         extra_callbacks=extra_callbacks, verbose=0,
+                         checkpoint_dir=str(run_dir / 'checkpoints'), checkpoint_every=3, resume=resume)
+    return model
+
+
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path):
+    uninterrupted = _train(_model(), tmp_path / 'uninterrupted')
+
+    with pytest.raises(Killed):
+        _train(_model(), tmp_path / 'resumed', extra_callbacks=[KillAfter(KILL_AT_STEP)])
+    resumed = _train(_model(), tmp_path / 'resumed', resume=True)
+
+    for expected, actual in zip(uninterrupted.get_weights(), resumed.get_weights()):
+        np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-7)
+    # Checkpoints are numbered by global step
+    steps = EPOCHS * SAMPLES // BATCH_SIZE
+    for run in ('uninterrupted', 'resumed'):
+        assert tf.train.latest_checkpoint(str(tmp_path / run / 'checkpoints')).endswith(f"ckpt-{steps}")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests for the compressed model artifact
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tensorflow.keras import Input, Sequential
+from tensorflow.keras.layers import Conv2D, Dense, GlobalAveragePooling2D
+from tensorflow.keras.models import load_model
+
+from ml.src.compression import compile_like_improved, optimizer_variable_count, save_compressed
+
+
+def test_compressed_artifact_has_no_optimizer_state(tmp_path):
+    model = compile_like_improved(Sequential([
+        Input(shape=(16, 16, 3)),
+        Conv2D(8, 3, activation='relu'),
+        GlobalAveragePooling2D(),
+        Dense(1, activation='sigmoid'),
+    ]))
+    images = np.random.rand(8, 16, 16, 3).astype(np.float32)
+    labels = np.random.randint(0, 2, size=(8, 1)).astype(np.float32)
+    model.fit(images, labels, epochs=1, verbose=0)
+
+    path = str(tmp_path / 'model.keras')
+    save_compressed(model, path)
+
+    assert optimizer_variable_count(path) == 0
+    restored = load_model(path)
+    np.testing.assert_allclose(restored.predict_on_batch(images), model.predict_on_batch(images), rtol=1e-5)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for the dataset index directory walk and its staleness check
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.src.dataset_index import DatasetIndex, load_or_build_index, scan_images
+
+
+def test_scan_images_survives_symlink_loops(tmp_path):
+    class_dir = tmp_path / 'train' / 'NORMAL'
+    (class_dir / 'nested').mkdir(parents=True)
+    (class_dir / 'a.jpeg').write_bytes(b'a')
+    (class_dir / 'nested' / 'b.jpeg').write_bytes(b'b')
+    # Points back up the tree: followed naively, the walk never ends
+    os.symlink(class_dir, class_dir / 'nested' / 'loop')
+
+    paths = [os.path.relpath(path, class_dir) for path, _ in scan_images(class_dir)]
+    assert paths == ['a.jpeg', os.path.join('nested', 'b.jpeg')]
+
+    index = DatasetIndex.from_directory(tmp_path)
+    assert len(index) == 2
+    assert index.counts() == {('train', 'NORMAL'): 2}
+
+
+def test_index_rebuilds_after_a_change_deep_in_the_tree(tmp_path):
+    nested = tmp_path / 'train' / 'NORMAL' / 'site-a' / 'batch-1'
+    nested.mkdir(parents=True)
+    (nested / 'a.jpeg').write_bytes(b'a')
+    assert len(load_or_build_index(tmp_path)) == 1
+    # Unchanged tree: the saved index is reused
+    assert len(load_or_build_index(tmp_path)) == 1
+
+    # Only batch-1's mtime changes; its parents' don't
+    (nested / 'b.jpeg').write_bytes(b'b')
+    stat = nested.stat()
+    os.utime(nested, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    index = load_or_build_index(tmp_path)
+    assert sorted(os.path.basename(path) for path in index.paths) == ['a.jpeg', 'b.jpeg']
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for near-duplicate grouping and duplicate removal surviving a preprocessing re-run
+"""
+
+import os
+import sys
+import shutil
+
+import numpy as np
+from PIL import Image
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, 'scripts'))
+
+import preprocess_covid19
+from ml import dedupe_dataset
+from ml.src.dedupe import (
+    DEFAULT_MAX_DISTANCE, EXCLUSIONS_FILENAME, candidate_pairs, group_near_duplicates, load_exclusions
+)
+
+
+def _build_raw_class(class_dir, count):
+    class_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        pixels = rng.integers(0, 256, size=(16, 16), dtype=np.uint8)
+        Image.fromarray(pixels).resize((128, 128), Image.Resampling.NEAREST).save(class_dir / f"Normal-{i}.png")
+    # An exact copy under another name
+    shutil.copy(class_dir / 'Normal-0.png', class_dir / 'Normal-copy.png')
+
+
+def _processed(data_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), data_dir).replace(os.sep, '/')
+                  for split in ('train', 'val', 'test')
+                  for root, _, names in os.walk(data_dir / split) for name in names)
+
+
+def _preprocess(raw_class_dir, data_dir):
+    manifest = preprocess_covid19.Manifest(data_dir / 'preprocess_manifest.jsonl')
+    preprocess_covid19.process_class(raw_class_dir, 'NORMAL', raw_class_dir.parent, manifest=manifest,
+                                     seen_sources=set(), excluded=load_exclusions(data_dir))
+    manifest.compact()
+
+
+def test_removed_duplicates_are_not_regenerated(tmp_path, monkeypatch):
+    raw_class_dir = tmp_path / 'raw' / 'Normal'
+    data_dir = tmp_path / 'data'
+    _build_raw_class(raw_class_dir, 9)
+    monkeypatch.setattr(preprocess_covid19, 'OUTPUT_DIR', data_dir)
+
+    _preprocess(raw_class_dir, data_dir)
+    before = _processed(data_dir)
+    assert len(before) == 10
+
+    monkeypatch.setattr(sys, 'argv', ['dedupe_dataset.py', '--data-dir', str(data_dir), '--remove', 'all'])
+    dedupe_dataset.main()
+    after_dedupe = _processed(data_dir)
+    assert len(after_dedupe) == 9
+    removed = set(before) - set(after_dedupe)
+    assert load_exclusions(data_dir) == removed
+    assert os.path.basename(removed.pop()) in ('Normal-0.jpeg', 'Normal-copy.jpeg')
+    assert (data_dir / EXCLUSIONS_FILENAME).exists()
+
+    # The manifest alone would see the missing output and rebuild it
+    _preprocess(raw_class_dir, data_dir)
+    assert _processed(data_dir) == after_dedupe
+
+
+def _flip_bits(value, bits):
+    for bit in bits:
+        value ^= 1 << int(bit)
+    return value
+
+
+def test_grouping_finds_planted_duplicates_without_quadratic_comparisons():
+    rng = np.random.default_rng(0)
+    n = 4000
+    hashes = [int(value) for value in rng.integers(0, 2 ** 64, size=n, dtype=np.uint64)]
+    planted = []
+    for i in range(0, 200, 2):
+        # A near-duplicate of image i at distance 1..6
+        distance = 1 + (i // 2) % DEFAULT_MAX_DISTANCE
+        hashes.append(_flip_bits(hashes[i], rng.choice(64, size=distance, replace=False)))
+        planted.append((i, len(hashes) - 1))
+    hashes = np.array(hashes, dtype=np.uint64)
+
+    groups = group_near_duplicates(hashes)
+    group_of = {int(i): g for g, group in enumerate(groups) for i in group}
+    for original, copy in planted:
+        assert original in group_of and group_of[original] == group_of.get(copy)
+
+    # Random 64-bit hashes are ~32 bits apart, so nothing else should be grouped
+    assert sum(len(group) for group in groups) == 2 * len(planted)
+
+    # Seven even 9-10 bit bands: a random pair shares a band with probability
+    # ~7 / 2 ** 9, so comparisons are a small fraction of all pairs (a 4-bit
+    # band alone would compare 1/16 of them)
+    compared = len(candidate_pairs(hashes))
+    all_pairs = len(hashes) * (len(hashes) - 1) // 2
+    assert compared < all_pairs / 40
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the backbone feature store shared between API worker processes
+"""
+
+import os
+import sys
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from feature_store import FeatureStore
+
+DIM = 8
+
+
+def _vector(key):
+    return np.full(DIM, int(key.split('-')[1]), dtype=np.float32)
+
+
+def _append(root, worker, count):
+    store = FeatureStore(root, 'test', DIM)
+    for i in range(count):
+        key = f"w{worker}-{worker * 1000 + i}"
+        store.put(key, _vector(key))
+
+
+def test_concurrent_appends_keep_keys_and_rows_aligned(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_append, args=(str(tmp_path), worker, 200)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = FeatureStore(str(tmp_path), 'test', DIM)
+    assert len(store) == 800
+    for worker in range(4):
+        for i in range(200):
+            key = f"w{worker}-{worker * 1000 + i}"
+            np.testing.assert_array_equal(store.get(key), _vector(key))
+
+
+def test_store_sees_rows_appended_by_another_instance(tmp_path):
+    reader = FeatureStore(str(tmp_path), 'test', DIM)
+    writer = FeatureStore(str(tmp_path), 'test', DIM)
+    writer.put('a-1', _vector('a-1'))
+    writer.put('a-2', _vector('a-2'))
+    reader.put('b-3', _vector('b-3'))
+
+    np.testing.assert_array_equal(reader.get('a-2'), _vector('a-2'))
+    np.testing.assert_array_equal(writer.get('b-3'), _vector('b-3'))
+    assert len(reader) == len(writer) == 3
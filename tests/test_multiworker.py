@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for local multi-worker training through ml/launch_multiworker.py
+"""
+
+import os
+import sys
+import json
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.launch_multiworker import launch
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'multiworker_worker.py')
+IMAGES_PER_CLASS = 8
+
+
+def _gray_level(image_id):
+    return 10 + 15 * image_id
+
+
+def _build_split(directory):
+    image_id = 0
+    for class_name in ('NORMAL', 'PNEUMONIA'):
+        os.makedirs(directory / class_name)
+        for _ in range(IMAGES_PER_CLASS):
+            Image.new('RGB', (32, 32), color=(_gray_level(image_id),) * 3).save(
+                directory / class_name / f"{image_id:02d}.png")
+            image_id += 1
+
+
+def test_two_workers_train_on_disjoint_shards(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'train'
+    output_dir = tmp_path / 'output'
+    scratch = tmp_path / 'tmp'
+    for directory in (output_dir, scratch):
+        directory.mkdir()
+    _build_split(data_dir)
+    # Non-chief workers write their throwaway copies under TMPDIR
+    monkeypatch.setenv('TMPDIR', str(scratch))
+
+    assert launch(WORKER_SCRIPT, 2, [str(data_dir), str(output_dir)]) == 0
+
+    # Only the chief's model and log are kept
+    assert sorted(os.listdir(output_dir)) == ['logs', 'model.keras', 'seen_0.json', 'seen_1.json']
+    assert os.listdir(output_dir / 'logs') == ['training_log.csv']
+    assert os.listdir(scratch) == []
+
+    # Each worker decoded its own half of the files
+    seen = []
+    for index in range(2):
+        with open(output_dir / f"seen_{index}.json") as f:
+            seen.append(set(json.load(f)))
+    assert seen[0] and seen[1]
+    assert not seen[0] & seen[1]
+    assert seen[0] | seen[1] == {_gray_level(i) for i in range(2 * IMAGES_PER_CLASS)}
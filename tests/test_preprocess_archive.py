@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for preprocessing straight from a dataset zip archive, and for
+parallel and incremental runs over an extracted class folder
+"""
+
+import io
+import os
+import sys
+import zipfile
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import preprocess_covid19
+from preprocess_covid19 import SPLIT_RATIOS, Manifest, process_archive, process_class, remove_orphans
+
+IMAGES_PER_CLASS = 10
+
+
+def _png(value):
+    buffer = io.BytesIO()
+    Image.new('L', (64, 48), color=value).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _build_archive(path):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for class_name in ('COVID', 'Normal'):
+            for i in range(IMAGES_PER_CLASS):
+                archive.writestr(f"COVID-19_Radiography_Dataset/{class_name}/images/{class_name}-{i}.png", _png(i * 20))
+            archive.writestr(f"COVID-19_Radiography_Dataset/{class_name}.metadata.xlsx", b'not an image')
+
+
+def test_process_archive_writes_splits_without_extracting(tmp_path):
+    archive_path = tmp_path / 'covid19.zip'
+    _build_archive(archive_path)
+    output_dir = tmp_path / 'data'
+
+    written = process_archive(str(archive_path), output_dir, workers=2)
+
+    train = int(IMAGES_PER_CLASS * SPLIT_RATIOS['train'])
+    val = int(IMAGES_PER_CLASS * SPLIT_RATIOS['val'])
+    expected = {'train': train, 'val': val, 'test': IMAGES_PER_CLASS - train - val}
+    for class_name, source_name in (('NORMAL', 'Normal'), ('PNEUMONIA', 'COVID')):
+        stems = []
+        for split, count in expected.items():
+            assert written[(split, class_name)] == count
+            files = sorted((output_dir / split / class_name).iterdir())
+            assert len(files) == count
+            for path in files:
+                assert path.suffix == '.jpeg'
+                with Image.open(path) as image:
+                    assert image.size == (224, 224)
+                    assert image.mode == 'RGB'
+            stems.extend(path.stem for path in files)
+        # Every source lands in exactly one split
+        assert sorted(stems) == sorted(f"{source_name}-{i}" for i in range(IMAGES_PER_CLASS))
+
+    # Nothing but the archive and the processed JPEGs: no extracted tree, no temp files
+    leftovers = [path for path in tmp_path.rglob('*')
+                 if path.is_file() and path != archive_path and path.suffix != '.jpeg']
+    assert leftovers == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['covid19.zip', 'data']
+    assert sorted(path.name for path in output_dir.iterdir()) == ['test', 'train', 'val']
+
+
+def _build_class_folder(class_dir, count):
+    class_dir.mkdir(parents=True)
+    for i in range(count):
+        (class_dir / f"Normal-{i}.png").write_bytes(_png(i * 10))
+
+
+def _outputs(output_dir):
+    return {path.relative_to(output_dir).as_posix(): path.read_bytes() for path in output_dir.rglob('*.jpeg')}
+
+
+def _run(class_dir, output_dir, monkeypatch, workers=1):
+    """One preprocessing run as main() does it; returns (images written, orphans removed)"""
+    monkeypatch.setattr(preprocess_covid19, 'OUTPUT_DIR', output_dir)
+    manifest = Manifest(output_dir / 'preprocess_manifest.jsonl')
+    seen_sources = set()
+    written = process_class(class_dir, 'NORMAL', class_dir.parent, workers=workers,
+                            manifest=manifest, seen_sources=seen_sources)
+    removed = remove_orphans(manifest, seen_sources)
+    manifest.compact()
+    return written, removed
+
+
+def test_worker_count_does_not_change_outputs(tmp_path, monkeypatch):
+    class_dir = tmp_path / 'raw' / 'Normal'
+    _build_class_folder(class_dir, IMAGES_PER_CLASS)
+    # Several chunks per worker
+    monkeypatch.setattr(preprocess_covid19, 'CHUNK_SIZE', 3)
+
+    assert _run(class_dir, tmp_path / 'serial', monkeypatch, workers=1) == (IMAGES_PER_CLASS, 0)
+    assert _run(class_dir, tmp_path / 'parallel', monkeypatch, workers=2) == (IMAGES_PER_CLASS, 0)
+
+    serial = _outputs(tmp_path / 'serial')
+    assert len(serial) == IMAGES_PER_CLASS
+    assert _outputs(tmp_path / 'parallel') == serial
+
+
+def test_reruns_only_process_changed_sources_and_remove_orphans(tmp_path, monkeypatch):
+    class_dir = tmp_path / 'raw' / 'Normal'
+    output_dir = tmp_path / 'data'
+    _build_class_folder(class_dir, IMAGES_PER_CLASS)
+
+    assert _run(class_dir, output_dir, monkeypatch) == (IMAGES_PER_CLASS, 0)
+    before = _outputs(output_dir)
+    assert _run(class_dir, output_dir, monkeypatch) == (0, 0)
+
+    # New content, and an mtime that certainly differs from the recorded one
+    changed = class_dir / 'Normal-3.png'
+    changed.write_bytes(_png(255))
+    stat = changed.stat()
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _run(class_dir, output_dir, monkeypatch) == (1, 0)
+    after = _outputs(output_dir)
+    assert after.keys() == before.keys()
+    assert [name for name in after if after[name] != before[name]] == \
+        [name for name in after if name.endswith('/Normal-3.jpeg')]
+
+    (class_dir / 'Normal-5.png').unlink()
+    assert _run(class_dir, output_dir, monkeypatch) == (0, 1)
+    assert sorted(_outputs(output_dir)) == sorted(name for name in after if not name.endswith('/Normal-5.jpeg'))
+    assert str(class_dir / 'Normal-5.png') not in Manifest(output_dir / 'preprocess_manifest.jsonl').entries
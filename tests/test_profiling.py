@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the throughput profiler's input-bound detection
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tensorflow.keras import Input, Sequential
+from tensorflow.keras.layers import Dense, Layer
+from tensorflow.keras.utils import Sequence
+
+from ml.src.profiling import ThroughputProfiler
+
+BATCHES = 12
+BATCH_SIZE = 4
+DELAY = 0.05
+
+
+class DelayedBatches(Sequence):
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def __len__(self):
+        return BATCHES
+
+    def __getitem__(self, idx):
+        time.sleep(self.delay)
+        return np.ones((BATCH_SIZE, 8), dtype='float32'), np.ones((BATCH_SIZE, 1), dtype='float32')
+
+
+class SlowLayer(Layer):
+    """Identity layer standing in for an expensive model step"""
+
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def call(self, inputs):
+        time.sleep(self.delay)
+        return inputs
+
+
+def _profile(tmp_path, input_delay, model_delay):
+    model = Sequential([Input(shape=(8,)), SlowLayer(model_delay), Dense(1)])
+    # Eager, so the layer's sleep runs on every step
+    model.compile(optimizer='sgd', loss='mse', run_eagerly=True)
+    profiler = ThroughputProfiler(str(tmp_path), batch_size=BATCH_SIZE)
+    model.fit(profiler.wrap(DelayedBatches(input_delay)), epochs=1, verbose=0, callbacks=[profiler])
+    return profiler.summary()
+
+
+def test_slow_input_with_fast_model_is_input_bound(tmp_path):
+    summary = _profile(tmp_path, input_delay=DELAY, model_delay=0)
+    assert summary['mean_data_ms'] >= 0.8 * DELAY * 1000
+    assert summary['input_bound_fraction'] >= 0.8
+
+
+def test_fast_input_with_slow_model_is_not_input_bound(tmp_path):
+    summary = _profile(tmp_path, input_delay=0, model_delay=DELAY)
+    assert summary['mean_data_ms'] < 0.2 * DELAY * 1000
+    assert summary['input_bound_steps'] == 0
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the similar-case retrieval index
+"""
+
+import os
+import sys
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from similarity_index import SimilarityIndex
+
+DIM = 16
+
+
+def _case_vector(case_id):
+    # One-hot per case so the nearest neighbour of a case's own vector is itself
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[int(case_id.split('-')[1]) % DIM] = 1.0
+    vector[-1] = 0.01 * int(case_id.split('-')[1])
+    return vector
+
+
+def _add_cases(directory, worker, count):
+    index = SimilarityIndex(directory, dim=DIM)
+    for i in range(count):
+        case_id = f"case-{worker * count + i}"
+        index.add([case_id], _case_vector(case_id)[np.newaxis])
+
+
+def test_concurrent_adds_keep_ids_and_vectors_aligned(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_add_cases, args=(str(tmp_path), worker, 50)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    index = SimilarityIndex(str(tmp_path))
+    assert len(index) == 200
+    for i in range(200):
+        case_id = f"case-{i}"
+        assert index.search(_case_vector(case_id), k=1, exact=True)[0][0] == case_id
+
+
+def test_search_sees_cases_added_by_another_instance(tmp_path):
+    reader = SimilarityIndex(str(tmp_path), dim=DIM)
+    writer = SimilarityIndex(str(tmp_path), dim=DIM)
+    writer.add(['case-3'], _case_vector('case-3')[np.newaxis])
+    assert reader.search(_case_vector('case-3'), k=1)[0][0] == 'case-3'
+
+
+def test_search_picks_up_centroids_saved_by_another_instance(tmp_path):
+    reader = SimilarityIndex(str(tmp_path), dim=DIM)
+    builder = SimilarityIndex(str(tmp_path), dim=DIM)
+    case_ids = [f"case-{i}" for i in range(64)]
+    builder.add(case_ids, np.stack([_case_vector(case_id) for case_id in case_ids]))
+    builder.train(n_clusters=4)
+    builder.save()
+    assert not reader.is_approximate
+
+    assert reader.search(_case_vector('case-5'), k=1, exact=False)[0][0] == 'case-5'
+    assert reader.is_approximate
+    np.testing.assert_array_equal(reader._centroids, builder._centroids)